@@ -0,0 +1,45 @@
+import time
+
+from pacai.agents.capture.search import SearchCaptureAgent
+from pacai.agents.search.alphabeta import DEFAULT_TABLE_SIZE
+from pacai.agents.search.alphabeta import createSearch
+
+class AlphaBetaCaptureAgent(SearchCaptureAgent):
+    """
+    A capture agent that uses `pacai.agents.search.alphabeta.AlphaBetaSearch`.
+    Each move searches deeper and deeper until the move time (in seconds) is up.
+
+    With parallel set to more than one,
+    the root actions are searched on that many processes (which start with the game).
+
+    Subclasses will usually want to override `SearchCaptureAgent.evaluate`.
+    """
+
+    def __init__(self, index, moveTime = 0.5, maxDepth = None, tableSize = DEFAULT_TABLE_SIZE,
+            parallel = 1, **kwargs):
+        super().__init__(index, moveTime = moveTime, **kwargs)
+
+        self._maxDepth = maxDepth
+        if (maxDepth is not None):
+            self._maxDepth = int(maxDepth)
+
+        self._tableSize = int(tableSize)
+        self._parallel = int(parallel)
+
+    def registerInitialState(self, gameState):
+        super().registerInitialState(gameState)
+
+        # Workers take a while to start, so start them now (when there is time to spare).
+        self._search = createSearch(self.evaluate, self.getTeam(gameState), self._parallel,
+                tableSize = self._tableSize)
+        self._search.start()
+
+    def final(self, gameState):
+        super().final(gameState)
+
+        if (self._search is not None):
+            self._search.close()
+
+    def chooseAction(self, gameState):
+        deadline = time.time() + self._moveTime
+        return self._search.search(gameState, self.index, deadline, self._maxDepth)
@@ -0,0 +1,40 @@
+import logging
+import time
+
+from pacai.agents.capture.search import SearchCaptureAgent
+from pacai.agents.search.mcts import DEFAULT_EXPLORATION
+from pacai.agents.search.mcts import DEFAULT_ROLLOUT_DEPTH
+from pacai.agents.search.mcts import MonteCarloTreeSearch
+
+class MonteCarloCaptureAgent(SearchCaptureAgent):
+    """
+    A capture agent that uses `pacai.agents.search.mcts.MonteCarloTreeSearch`.
+    Each move runs rollouts until the move time (in seconds) is up.
+
+    Subclasses will usually want to override `SearchCaptureAgent.evaluate`.
+    """
+
+    def __init__(self, index, moveTime = 0.5, exploration = DEFAULT_EXPLORATION,
+            rolloutDepth = DEFAULT_ROLLOUT_DEPTH, **kwargs):
+        super().__init__(index, moveTime = moveTime, **kwargs)
+
+        self._exploration = float(exploration)
+        self._rolloutDepth = int(rolloutDepth)
+
+    def registerInitialState(self, gameState):
+        super().registerInitialState(gameState)
+
+        self._search = MonteCarloTreeSearch(self.evaluate, self.getTeam(gameState),
+                exploration = self._exploration, rolloutDepth = self._rolloutDepth)
+
+    def final(self, gameState):
+        super().final(gameState)
+
+        if (self._search is not None):
+            logging.info('Agent %d: MCTS ran %d rollouts in %.2f seconds (%.0f rollouts/sec).' %
+                    (self.index, self._search.totalRollouts, self._search.totalTime,
+                    self._search.getRolloutsPerSecond()))
+
+    def chooseAction(self, gameState):
+        deadline = time.time() + self._moveTime
+        return self._search.search(gameState, self.index, deadline)
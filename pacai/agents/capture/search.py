@@ -0,0 +1,32 @@
+from pacai.agents.capture.capture import CaptureAgent
+
+class SearchCaptureAgent(CaptureAgent):
+    """
+    A base class for capture agents that search the game tree
+    and score the states they reach with `SearchCaptureAgent.evaluate`.
+    Each move is searched until the move time (in seconds) is up,
+    which should be kept comfortably under the capture move warning time (one second).
+    """
+
+    def __init__(self, index, moveTime = 0.5, **kwargs):
+        super().__init__(index, **kwargs)
+
+        self._moveTime = float(moveTime)
+        self._search = None
+
+    def evaluate(self, gameState):
+        """
+        Score a state for this agent's team.
+        By default, this is the team's score with a small bonus for being close to food.
+        """
+
+        value = self.getScore(gameState)
+
+        myPosition = gameState.getAgentPosition(self.index)
+        foodList = self.getFood(gameState).asList()
+
+        if (myPosition is not None and len(foodList) > 0):
+            distance = min([self.getMazeDistance(myPosition, food) for food in foodList])
+            value -= distance / 100.0
+
+        return value
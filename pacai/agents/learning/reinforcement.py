@@ -1,8 +1,10 @@
 import abc
 import logging
+import os
 import time
 
 from pacai.agents.learning.value import ValueEstimationAgent
+from pacai.util.replayMemory import ReplayMemory
 
 class ReinforcementAgent(ValueEstimationAgent):
     """
@@ -12,10 +14,16 @@ class ReinforcementAgent(ValueEstimationAgent):
     The environment will call `ReinforcementAgent.observeTransition`,
     which will then call `ReinforcementAgent.update` (which you should override).
     Use `ReinforcementAgent.getLegalActions` to know which actions are available in a state.
+
+    With a replay memory (replayCapacity > 0), every observed transition is also remembered
+    (as encoded by `ReinforcementAgent.encodeTransition`),
+    and a mini-batch of remembered transitions is replayed
+    (with `ReinforcementAgent.replayTransition`) after each one.
     """
 
     def __init__(self, index, actionFn = None, numTraining = 100, epsilon = 0.5,
-            alpha = 0.5, gamma = 1, **kwargs):
+            alpha = 0.5, gamma = 1, learningFile = None, resume = False,
+            replayCapacity = 0, replayBatchSize = 32, replayPrioritized = False, **kwargs):
         """
         Args:
             actionFn: A function which takes a state and returns the list of legal actions.
@@ -23,6 +31,11 @@ class ReinforcementAgent(ValueEstimationAgent):
             epsilon: The exploration rate.
             gamma: The discount factor.
             numTraining: The number of training episodes.
+            learningFile: Where to save what was learned when training is done.
+            resume: Start by loading what was learned from learningFile (if it exists).
+            replayCapacity: How many transitions to remember for replay (0 for no replay).
+            replayBatchSize: How many transitions to replay after each observed transition.
+            replayPrioritized: Replay transitions with large TD errors more often.
         """
         super().__init__(index, **kwargs)
 
@@ -38,6 +51,15 @@ class ReinforcementAgent(ValueEstimationAgent):
         self.alpha = float(alpha)
         self.discountRate = float(gamma)
 
+        self.learningFile = learningFile
+        self.resume = bool(int(resume))
+
+        self.replayBatchSize = int(replayBatchSize)
+        self.replayMemory = None
+        if (int(replayCapacity) > 0):
+            self.replayMemory = ReplayMemory(int(replayCapacity),
+                    prioritized = bool(int(replayPrioritized)))
+
     @abc.abstractmethod
     def update(self, state, action, nextState, reward):
         """
@@ -46,6 +68,30 @@ class ReinforcementAgent(ValueEstimationAgent):
 
         pass
 
+    def encodeTransition(self, state, action, nextState, reward):
+        """
+        Get what the replay memory keeps for a transition.
+        Agents should override this (and replayTransition)
+        to keep only what their updates need instead of whole states.
+        """
+
+        return (state, action, nextState, reward)
+
+    def load(self, path):
+        """
+        Load what was learned (e.g. Q-values) from a file written by `ReinforcementAgent.save`.
+        Agents that can resume training should override this (and save).
+        """
+
+        raise NotImplementedError("%s can't load what it learned." % (type(self).__name__))
+
+    def save(self, path):
+        """
+        Save what was learned to a file.
+        """
+
+        raise NotImplementedError("%s can't save what it learned." % (type(self).__name__))
+
     def getAlpha(self):
         return self.alpha
 
@@ -76,6 +122,35 @@ class ReinforcementAgent(ValueEstimationAgent):
         self.episodeRewards += deltaReward
         self.update(state, action, nextState, deltaReward)
 
+        # Once training is over nothing is learned (alpha is 0), so there is nothing to replay.
+        if (self.replayMemory is not None and self.isInTraining()):
+            self.replayMemory.add(self.encodeTransition(state, action, nextState, deltaReward))
+            self.replay()
+
+    def replay(self, batchSize = None):
+        """
+        Replay a mini-batch of transitions from the replay memory (if there is one).
+        """
+
+        if (self.replayMemory is None):
+            return
+
+        if (batchSize is None):
+            batchSize = self.replayBatchSize
+
+        slots, transitions = self.replayMemory.sample(batchSize)
+        errors = [self.replayTransition(transition) for transition in transitions]
+        self.replayMemory.updatePriorities(slots, errors)
+
+    def replayTransition(self, transition):
+        """
+        Learn from a transition made by `ReinforcementAgent.encodeTransition`.
+        Returns the TD error (used as the transition's priority), or None if it is not known.
+        """
+
+        self.update(*transition)
+        return None
+
     def startEpisode(self):
         """
         Called by environment when a new episode is starting.
@@ -85,6 +160,11 @@ class ReinforcementAgent(ValueEstimationAgent):
         self.lastAction = None
         self.episodeRewards = 0.0
 
+        if (self.episodesSoFar == 0 and self.resume and self.learningFile is not None
+                and os.path.isfile(self.learningFile)):
+            logging.info('Resuming from what was learned in %s.' % (self.learningFile))
+            self.load(self.learningFile)
+
     def stopEpisode(self):
         """
         Called by environment when an episode is done.
@@ -101,6 +181,10 @@ class ReinforcementAgent(ValueEstimationAgent):
             self.epsilon = 0.0  # No exploration.
             self.alpha = 0.0  # No learning.
 
+        if (self.episodesSoFar == self.numTraining and self.learningFile is not None):
+            logging.info('Saving what was learned to %s.' % (self.learningFile))
+            self.save(self.learningFile)
+
     def isInTraining(self):
         return (self.episodesSoFar < self.numTraining)
 
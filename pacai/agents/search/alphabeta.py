@@ -0,0 +1,531 @@
+"""
+A reusable alpha-beta search engine for multi-agent games (pacman and capture).
+
+The engine searches with iterative deepening until a hard deadline,
+so it always has an answer ready (the best action from the deepest finished iteration).
+Positions are cached in a bounded transposition table keyed on the (Zobrist) state hashes,
+and the best actions from the table and from the previous iteration are searched first
+to make the most of alpha-beta pruning.
+
+Depths are measured in plies (a single agent's move),
+so a full round of a game with n agents is n plies.
+
+`ParallelAlphaBetaSearch` splits the root actions across a pool of processes,
+which share their evaluations through a `SharedEvaluationCache`.
+"""
+
+import logging
+import math
+import multiprocessing
+import struct
+import time
+
+from pacai.agents.search.multiagent import MultiAgentSearchAgent
+from pacai.core.directions import Directions
+from pacai.util import zobrist
+
+DEFAULT_TABLE_SIZE = 2**18
+DEFAULT_CACHE_SIZE = 2**20
+
+# Check the clock every this many nodes.
+DEADLINE_CHECK_INTERVAL = 128
+
+# How long to wait past the deadline for parallel workers to report back.
+RESULT_GRACE_TIME = 0.05
+
+# How a stored value relates to the real value of a position.
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+_DOUBLE = struct.Struct('=d')
+_UINT = struct.Struct('=Q')
+
+# The search in a parallel worker process (see _initWorker()).
+_workerSearch = None
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when the deadline has passed.
+    """
+
+    pass
+
+class TranspositionTable(object):
+    """
+    A fixed size table of search results.
+    Each key maps to a single slot,
+    and a slot is only replaced by a different position or a search that is at least as deep.
+    """
+
+    def __init__(self, size = DEFAULT_TABLE_SIZE):
+        self._size = int(size)
+        self._entries = [None] * self._size
+
+    def clear(self):
+        self._entries = [None] * self._size
+
+    def get(self, key):
+        """
+        Get the (depth, value, bound, action) stored for the key, or None.
+        """
+
+        entry = self._entries[key % self._size]
+        if (entry is None or entry[0] != key):
+            return None
+
+        return entry[1:]
+
+    def put(self, key, depth, value, bound, action):
+        index = key % self._size
+
+        entry = self._entries[index]
+        if (entry is not None and entry[0] == key and entry[1] > depth):
+            return
+
+        self._entries[index] = (key, depth, value, bound, action)
+
+class SharedEvaluationCache(object):
+    """
+    A fixed size cache of evaluations (keyed on state hashes) in shared memory,
+    so every process of a parallel search can reuse the evaluations the others computed.
+    The cache must be created before the processes (and passed to them when they start).
+
+    Slots are written without locks.
+    Each slot stores (key XOR value bits, value bits),
+    so a slot that is mangled by two processes writing at the same time just fails to match.
+    """
+
+    def __init__(self, size = DEFAULT_CACHE_SIZE):
+        self._size = int(size)
+        self._slots = multiprocessing.RawArray('Q', 2 * self._size)
+
+    def get(self, key):
+        """
+        Get the cached value for the key, or None.
+        """
+
+        index = 2 * (key % self._size)
+        bits = self._slots[index + 1]
+
+        if (self._slots[index] ^ bits != key):
+            return None
+
+        return _DOUBLE.unpack(_UINT.pack(bits))[0]
+
+    def put(self, key, value):
+        index = 2 * (key % self._size)
+        bits = _UINT.unpack(_DOUBLE.pack(value))[0]
+
+        self._slots[index + 1] = bits
+        self._slots[index] = key ^ bits
+
+class AlphaBetaSearch(object):
+    """
+    An iterative deepening alpha-beta search.
+
+    The agents whose indexes are in maxAgents maximize the evaluation,
+    and all other agents minimize it.
+    The evaluation function is called on leaves (and finished games)
+    and should score a state from the perspective of the maximizing agents.
+
+    Searching applies and undoes actions on the given state (see
+    `pacai.core.gamestate.AbstractGameState.applyAction`),
+    so the state is back to how it started when the search returns.
+    """
+
+    def __init__(self, evaluationFunction, maxAgents, tableSize = DEFAULT_TABLE_SIZE,
+            evaluationCache = None):
+        self._evaluationFunction = evaluationFunction
+        self._maxAgents = frozenset(maxAgents)
+        self._table = TranspositionTable(tableSize)
+        self._evaluationCache = evaluationCache
+
+        self._deadline = None
+        self._nodes = 0
+        self._moveKeys = []
+
+        # Stats about the last search.
+        self.lastDepth = 0
+        self.lastNodes = 0
+        self.lastValue = None
+
+    def close(self):
+        """
+        Nothing to shut down, but matches `ParallelAlphaBetaSearch.close`.
+        """
+
+        pass
+
+    def getTable(self):
+        return self._table
+
+    def search(self, state, agentIndex, deadline, maxDepth = None):
+        """
+        Get the best action for the agent by searching deeper and deeper until
+        the deadline (in seconds since the epoch, like `time.time()`) or the max depth.
+        """
+
+        self._deadline = deadline
+        self._nodes = 0
+        self._moveKeys = [zobrist.getKey('toMove', index) for index in range(state.getNumAgents())]
+
+        actions = self._orderActions(state.getLegalActions(agentIndex), None)
+        if (len(actions) == 0):
+            return None
+
+        bestAction = actions[0]
+        self.lastDepth = 0
+        self.lastValue = None
+
+        depth = 0
+        while (maxDepth is None or depth < maxDepth):
+            depth += 1
+
+            try:
+                value, actions = self._searchRoot(state, agentIndex, depth, actions)
+            except SearchTimeout:
+                break
+
+            bestAction = actions[0]
+            self.lastDepth = depth
+            self.lastValue = value
+
+        self.lastNodes = self._nodes
+        logging.debug('Alpha-beta search reached depth %d (%d nodes), best action: %s.' %
+                (self.lastDepth, self.lastNodes, bestAction))
+
+        return bestAction
+
+    def searchActions(self, state, agentIndex, actions, deadline, maxDepth = None):
+        """
+        Search the states after the agent takes each of the actions with iterative deepening
+        (all the actions are searched at one depth before moving on to the next).
+        The state itself is not changed.
+        Returns a list (one per action) of the action's value at each depth
+        (counting the action as the first ply) that finished before the deadline.
+        """
+
+        self._deadline = deadline
+        self._nodes = 0
+        self._moveKeys = [zobrist.getKey('toMove', index) for index in range(state.getNumAgents())]
+
+        nextAgent = (agentIndex + 1) % state.getNumAgents()
+        results = [[] for action in actions]
+
+        depth = 0
+        try:
+            while (maxDepth is None or depth < maxDepth):
+                depth += 1
+
+                for (action, values) in zip(actions, results):
+                    undo = state.applyAction(agentIndex, action, trusted = True)
+                    try:
+                        values.append(self._search(state, nextAgent, depth - 1,
+                                -math.inf, math.inf))
+                    finally:
+                        state.undoAction(undo)
+        except SearchTimeout:
+            pass
+
+        self.lastNodes = self._nodes
+        self.lastDepth = min([len(values) for values in results])
+
+        return results
+
+    def start(self):
+        """
+        Nothing to start, but matches `ParallelAlphaBetaSearch.start`.
+        """
+
+        pass
+
+    def _checkDeadline(self):
+        self._nodes += 1
+
+        if (self._nodes % DEADLINE_CHECK_INTERVAL == 0 and time.time() >= self._deadline):
+            raise SearchTimeout()
+
+    def _evaluate(self, state):
+        if (self._evaluationCache is None):
+            return self._evaluationFunction(state)
+
+        key = hash(state)
+
+        value = self._evaluationCache.get(key)
+        if (value is None):
+            value = self._evaluationFunction(state)
+            self._evaluationCache.put(key, value)
+
+        return value
+
+    def _getKey(self, state, agentIndex):
+        return hash(state) ^ self._moveKeys[agentIndex]
+
+    def _orderActions(self, actions, firstAction):
+        """
+        Put the first action (usually the best from a previous search) first,
+        and stopping last.
+        """
+
+        ordered = [action for action in actions
+                if (action != firstAction and action != Directions.STOP)]
+
+        if (firstAction in actions):
+            ordered.insert(0, firstAction)
+
+        if (Directions.STOP in actions and firstAction != Directions.STOP):
+            ordered.append(Directions.STOP)
+
+        return ordered
+
+    def _searchRoot(self, state, agentIndex, depth, actions):
+        """
+        Search all the root actions (in the given order).
+        Returns the best value and the actions ordered from best to worst,
+        which is the order the next iteration will search them in.
+        """
+
+        maximizing = (agentIndex in self._maxAgents)
+        nextAgent = (agentIndex + 1) % state.getNumAgents()
+
+        alpha = -math.inf
+        beta = math.inf
+
+        values = []
+        for action in actions:
+            undo = state.applyAction(agentIndex, action, trusted = True)
+            try:
+                value = self._search(state, nextAgent, depth - 1, alpha, beta)
+            finally:
+                state.undoAction(undo)
+
+            values.append((value, action))
+
+            if (maximizing):
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+
+        # Sort is stable, so ties keep their previous order.
+        if (maximizing):
+            values.sort(key = lambda pair: -pair[0])
+        else:
+            values.sort(key = lambda pair: pair[0])
+
+        bestValue = values[0][0]
+        self._table.put(self._getKey(state, agentIndex), depth, bestValue, EXACT, values[0][1])
+
+        return bestValue, [action for (value, action) in values]
+
+    def _search(self, state, agentIndex, depth, alpha, beta):
+        self._checkDeadline()
+
+        if (depth <= 0 or state.isOver()):
+            return self._evaluate(state)
+
+        key = self._getKey(state, agentIndex)
+        tableAction = None
+
+        entry = self._table.get(key)
+        if (entry is not None):
+            entryDepth, value, bound, tableAction = entry
+
+            if (entryDepth >= depth):
+                if (bound == EXACT):
+                    return value
+                elif (bound == LOWER_BOUND and value >= beta):
+                    return value
+                elif (bound == UPPER_BOUND and value <= alpha):
+                    return value
+
+        actions = self._orderActions(state.getLegalActions(agentIndex), tableAction)
+
+        maximizing = (agentIndex in self._maxAgents)
+        nextAgent = (agentIndex + 1) % state.getNumAgents()
+
+        originalAlpha = alpha
+        originalBeta = beta
+
+        bestAction = None
+        if (maximizing):
+            bestValue = -math.inf
+        else:
+            bestValue = math.inf
+
+        for action in actions:
+            undo = state.applyAction(agentIndex, action, trusted = True)
+            try:
+                value = self._search(state, nextAgent, depth - 1, alpha, beta)
+            finally:
+                state.undoAction(undo)
+
+            if (maximizing):
+                if (bestAction is None or value > bestValue):
+                    bestValue = value
+                    bestAction = action
+
+                alpha = max(alpha, bestValue)
+            else:
+                if (bestAction is None or value < bestValue):
+                    bestValue = value
+                    bestAction = action
+
+                beta = min(beta, bestValue)
+
+            if (alpha >= beta):
+                break
+
+        if (bestValue <= originalAlpha):
+            bound = UPPER_BOUND
+        elif (bestValue >= originalBeta):
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT
+
+        self._table.put(key, depth, bestValue, bound, bestAction)
+
+        return bestValue
+
+class ParallelAlphaBetaSearch(object):
+    """
+    A root-split version of `AlphaBetaSearch`.
+    Each root action is searched (with iterative deepening) on a pool of worker processes
+    until the deadline, and the best action at the deepest depth that every action finished is
+    returned.
+    If some workers miss the deadline, only the actions that were searched to at least one depth
+    are compared (and an arbitrary action is returned if none were).
+    Each worker keeps its own transposition table, but all of them share evaluations.
+
+    The pool is started by start() (or the first search), and should be shut down with close().
+    The evaluation function is sent to the workers once when they start.
+    """
+
+    def __init__(self, evaluationFunction, maxAgents, numWorkers,
+            tableSize = DEFAULT_TABLE_SIZE, cacheSize = DEFAULT_CACHE_SIZE):
+        self._evaluationFunction = evaluationFunction
+        self._maxAgents = frozenset(maxAgents)
+        self._numWorkers = int(numWorkers)
+        self._tableSize = tableSize
+        self._cacheSize = cacheSize
+
+        self._pool = None
+
+        # Stats about the last search.
+        self.lastDepth = 0
+        self.lastValue = None
+
+    def close(self):
+        if (self._pool is not None):
+            self._pool.terminate()
+            self._pool = None
+
+    def search(self, state, agentIndex, deadline, maxDepth = None):
+        """
+        Same as `AlphaBetaSearch.search`.
+        Results that do not come back from the workers by the deadline (plus a small grace period)
+        are ignored.
+        """
+
+        self.lastDepth = 0
+        self.lastValue = None
+
+        # There is nothing to think about with one action.
+        actions = state.getLegalActions(agentIndex)
+        if (len(actions) <= 1):
+            return next(iter(actions), None)
+
+        self.start()
+
+        # Deal the actions out to the workers, so they are all searched at the same time.
+        numJobs = min(self._numWorkers, len(actions))
+        jobActions = [actions[i::numJobs] for i in range(numJobs)]
+        jobs = [self._pool.apply_async(_searchActionsInWorker,
+                (state, agentIndex, assigned, deadline, maxDepth)) for assigned in jobActions]
+
+        actions = []
+        results = []
+        for (assigned, job) in zip(jobActions, jobs):
+            try:
+                jobResults = job.get(max(0.0, deadline - time.time()) + RESULT_GRACE_TIME)
+            except multiprocessing.TimeoutError:
+                jobResults = [[] for action in assigned]
+
+            actions += assigned
+            results += jobResults
+
+        # Actions whose worker did not finish even one depth by the deadline are left out.
+        finished = [(result, action) for (result, action) in zip(results, actions)
+                if (len(result) > 0)]
+        if (len(finished) == 0):
+            return actions[0]
+
+        self.lastDepth = min([len(result) for (result, action) in finished])
+
+        depthIndex = self.lastDepth - 1
+        values = [(result[depthIndex], action) for (result, action) in finished]
+        if (agentIndex in self._maxAgents):
+            self.lastValue, bestAction = max(values, key = lambda pair: pair[0])
+        else:
+            self.lastValue, bestAction = min(values, key = lambda pair: pair[0])
+
+        logging.debug('Parallel alpha-beta search reached depth %d, best action: %s.' %
+                (self.lastDepth, bestAction))
+
+        return bestAction
+
+    def start(self):
+        if (self._pool is not None):
+            return
+
+        cache = SharedEvaluationCache(self._cacheSize)
+        self._pool = multiprocessing.Pool(self._numWorkers, initializer = _initWorker,
+                initargs = (self._evaluationFunction, self._maxAgents, self._tableSize, cache))
+
+class IterativeDeepeningAgent(MultiAgentSearchAgent):
+    """
+    A pacman agent that uses `AlphaBetaSearch`.
+    Each move searches deeper and deeper (up to the tree depth, in full rounds of all the agents)
+    until the move time (in seconds) is up.
+    With parallel set to more than one, the root actions are searched on that many processes.
+    """
+
+    def __init__(self, index, depth = 10, moveTime = 0.5, tableSize = DEFAULT_TABLE_SIZE,
+            parallel = 1, **kwargs):
+        super().__init__(index, depth = depth, **kwargs)
+
+        self._moveTime = float(moveTime)
+        self._search = createSearch(self.getEvaluationFunction(), [self.index],
+                int(parallel), tableSize = int(tableSize))
+
+    def final(self, state):
+        self._search.close()
+
+    def getAction(self, state):
+        deadline = time.time() + self._moveTime
+        maxDepth = self.getTreeDepth() * state.getNumAgents()
+
+        return self._search.search(state, self.index, deadline, maxDepth)
+
+    def registerInitialState(self, state):
+        self._search.start()
+
+def createSearch(evaluationFunction, maxAgents, parallel, tableSize = DEFAULT_TABLE_SIZE):
+    """
+    Create an `AlphaBetaSearch`,
+    or a `ParallelAlphaBetaSearch` if parallel (the number of processes) is more than one.
+    """
+
+    if (parallel > 1):
+        return ParallelAlphaBetaSearch(evaluationFunction, maxAgents, parallel,
+                tableSize = tableSize)
+
+    return AlphaBetaSearch(evaluationFunction, maxAgents, tableSize = tableSize)
+
+def _initWorker(evaluationFunction, maxAgents, tableSize, cache):
+    global _workerSearch
+    _workerSearch = AlphaBetaSearch(evaluationFunction, maxAgents, tableSize = tableSize,
+            evaluationCache = cache)
+
+def _searchActionsInWorker(state, agentIndex, actions, deadline, maxDepth):
+    return _workerSearch.searchActions(state, agentIndex, actions, deadline, maxDepth)
@@ -0,0 +1,260 @@
+"""
+A Monte Carlo tree search (MCTS) engine for multi-agent games (pacman and capture).
+
+Each iteration walks down the tree picking actions with UCT (upper confidence bounds),
+adds one new node, plays random moves (a rollout) for a few plies,
+and then backs the evaluation of the final state up the path.
+All of this happens on a single state by applying and undoing actions
+(see `pacai.core.gamestate.AbstractGameState.applyAction`),
+so no successor states are created.
+
+The tree is kept between moves: when the next search starts,
+the node for the new state (found by its hash) becomes the new root.
+"""
+
+import logging
+import math
+import random
+import time
+
+from pacai.agents.search.multiagent import MultiAgentSearchAgent
+from pacai.core.directions import Directions
+
+DEFAULT_EXPLORATION = math.sqrt(2)
+DEFAULT_ROLLOUT_DEPTH = 20
+
+class Node(object):
+    """
+    A node in the search tree.
+    Values are totals from the perspective of the maximizing agents.
+    """
+
+    __slots__ = ('agentIndex', 'stateHash', 'children', 'untried', 'visits', 'totalValue')
+
+    def __init__(self, agentIndex, stateHash, actions):
+        self.agentIndex = agentIndex
+        self.stateHash = stateHash
+        self.children = {}
+        self.untried = list(actions)
+        self.visits = 0
+        self.totalValue = 0.0
+
+class MonteCarloTreeSearch(object):
+    """
+    The agents whose indexes are in maxAgents maximize the evaluation,
+    and all other agents minimize it.
+    The evaluation function is called at the end of each rollout
+    and should score a state from the perspective of the maximizing agents.
+    """
+
+    def __init__(self, evaluationFunction, maxAgents, exploration = DEFAULT_EXPLORATION,
+            rolloutDepth = DEFAULT_ROLLOUT_DEPTH, rng = None):
+        self._evaluationFunction = evaluationFunction
+        self._maxAgents = frozenset(maxAgents)
+        self._exploration = exploration
+        self._rolloutDepth = rolloutDepth
+
+        self._rng = rng
+        if (self._rng is None):
+            self._rng = random.Random(random.random())
+
+        self._root = None
+
+        # The range of values seen so far, used to scale values for UCT.
+        self._minValue = math.inf
+        self._maxValue = -math.inf
+
+        # Stats about the last search and all searches.
+        self.lastRollouts = 0
+        self.lastTime = 0.0
+        self.totalRollouts = 0
+        self.totalTime = 0.0
+
+    def getRolloutsPerSecond(self):
+        """
+        Get the average throughput of all the searches so far.
+        """
+
+        if (self.totalTime <= 0.0):
+            return 0.0
+
+        return self.totalRollouts / self.totalTime
+
+    def search(self, state, agentIndex, deadline, maxRollouts = None):
+        """
+        Run iterations until the deadline (in seconds since the epoch, like `time.time()`)
+        or the max number of rollouts,
+        and return the most visited action for the agent.
+        The state is back to how it started when the search returns.
+        """
+
+        startTime = time.time()
+
+        actions = self._getActions(state, agentIndex)
+        if (len(actions) == 0):
+            return None
+
+        self._root = self._findRoot(state, agentIndex)
+
+        rollouts = 0
+        while (maxRollouts is None or rollouts < maxRollouts):
+            if (rollouts > 0 and time.time() >= deadline):
+                break
+
+            self._iterate(state)
+            rollouts += 1
+
+        self.lastRollouts = rollouts
+        self.lastTime = time.time() - startTime
+        self.totalRollouts += rollouts
+        self.totalTime += self.lastTime
+
+        children = self._root.children
+        bestAction = max(actions, key = lambda action: children[action].visits
+                if action in children else -1)
+
+        logging.debug('MCTS ran %d rollouts in %.3f seconds (%.0f rollouts/sec), best action: %s.'
+                % (rollouts, self.lastTime, rollouts / max(self.lastTime, 1e-9), bestAction))
+
+        return bestAction
+
+    def _backup(self, path, value):
+        self._minValue = min(self._minValue, value)
+        self._maxValue = max(self._maxValue, value)
+
+        for node in path:
+            node.visits += 1
+            node.totalValue += value
+
+    def _findRoot(self, state, agentIndex):
+        """
+        Find the node for this state in the previous tree
+        (within one round of moves of the old root), or start a new tree.
+        """
+
+        stateHash = hash(state)
+
+        if (self._root is not None):
+            frontier = [self._root]
+            for depth in range(state.getNumAgents() + 1):
+                for node in frontier:
+                    if (node.stateHash == stateHash and node.agentIndex == agentIndex):
+                        return node
+
+                frontier = [child for node in frontier for child in node.children.values()]
+
+        return Node(agentIndex, stateHash, self._getActions(state, agentIndex))
+
+    def _getActions(self, state, agentIndex):
+        """
+        Get the actions to search, leaving out stopping if there are any other choices.
+        """
+
+        actions = state.getLegalActions(agentIndex)
+        if (len(actions) > 1 and Directions.STOP in actions):
+            actions.remove(Directions.STOP)
+
+        return actions
+
+    def _iterate(self, state):
+        """
+        A single select, expand, rollout, and backup.
+        """
+
+        numAgents = state.getNumAgents()
+
+        node = self._root
+        path = [node]
+        undos = []
+
+        try:
+            # Select.
+            while (len(node.untried) == 0 and len(node.children) > 0 and not state.isOver()):
+                action, node = self._select(node)
+                undos.append(state.applyAction(path[-1].agentIndex, action, trusted = True))
+                path.append(node)
+
+            # Expand.
+            if (len(node.untried) > 0 and not state.isOver()):
+                action = node.untried.pop(self._rng.randrange(len(node.untried)))
+                undos.append(state.applyAction(node.agentIndex, action, trusted = True))
+
+                nextAgent = (node.agentIndex + 1) % numAgents
+                child = Node(nextAgent, hash(state), self._getActions(state, nextAgent))
+                node.children[action] = child
+
+                node = child
+                path.append(node)
+
+            # Rollout.
+            agentIndex = node.agentIndex
+            for ply in range(self._rolloutDepth):
+                if (state.isOver()):
+                    break
+
+                action = self._rng.choice(self._getActions(state, agentIndex))
+                undos.append(state.applyAction(agentIndex, action, trusted = True))
+                agentIndex = (agentIndex + 1) % numAgents
+
+            value = self._evaluationFunction(state)
+        finally:
+            for undo in reversed(undos):
+                state.undoAction(undo)
+
+        self._backup(path, value)
+
+    def _select(self, node):
+        """
+        Pick the child with the best upper confidence bound (UCT) for the agent to move.
+        """
+
+        scale = self._maxValue - self._minValue
+        if (scale <= 0.0):
+            scale = 1.0
+
+        sign = 1.0
+        if (node.agentIndex not in self._maxAgents):
+            sign = -1.0
+
+        logVisits = math.log(node.visits)
+
+        bestScore = -math.inf
+        best = None
+
+        for (action, child) in node.children.items():
+            # Scale the mean value to [0, 1] (for the agent choosing) so it is comparable
+            # with the exploration term.
+            mean = (child.totalValue / child.visits - self._minValue) / scale
+            if (sign < 0.0):
+                mean = 1.0 - mean
+
+            score = mean + self._exploration * math.sqrt(logVisits / child.visits)
+            if (score > bestScore):
+                bestScore = score
+                best = (action, child)
+
+        return best
+
+class MonteCarloAgent(MultiAgentSearchAgent):
+    """
+    A pacman agent that uses `MonteCarloTreeSearch`.
+    Each move runs rollouts until the move time (in seconds) is up.
+    The evaluation function scores the end of each rollout.
+    """
+
+    def __init__(self, index, moveTime = 0.5, exploration = DEFAULT_EXPLORATION,
+            rolloutDepth = DEFAULT_ROLLOUT_DEPTH, **kwargs):
+        super().__init__(index, **kwargs)
+
+        self._moveTime = float(moveTime)
+        self._search = MonteCarloTreeSearch(self.getEvaluationFunction(), [self.index],
+                exploration = float(exploration), rolloutDepth = int(rolloutDepth))
+
+    def final(self, state):
+        logging.info('MCTS ran %d rollouts in %.2f seconds (%.0f rollouts/sec).' %
+                (self._search.totalRollouts, self._search.totalTime,
+                self._search.getRolloutsPerSecond()))
+
+    def getAction(self, state):
+        deadline = time.time() + self._moveTime
+        return self._search.search(state, self.index, deadline)
@@ -56,13 +56,24 @@ def getParser(description, name):
             action = 'store', type = int, default = 0,
             help = 'set how many episodes of training (suppresses output) (default: %(default)s)')
 
+    parser.add_argument('--parallel', dest = 'parallel',
+            action = 'store', type = int, default = 1,
+            help = 'play games on this many processes at once (requires --null-graphics), '
+                + 'every game gets its own seed derived from --seed so results do not depend '
+                + 'on the number of processes (default: %(default)s)')
+
     parser.add_argument('--record', dest = 'record',
             action = 'store', type = str, default = None,
-            help = 'writes the moves of a game to the named pickle file (default: %(default)s)')
+            help = 'writes the moves of a game to the named replay file (default: %(default)s)')
 
     parser.add_argument('--replay', dest = 'replay',
             action = 'store', type = str, default = None,
-            help = 'load a recorded pickle game file to replay (default: %(default)s)')
+            help = 'load a recorded game file to replay (default: %(default)s)')
+
+    parser.add_argument('--legacy-replay', dest = 'legacyReplay',
+            action = 'store_true', default = False,
+            help = 'allow --replay to load legacy pickled replays, '
+                + 'which can run arbitrary code (only use trusted files) (default: %(default)s)')
 
     parser.add_argument('--sprites', dest = 'spritesPath',
             action = 'store', type = str, default = view.DEFAULT_SPRITES,
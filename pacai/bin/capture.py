@@ -7,7 +7,6 @@ On your opponents side of the map, you are a pacman and can eat food and capsule
 
 import logging
 import os
-import pickle
 import random
 import sys
 
@@ -21,12 +20,17 @@ from pacai.core.gamestate import AbstractGameState
 from pacai.core.grid import Grid
 from pacai.core.layout import Layout
 from pacai.core.layout import getLayout
+from pacai.core.replay import ReplayWriter
+from pacai.core.replay import loadReplay
 from pacai.ui.capture.null import CaptureNullView
 from pacai.ui.capture.text import CaptureTextView
 from pacai.util import reflection
 from pacai.util.logs import initLogging
 from pacai.util.logs import updateLoggingLevel
 from pacai.util.mazeGenerator import generateMaze
+from pacai.util.parallel import checkParallelOptions
+from pacai.util.parallel import getSeeds
+from pacai.util.parallel import runGamesInPool
 from pacai.util.util import nearestPoint
 
 COLLISION_TOLERANCE = 0.7  # How close ghosts must be to Pacman to kill
@@ -67,29 +71,7 @@ class CaptureGameState(AbstractGameState):
             else:
                 self._blueTeam.append(agentIndex)
 
-        # Build some denormalized structures for fast access.
-
-        self._redCapsules = []
-        self._blueCapsules = []
-
-        for capsule in self.getCapsules():
-            if (self.isOnRedSide(capsule)):
-                self._redCapsules.append(capsule)
-            else:
-                self._blueCapsules.append(capsule)
-
-        self._redFood = Grid(self._food.getWidth(), self._food.getHeight(), initialValue = False)
-        self._blueFood = Grid(self._food.getWidth(), self._food.getHeight(), initialValue = False)
-
-        for x in range(self._food.getWidth()):
-            for y in range(self._food.getHeight()):
-                if (not self._food[x][y]):
-                    continue
-
-                if (self.isOnRedSide((x, y))):
-                    self._redFood[x][y] = True
-                else:
-                    self._blueFood[x][y] = True
+        self._splitFoodAndCapsules()
 
     # Override
     def generateSuccessor(self, agentIndex, action):
@@ -131,9 +113,23 @@ class CaptureGameState(AbstractGameState):
         super().eatFood(x, y)
 
         if (self.isOnRedSide((x, y))):
-            self._redFood[x][y] = False
+            self._redFood.set(x, y, False)
         else:
-            self._blueFood[x][y] = False
+            self._blueFood.set(x, y, False)
+
+    # Override
+    def getCheckpoint(self):
+        checkpoint = super().getCheckpoint()
+        checkpoint['timeleft'] = self._timeleft
+
+        return checkpoint
+
+    # Override
+    def restoreCheckpoint(self, checkpoint):
+        super().restoreCheckpoint(checkpoint)
+
+        self._timeleft = checkpoint['timeleft']
+        self._splitFoodAndCapsules()
 
     def getBlueCapsules(self):
         """
@@ -224,21 +220,43 @@ class CaptureGameState(AbstractGameState):
 
         return self._teams[agentIndex]
 
-    def _applySuccessorAction(self, agentIndex, action):
+    # Override
+    def _applySuccessorAction(self, agentIndex, action, trusted = False):
         """
         Apply the action to the context state (self).
         """
 
         # Find appropriate rules for the agent.
-        AgentRules.applyAction(self, action, agentIndex)
+        AgentRules.applyAction(self, action, agentIndex, trusted)
         AgentRules.checkDeath(self, agentIndex)
-        AgentRules.decrementTimer(self.getAgentState(agentIndex))
+        AgentRules.decrementTimer(self.getMutableAgentState(agentIndex))
 
         # Book keeping.
         self._lastAgentMoved = agentIndex
         self._timeleft -= 1
 
-        self._hash = None
+    def _splitFoodAndCapsules(self):
+        """
+        Build some denormalized structures for fast access to each side's food and capsules.
+        """
+
+        self._redCapsules = []
+        self._blueCapsules = []
+
+        for capsule in self.getCapsules():
+            if (self.isOnRedSide(capsule)):
+                self._redCapsules.append(capsule)
+            else:
+                self._blueCapsules.append(capsule)
+
+        self._redFood = Grid(self._food.getWidth(), self._food.getHeight(), initialValue = False)
+        self._blueFood = Grid(self._food.getWidth(), self._food.getHeight(), initialValue = False)
+
+        for (x, y) in self._food.asList():
+            if (self.isOnRedSide((x, y))):
+                self._redFood.set(x, y, True)
+            else:
+                self._blueFood.set(x, y, True)
 
 class CaptureRules:
     """
@@ -342,20 +360,20 @@ class AgentRules:
         """
 
         agentState = state.getAgentState(agentIndex)
-        return Actions.getPossibleActions(agentState.getPosition(), agentState.getDirection(),
-                state.getWalls())
+        return state.getInitialLayout().getPossibleActions(agentState.getPosition(),
+                agentState.getDirection())
 
     @staticmethod
-    def applyAction(state, action, agentIndex):
+    def applyAction(state, action, agentIndex, trusted = False):
         """
         Edits the state to reflect the results of the action.
+        Trusted actions are assumed to be legal.
         """
 
-        legal = AgentRules.getLegalActions(state, agentIndex)
-        if (action not in legal):
+        if (not trusted and action not in AgentRules.getLegalActions(state, agentIndex)):
             raise ValueError('Illegal action: ' + str(action))
 
-        agentState = state.getAgentState(agentIndex)
+        agentState = state.getMutableAgentState(agentIndex)
 
         # Update position.
         vector = Actions.directionToVector(action, AgentRules.AGENT_SPEED)
@@ -414,7 +432,7 @@ class AgentRules:
                 otherTeam = state.getRedTeamIndices()
 
             for agentIndex in otherTeam:
-                state.getAgentState(agentIndex).setScaredTimer(SCARED_TIME)
+                state.getMutableAgentState(agentIndex).setScaredTimer(SCARED_TIME)
 
     @staticmethod
     def decrementTimer(agentState):
@@ -455,10 +473,10 @@ class AgentRules:
             # Otherwise, we are being eatten.
             if (agentState.isBraveGhost() or otherAgentState.isScaredGhost()):
                 state.addScore(teamPointModifier * KILL_POINTS)
-                otherAgentState.respawn()
+                state.getMutableAgentState(otherAgentIndex).respawn()
             else:
                 state.addScore(teamPointModifier * -KILL_POINTS)
-                agentState.respawn()
+                state.getMutableAgentState(agentIndex).respawn()
 
 #############################
 # FRAMEWORK TO START A GAME #
@@ -559,6 +577,8 @@ def readCommand(argv):
     elif options.debug:
         updateLoggingLevel(logging.DEBUG)
 
+    checkParallelOptions(options)
+
     viewOptions = {
         'gifFPS': options.gifFPS,
         'gifPath': options.gif,
@@ -619,19 +639,7 @@ def readCommand(argv):
         args['agents'][index] = agent
 
     # Choose a layout.
-    if options.layout.startswith('RANDOM'):
-        layoutSeed = None
-        if (options.layout != 'RANDOM'):
-            layoutSeed = int(options.layout[6:])
-
-        args['layout'] = Layout(generateMaze(layoutSeed).split('\n'))
-    elif options.layout.lower().find('capture') == -1:
-        raise ValueError('You must use a capture layout with capture.py.')
-    else:
-        args['layout'] = getLayout(options.layout)
-
-    if (args['layout'] is None):
-        raise ValueError('The layout ' + options.layout + ' cannot be found.')
+    args['layout'] = loadLayout(options.layout)
 
     args['length'] = options.maxMoves
     args['numGames'] = options.numGames
@@ -639,9 +647,33 @@ def readCommand(argv):
     args['record'] = options.record
     args['catchExceptions'] = options.catchExceptions
     args['replay'] = options.replay
+    args['legacyReplay'] = options.legacyReplay
+    args['parallel'] = options.parallel
+    args['seed'] = seed
 
     return args
 
+def loadLayout(name):
+    """
+    Load a capture layout by name, or generate one if the name is RANDOM<seed> (e.g. RANDOM23).
+    """
+
+    if name.startswith('RANDOM'):
+        layoutSeed = None
+        if (name != 'RANDOM'):
+            layoutSeed = int(name[6:])
+
+        layout = Layout(generateMaze(layoutSeed).split('\n'))
+    elif name.lower().find('capture') == -1:
+        raise ValueError('You must use a capture layout with capture.py.')
+    else:
+        layout = getLayout(name)
+
+    if (layout is None):
+        raise ValueError('The layout ' + name + ' cannot be found.')
+
+    return layout
+
 def loadAgents(isRed, agentModule, textgraphics, args):
     """
     Calls agent factories and returns lists of agents.
@@ -680,7 +712,7 @@ def replayGame(layout, agents, actions, display, length, redTeamName, blueTeamNa
     display.finish()
 
 def runGames(layout, agents, display, length, numGames, record, numTraining,
-        redTeamName, blueTeamName, catchExceptions = False, **kwargs):
+        redTeamName, blueTeamName, catchExceptions = False, seed = None, **kwargs):
     rules = CaptureRules()
     games = []
 
@@ -689,9 +721,18 @@ def runGames(layout, agents, display, length, numGames, record, numTraining,
         logging.info('Playing %d training games.' % numTraining)
         nullView = CaptureNullView()
 
+    # Each game starts from its own seed (the same one it gets with --parallel),
+    # so the results for a seed don't depend on the number of processes.
+    gameSeeds = None
+    if (seed is not None):
+        gameSeeds = getSeeds(seed, numGames)
+
     for i in range(numGames):
         isTraining = (i < numTraining)
 
+        if (gameSeeds is not None):
+            random.seed(gameSeeds[i])
+
         if (isTraining):
             # Suppress graphics for training.
             gameDisplay = nullView
@@ -699,47 +740,74 @@ def runGames(layout, agents, display, length, numGames, record, numTraining,
             gameDisplay = display
 
         g = rules.newGame(layout, agents, gameDisplay, length, catchExceptions)
-        g.run()
 
-        if (not isTraining):
-            games.append(g)
-
-        g.record = None
+        path = None
         if record:
-            components = {
-                'layout': layout,
-                'agents': [agent.__class__.__name__ for agent in agents],
-                'actions': g.moveHistory,
-                'length': length,
-                'redTeamName': redTeamName,
-                'blueTeamName': blueTeamName
-            }
-
             path = 'replay'
             if (isinstance(record, str)):
                 path = record
 
-            g.record = pickle.dumps(components)
-            with open(path, 'wb') as file:
-                file.write(g.record)
+            agentNames = [agent.__class__.__name__ for agent in agents]
+            g.replayWriter = ReplayWriter(path, layout, agents = agentNames, length = length,
+                    redTeamName = redTeamName, blueTeamName = blueTeamName)
+
+        try:
+            g.run()
+        finally:
+            if (g.replayWriter is not None):
+                g.replayWriter.close()
+
+        if (not isTraining):
+            games.append(g)
+
+        g.record = None
+        if (path is not None):
+            with open(path, 'rb') as file:
+                g.record = file.read()
 
             logging.info("Game recorded to: '%s'." % (path))
 
     if (numGames > 0):
-        scores = [game.state.getScore() for game in games]
-        redWinRate = [s > 0 for s in scores].count(True) / float(len(scores))
-        blueWinRate = [s < 0 for s in scores].count(True) / float(len(scores))
-        logging.info('Average Score:%s', sum(scores) / float(len(scores)))
-        logging.info('Scores:%s', ', '.join([str(score) for score in scores]))
-        logging.info('Red Win Rate: %d/%d (%.2f)' %
-                ([s > 0 for s in scores].count(True), len(scores), redWinRate))
-        logging.info('Blue Win Rate: %d/%d (%.2f)' %
-                ([s < 0 for s in scores].count(True), len(scores), blueWinRate))
-        logging.info('Record: %s',
-                ', '.join([('Blue', 'Tie', 'Red')[max(0, min(2, 1 + s))] for s in scores]))
+        _logResults([game.state.getScore() for game in games])
 
     return games
 
+def runParallelGames(argv, layout, numGames, parallel, seed, **kwargs):
+    """
+    Play independent games on a pool of `parallel` processes
+    (see `pacai.util.parallel.runGamesInPool`).
+    Returns a list of `pacai.core.game.GameResult`.
+    """
+
+    results = runGamesInPool(readCommand, _newParallelGame, argv, layout, numGames, parallel,
+            seed)
+
+    if (len(results) > 0):
+        _logResults([result.getScore() for result in results])
+
+    return results
+
+def _newParallelGame(args, layout):
+    rules = CaptureRules()
+    return rules.newGame(layout, args['agents'], args['display'], args['length'],
+            args['catchExceptions'])
+
+def _logResults(scores):
+    """
+    Log a summary of the scores of finished games.
+    """
+
+    redWinRate = [s > 0 for s in scores].count(True) / float(len(scores))
+    blueWinRate = [s < 0 for s in scores].count(True) / float(len(scores))
+    logging.info('Average Score:%s', sum(scores) / float(len(scores)))
+    logging.info('Scores:%s', ', '.join([str(score) for score in scores]))
+    logging.info('Red Win Rate: %d/%d (%.2f)' %
+            ([s > 0 for s in scores].count(True), len(scores), redWinRate))
+    logging.info('Blue Win Rate: %d/%d (%.2f)' %
+            ([s < 0 for s in scores].count(True), len(scores), blueWinRate))
+    logging.info('Record: %s',
+            ', '.join([('Blue', 'Tie', 'Red')[max(0, min(2, 1 + s))] for s in scores]))
+
 
 def main(argv):
     """
@@ -756,15 +824,15 @@ def main(argv):
     if (options['replay'] is not None):
         logging.info('Replaying recorded game %s.' % options['replay'])
 
-        recorded = None
-        with open(options['replay'], 'rb') as file:
-            recorded = pickle.load(file)
-
+        recorded = loadReplay(options['replay'], allowLegacy = options['legacyReplay'])
         recorded['display'] = options['display']
         replayGame(**recorded)
 
         return
 
+    if (options['parallel'] > 1):
+        return runParallelGames(argv, **options)
+
     return runGames(**options)
 
 if __name__ == '__main__':
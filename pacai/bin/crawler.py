@@ -2,22 +2,62 @@
 Binary for the crawler simulation.
 """
 
+import argparse
+import os
 import sys
+import textwrap
 
+from pacai.ui.crawler.gui import DEFAULT_DISCOUNT
+from pacai.ui.crawler.gui import DEFAULT_EPSILON
+from pacai.ui.crawler.gui import DEFAULT_LEARNING_RATE
 from pacai.ui.crawler.gui import run
+from pacai.ui.crawler.gui import runHeadless
 from pacai.util.logs import initLogging
 
 def _load_args(args):
     executable = args.pop(0)
-    if (len(args) > 1 or ({'h', 'help'} & {arg.lower().strip().replace('-', '') for arg in args})):
-        print("USAGE: python3 %s [max steps]" % (executable), file = sys.stderr)
-        sys.exit(1)
 
-    max_steps = None
-    if (len(args) > 0):
-        max_steps = int(args.pop(0))
+    description = """
+    DESCRIPTION:
+        This program will run a crawling robot that learns to move with Q-learning.
 
-    return max_steps
+    EXAMPLES:
+        (1) python -m pacai.bin.crawler
+            - Runs the crawler GUI until it is closed.
+        (2) python -m pacai.bin.crawler --headless 100000
+            - Trains the crawler for 100000 steps without a GUI, and reports the steps per second.
+    """
+
+    parser = argparse.ArgumentParser(description = textwrap.dedent(description),
+        prog = os.path.basename(executable), formatter_class = argparse.RawTextHelpFormatter)
+
+    parser.add_argument('max_steps', metavar = 'max steps',
+            action = 'store', type = int, nargs = '?', default = None,
+            help = 'stop after this many steps (required when headless)')
+
+    parser.add_argument('-e', '--epsilon', dest = 'epsilon',
+            action = 'store', type = float, default = DEFAULT_EPSILON,
+            help = 'chance of taking a random action when headless (default %(default)s)')
+
+    parser.add_argument('-l', '--learning-rate', dest = 'learning_rate',
+            action = 'store', type = float, default = DEFAULT_LEARNING_RATE,
+            help = 'the learning rate when headless (default %(default)s)')
+
+    parser.add_argument('-y', '--discount', dest = 'discount',
+            action = 'store', type = float, default = DEFAULT_DISCOUNT,
+            help = 'discount on future when headless (default %(default)s)')
+
+    parser.add_argument('--headless', dest = 'headless',
+            action = 'store_true', default = False,
+            help = 'train as fast as possible with no GUI, '
+                + 'and report the steps per second (default %(default)s)')
+
+    options = parser.parse_args(args)
+
+    if (options.headless and options.max_steps is None):
+        parser.error('max steps are required when headless.')
+
+    return options
 
 def main(argv):
     """
@@ -26,8 +66,14 @@ def main(argv):
     """
 
     initLogging()
-    max_steps = _load_args(argv)
-    sys.exit(run(max_steps = max_steps))
+    options = _load_args(argv)
+
+    if (options.headless):
+        runHeadless(options.max_steps, epsilon = options.epsilon,
+                discount = options.discount, learning_rate = options.learning_rate)
+        sys.exit(0)
+
+    sys.exit(run(max_steps = options.max_steps))
 
 if __name__ == '__main__':
     main(sys.argv)
@@ -4,8 +4,10 @@ import os
 import random
 import sys
 import textwrap
+import time
 
 from pacai.agents.learning.reinforcement import ReinforcementAgent
+from pacai.core import mdpSolvers
 from pacai.core.environment import Environment
 from pacai.core.mdp import MarkovDecisionProcess
 from pacai.student.qlearningAgents import QLearningAgent
@@ -15,7 +17,16 @@ from pacai.ui.gridworld.utils import wait_for_keys
 from pacai.util.logs import initLogging
 from pacai.util.logs import updateLoggingLevel
 
+STEP_LOG_FORMAT = '\nStarted in state: %s\nTook action: %s\nEnded in state: %s\nGot reward: %s\n'
+
 class Gridworld(MarkovDecisionProcess):
+    """
+    The states, actions, transitions, and rewards are each computed once and cached,
+    since planners ask for them over and over.
+    The caches are rebuilt when what they depend on is set
+    (the grid, the noise, or the living reward).
+    """
+
     def __init__(self, grid):
         # layout
         if (isinstance(grid, list)):
@@ -27,6 +38,42 @@ class Gridworld(MarkovDecisionProcess):
         self.livingReward = 0.0
         self.noise = 0.2
 
+    @property
+    def grid(self):
+        return self._grid
+
+    @grid.setter
+    def grid(self, grid):
+        """
+        Set the grid.
+        After changing the current grid in place, set it again to rebuild the caches.
+        """
+
+        self._grid = grid
+
+        self._states = None
+        self._actions = None
+        self._transitions = None
+        self._rewards = None
+
+    @property
+    def livingReward(self):
+        return self._livingReward
+
+    @livingReward.setter
+    def livingReward(self, reward):
+        self._livingReward = reward
+        self._rewards = None
+
+    @property
+    def noise(self):
+        return self._noise
+
+    @noise.setter
+    def noise(self, noise):
+        self._noise = noise
+        self._transitions = None
+
     def setLivingReward(self, reward):
         """
         The (negative) reward for exiting "normal" states.
@@ -54,29 +101,31 @@ class Gridworld(MarkovDecisionProcess):
         state under the special action "done".
         """
 
-        if state == self.grid.terminalState:
-            return ()
+        if (self._actions is None):
+            self._actions = {cachedState: self._computePossibleActions(cachedState)
+                    for cachedState in self.getStates()}
 
-        x, y = state
-        if isinstance(self.grid[x][y], int):
-            return ('exit', )
+        actions = self._actions.get(state)
+        if (actions is None):
+            actions = self._computePossibleActions(state)
 
-        return ('north', 'west', 'south', 'east')
+        return actions
 
     def getStates(self):
         """
         Return list of all states.
         """
 
-        # The true terminal state.
-        states = [self.grid.terminalState]
-        for x in range(self.grid.width):
-            for y in range(self.grid.height):
-                if self.grid[x][y] != '#':
-                    state = (x, y)
-                    states.append(state)
+        if (self._states is None):
+            # The true terminal state.
+            self._states = [self.grid.terminalState]
+            for x in range(self.grid.width):
+                for y in range(self.grid.height):
+                    if self.grid[x][y] != '#':
+                        state = (x, y)
+                        self._states.append(state)
 
-        return states
+        return list(self._states)
 
     def getReward(self, state, action, nextState):
         """
@@ -87,15 +136,15 @@ class Gridworld(MarkovDecisionProcess):
         less use this convention).
         """
 
-        if state == self.grid.terminalState:
-            return 0.0
+        if (self._rewards is None):
+            self._rewards = {cachedState: self._computeReward(cachedState)
+                    for cachedState in self.getStates()}
 
-        x, y = state
-        cell = self.grid[x][y]
-        if isinstance(cell, int) or isinstance(cell, float):
-            return cell
+        reward = self._rewards.get(state)
+        if (reward is None):
+            reward = self._computeReward(state)
 
-        return self.livingReward
+        return reward
 
     def getStartState(self):
         for x in range(self.grid.width):
@@ -124,6 +173,41 @@ class Gridworld(MarkovDecisionProcess):
         with their transition probabilities.
         """
 
+        if (self._transitions is None):
+            self._transitions = {}
+            for cachedState in self.getStates():
+                for cachedAction in self.getPossibleActions(cachedState):
+                    successors = self._computeTransitionStatesAndProbs(cachedState, cachedAction)
+                    self._transitions[(cachedState, cachedAction)] = successors
+
+        successors = self._transitions.get((state, action))
+        if (successors is None):
+            successors = self._computeTransitionStatesAndProbs(state, action)
+
+        return list(successors)
+
+    def _computePossibleActions(self, state):
+        if state == self.grid.terminalState:
+            return ()
+
+        x, y = state
+        if isinstance(self.grid[x][y], int):
+            return ('exit', )
+
+        return ('north', 'west', 'south', 'east')
+
+    def _computeReward(self, state):
+        if state == self.grid.terminalState:
+            return 0.0
+
+        x, y = state
+        cell = self.grid[x][y]
+        if isinstance(cell, int) or isinstance(cell, float):
+            return cell
+
+        return self.livingReward
+
+    def _computeTransitionStatesAndProbs(self, state, action):
         if action not in self.getPossibleActions(state):
             raise Exception('Illegal action!')
 
@@ -347,12 +431,7 @@ def runEpisode(agent, environment, discount, decision, display, message, pause,
 
         # EXECUTE ACTION
         nextState, reward = environment.doAction(action)
-        logString = ''
-        logString += '\nStarted in state: ' + str(state)
-        logString += '\nTook action: ' + str(action)
-        logString += '\nEnded in state: ' + str(nextState)
-        logString += '\nGot reward: ' + str(reward) + '\n'
-        logging.debug(logString)
+        logging.debug(STEP_LOG_FORMAT, state, action, nextState, reward)
 
         # Update learner.
         if (isinstance(agent, ReinforcementAgent)):
@@ -364,6 +443,57 @@ def runEpisode(agent, environment, discount, decision, display, message, pause,
     if (isinstance(agent, ReinforcementAgent)):
         agent.stopEpisode()
 
+def runHeadlessEpisodes(agent, environment, discount, decision, episodes):
+    """
+    Run episodes like runEpisode(), but without any display, pause, or message callbacks,
+    and only logging each step when debug logging is on.
+    Returns the total of the episodes' (discounted) returns and the number of steps taken.
+    """
+
+    isLearner = isinstance(agent, ReinforcementAgent)
+    logSteps = logging.getLogger().isEnabledFor(logging.DEBUG)
+
+    getPossibleActions = environment.getPossibleActions
+    doAction = environment.doAction
+
+    totalReturns = 0.0
+    steps = 0
+
+    for episode in range(1, episodes + 1):
+        returns = 0.0
+        totalDiscount = 1.0
+        environment.reset()
+
+        if (isLearner):
+            agent.startEpisode()
+
+        state = environment.getCurrentState()
+        while (len(getPossibleActions(state)) > 0):
+            action = decision(state)
+            if (action is None):
+                raise Exception('Error: Agent returned None action')
+
+            nextState, reward = doAction(action)
+            if (logSteps):
+                logging.debug(STEP_LOG_FORMAT, state, action, nextState, reward)
+
+            if (isLearner):
+                agent.observeTransition(state, action, nextState, reward)
+
+            returns += reward * totalDiscount
+            totalDiscount *= discount
+            steps += 1
+
+            state = nextState
+
+        if (isLearner):
+            agent.stopEpisode()
+
+        logging.debug('EPISODE %d COMPLETE: RETURN WAS %s', episode, returns)
+        totalReturns += returns
+
+    return totalReturns, steps
+
 def parseOptions(argv):
     """
     Processes the command used to run gridworld from the command line.
@@ -439,6 +569,11 @@ def parseOptions(argv):
             action = 'store', type = float, default = 0.9,
             help = 'discount on future (default %(default)s)')
 
+    parser.add_argument('--headless', dest = 'headless',
+            action = 'store_true', default = False,
+            help = 'run episodes as fast as possible with no display, '
+                + 'and report the steps per second (default %(default)s)')
+
     parser.add_argument('--manual', dest = 'manual',
             action = 'store_true', default = False,
             help = 'manually control agent (default %(default)s)')
@@ -447,10 +582,19 @@ def parseOptions(argv):
             action = 'store_true', default = False,
             help = 'generate no graphics (default: %(default)s)')
 
+    parser.add_argument('--solver', dest = 'solver',
+            action = 'store', type = str, default = 'value',
+            choices = sorted(mdpSolvers.SOLVERS),
+            help = 'how the value agent solves the MDP (default %(default)s)')
+
     parser.add_argument('--text-graphics', dest = 'textGraphics',
             action = 'store_true', default = False,
             help = 'display output as text only (default: %(default)s)')
 
+    parser.add_argument('--tolerance', dest = 'tolerance',
+            action = 'store', type = float, default = 0.0,
+            help = 'stop solving once no value changes by more than this (default %(default)s)')
+
     parser.add_argument('--window-size', dest = 'gridSize',
             action = 'store', type = int, default = 150,
             help = 'request a window width of X pixels *per grid cell* (default %(default)s)')
@@ -469,11 +613,17 @@ def parseOptions(argv):
     elif options.debug:
         updateLoggingLevel(logging.DEBUG)
 
+    if options.headless and options.manual:
+        raise ValueError('Headless mode cannot be controlled manually.')
+
     if options.manual and options.agent != 'q':
         logging.info('Disabling Agents in Manual Mode.')
         options.agent = None
 
     # MANAGE CONFLICTS
+    if options.headless:
+        options.nullGraphics = True
+
     if options.textGraphics or options.nullGraphics:
         options.pause = False
 
@@ -505,12 +655,14 @@ def main(argv):
     # GET THE DISPLAY ADAPTER
     ###########################
 
-    display = TextGridworldDisplay(mdp)
-    if not opts.textGraphics and not opts.nullGraphics:
-        from pacai.ui.gridworld.gui import GraphicsGridworldDisplay
-        display = GraphicsGridworldDisplay(mdp, opts.gridSize, opts.speed)
+    display = None
+    if (not opts.headless):
+        display = TextGridworldDisplay(mdp)
+        if not opts.textGraphics and not opts.nullGraphics:
+            from pacai.ui.gridworld.gui import GraphicsGridworldDisplay
+            display = GraphicsGridworldDisplay(mdp, opts.gridSize, opts.speed)
 
-    display.start()
+        display.start()
 
     ###########################
     # GET THE AGENT
@@ -518,7 +670,10 @@ def main(argv):
 
     a = None
     if (opts.agent == 'value'):
-        a = ValueIterationAgent(0, mdp, opts.discount, opts.iters)
+        a = ValueIterationAgent(0, mdp, opts.discount, opts.iters,
+                tolerance = opts.tolerance, solver = opts.solver)
+        logging.info('Solved the MDP with %s: %d iterations, %d backups, %.3f seconds.',
+                opts.solver, a.solution.iterations, a.solution.backups, a.solution.seconds)
     elif (opts.agent == 'q'):
         qLearnOpts = {
             'gamma': opts.discount,
@@ -558,11 +713,16 @@ def main(argv):
     # RUN EPISODES
     ###########################
 
+    if (opts.headless):
+        _runHeadless(a, env, opts)
+        return
+
     # Display q/v values before simulation of episodes.
     if (not opts.manual and opts.agent == 'value'):
         if (opts.valueSteps):
             for i in range(opts.iters):
-                tempAgent = ValueIterationAgent(0, mdp, opts.discount, i)
+                tempAgent = ValueIterationAgent(0, mdp, opts.discount, i,
+                        tolerance = opts.tolerance, solver = opts.solver)
                 display.displayValues(tempAgent, message = 'VALUES AFTER ' + str(i) + ' ITERATIONS')
                 display.pause()
 
@@ -618,6 +778,20 @@ def main(argv):
         display.displayValues(a, message = 'VALUES AFTER ' + str(opts.episodes) + ' EPISODES')
         display.pause()
 
+def _runHeadless(agent, environment, opts):
+    logging.info('Running %d episodes headless.', opts.episodes)
+
+    startTime = time.time()
+    returns, steps = runHeadlessEpisodes(agent, environment, opts.discount, agent.getAction,
+            opts.episodes)
+    seconds = time.time() - startTime
+
+    logging.info('Ran %d episodes (%d steps) in %.2f seconds: %.0f steps per second.',
+            opts.episodes, steps, seconds, steps / max(seconds, 1e-9))
+
+    if (opts.episodes > 0):
+        logging.info('Average returns from start state: %f', returns / opts.episodes)
+
 def _getGridWorld(name):
     name = name.lower()
 
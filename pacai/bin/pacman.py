@@ -9,7 +9,6 @@ Have fun!
 
 import logging
 import os
-import pickle
 import random
 import sys
 
@@ -18,15 +17,19 @@ from pacai.agents.ghost.random import RandomGhost
 from pacai.agents.greedy import GreedyAgent
 from pacai.bin.arguments import getParser
 from pacai.core.actions import Actions
-from pacai.core.directions import Directions
 from pacai.core.distance import manhattan
 from pacai.core.game import Game
 from pacai.core.gamestate import AbstractGameState
 from pacai.core.layout import getLayout
+from pacai.core.replay import ReplayWriter
+from pacai.core.replay import loadReplay
 from pacai.ui.pacman.null import PacmanNullView
 from pacai.ui.pacman.text import PacmanTextView
 from pacai.util.logs import initLogging
 from pacai.util.logs import updateLoggingLevel
+from pacai.util.parallel import checkParallelOptions
+from pacai.util.parallel import getSeeds
+from pacai.util.parallel import runGamesInPool
 from pacai.util.util import nearestPoint
 
 PACMAN_AGENT_INDEX = 0
@@ -118,23 +121,24 @@ class PacmanGameState(AbstractGameState):
 
         return self._agentStates[PACMAN_AGENT_INDEX]
 
-    def _applySuccessorAction(self, agentIndex, action):
+    # Override
+    def _applySuccessorAction(self, agentIndex, action, trusted = False):
         """
         Apply the action to the context state (self).
         """
 
         # Let the agent's logic deal with its action's effects on the board.
         if (agentIndex == PACMAN_AGENT_INDEX):
-            PacmanRules.applyAction(self, action)
+            PacmanRules.applyAction(self, action, trusted)
         else:
-            GhostRules.applyAction(self, action, agentIndex)
+            GhostRules.applyAction(self, action, agentIndex, trusted)
 
         # Time passes.
         if (agentIndex == PACMAN_AGENT_INDEX):
             # Penalty for waiting around.
             self.addScore(-TIME_PENALTY)
         else:
-            GhostRules.decrementTimer(self.getAgentState(agentIndex))
+            GhostRules.decrementTimer(self.getMutableAgentState(agentIndex))
 
         # Resolve multi-agent effects.
         GhostRules.checkDeath(self, agentIndex)
@@ -142,8 +146,6 @@ class PacmanGameState(AbstractGameState):
         # Book keeping.
         self._lastAgentMoved = agentIndex
 
-        self._hash = None
-
 class ClassicGameRules(object):
     """
     These game rules manage the control flow of a game, deciding when
@@ -217,20 +219,20 @@ class PacmanRules:
         """
 
         agentState = state.getPacmanState()
-        return Actions.getPossibleActions(agentState.getPosition(), agentState.getDirection(),
-                state.getWalls())
+        return state.getInitialLayout().getPossibleActions(agentState.getPosition(),
+                agentState.getDirection())
 
     @staticmethod
-    def applyAction(state, action):
+    def applyAction(state, action, trusted = False):
         """
         Edits the state to reflect the results of the action.
+        Trusted actions are assumed to be legal.
         """
 
-        legal = PacmanRules.getLegalActions(state)
-        if (action not in legal):
+        if (not trusted and action not in PacmanRules.getLegalActions(state)):
             raise ValueError('Illegal pacman action: ' + str(action))
 
-        pacmanState = state.getPacmanState()
+        pacmanState = state.getMutableAgentState(PACMAN_AGENT_INDEX)
 
         # Update position.
         vector = Actions.directionToVector(action, PacmanRules.PACMAN_SPEED)
@@ -260,8 +262,8 @@ class PacmanRules:
             state.eatCapsule(x, y)
 
             # Reset all ghosts' scared timers.
-            for ghostState in state.getGhostStates():
-                ghostState.setScaredTimer(SCARED_TIME)
+            for index in state.getGhostIndexes():
+                state.getMutableAgentState(index).setScaredTimer(SCARED_TIME)
 
 class GhostRules:
     """
@@ -278,25 +280,15 @@ class GhostRules:
         """
 
         agentState = state.getGhostState(ghostIndex)
-        possibleActions = Actions.getPossibleActions(agentState.getPosition(),
-                agentState.getDirection(), state.getWalls())
-        reverse = Actions.reverseDirection(agentState.getDirection())
-
-        if (Directions.STOP in possibleActions):
-            possibleActions.remove(Directions.STOP)
-
-        if (reverse in possibleActions and len(possibleActions) > 1):
-            possibleActions.remove(reverse)
-
-        return possibleActions
+        return state.getInitialLayout().getNonReversingActions(agentState.getPosition(),
+                agentState.getDirection())
 
     @staticmethod
-    def applyAction(state, action, ghostIndex):
-        legal = GhostRules.getLegalActions(state, ghostIndex)
-        if (action not in legal):
+    def applyAction(state, action, ghostIndex, trusted = False):
+        if (not trusted and action not in GhostRules.getLegalActions(state, ghostIndex)):
             raise ValueError('Illegal ghost action: ' + str(action))
 
-        ghostState = state.getGhostState(ghostIndex)
+        ghostState = state.getMutableAgentState(ghostIndex)
         speed = GhostRules.GHOST_SPEED
         if (ghostState.isScared()):
             speed /= 2.0
@@ -341,7 +333,7 @@ class GhostRules:
         if (ghostState.isScared()):
             # Pacman ate a ghost.
             state.addScore(GHOST_POINTS)
-            ghostState.respawn()
+            state.getMutableAgentState(agentIndex).respawn()
         elif (not state.isOver()):
             # A ghost ate pacman.
             state.addScore(LOSE_POINTS)
@@ -430,6 +422,8 @@ def readCommand(argv):
     elif options.debug:
         updateLoggingLevel(logging.DEBUG)
 
+    checkParallelOptions(options)
+
     # If seed value is not entered generate a random seed value.
     seed = options.seed
     if seed is None:
@@ -480,10 +474,13 @@ def readCommand(argv):
 
     args['catchExceptions'] = options.catchExceptions
     args['gameToReplay'] = options.replay
+    args['legacyReplay'] = options.legacyReplay
     args['ghosts'] = [BaseAgent.loadAgent(options.ghost, i + 1) for i in range(options.numGhosts)]
     args['numGames'] = options.numGames
     args['pacman'] = BaseAgent.loadAgent(options.pacman, PACMAN_AGENT_INDEX, agentOpts)
+    args['parallel'] = options.parallel
     args['record'] = options.record
+    args['seed'] = seed
     args['timeout'] = options.timeout
 
     return args
@@ -512,7 +509,7 @@ def replayGame(layout, actions, display):
     display.finish()
 
 def runGames(layout, pacman, ghosts, display, numGames, record = None, numTraining = 0,
-        catchExceptions = False, timeout = 30, **kwargs):
+        catchExceptions = False, timeout = 30, seed = None, **kwargs):
     rules = ClassicGameRules(timeout)
     games = []
 
@@ -521,9 +518,18 @@ def runGames(layout, pacman, ghosts, display, numGames, record = None, numTraini
         logging.info('Playing %d training games.' % numTraining)
         nullView = PacmanNullView()
 
+    # Each game starts from its own seed (the same one it gets with --parallel),
+    # so the results for a seed don't depend on the number of processes.
+    gameSeeds = None
+    if (seed is not None):
+        gameSeeds = getSeeds(seed, numGames)
+
     for i in range(numGames):
         isTraining = (i < numTraining)
 
+        if (gameSeeds is not None):
+            random.seed(gameSeeds[i])
+
         if (isTraining):
             # Suppress graphics for training.
             gameDisplay = nullView
@@ -531,31 +537,62 @@ def runGames(layout, pacman, ghosts, display, numGames, record = None, numTraini
             gameDisplay = display
 
         game = rules.newGame(layout, pacman, ghosts, gameDisplay, catchExceptions)
-        game.run()
-
-        if (not isTraining):
-            games.append(game)
 
         if (record):
             path = 'pacman.replay'
             if (isinstance(record, str)):
                 path = record
 
-            components = {'layout': layout, 'actions': game.moveHistory}
-            with open(path, 'wb') as file:
-                pickle.dump(components, file)
+            game.replayWriter = ReplayWriter(path, layout)
+
+        try:
+            game.run()
+        finally:
+            if (game.replayWriter is not None):
+                game.replayWriter.close()
+
+        if (not isTraining):
+            games.append(game)
 
     if ((numGames - numTraining) > 0):
-        scores = [game.state.getScore() for game in games]
-        wins = [game.state.isWin() for game in games]
-        winRate = wins.count(True) / float(len(wins))
-        logging.info('Average Score: %s', sum(scores) / float(len(scores)))
-        logging.info('Scores:        %s', ', '.join([str(score) for score in scores]))
-        logging.info('Win Rate:      %d/%d (%.2f)' % (wins.count(True), len(wins), winRate))
-        logging.info('Record:        %s', ', '.join([['Loss', 'Win'][int(w)] for w in wins]))
+        _logResults([game.state for game in games])
 
     return games
 
+def runParallelGames(argv, layout, numGames, parallel, seed, **kwargs):
+    """
+    Play independent games on a pool of `parallel` processes
+    (see `pacai.util.parallel.runGamesInPool`).
+    Returns a list of `pacai.core.game.GameResult`.
+    """
+
+    results = runGamesInPool(readCommand, _newParallelGame, argv, layout, numGames, parallel,
+            seed)
+
+    if (len(results) > 0):
+        _logResults(results)
+
+    return results
+
+def _newParallelGame(args, layout):
+    rules = ClassicGameRules(args['timeout'])
+    return rules.newGame(layout, args['pacman'], args['ghosts'], args['display'],
+            args['catchExceptions'])
+
+def _logResults(results):
+    """
+    Log a summary of finished games.
+    Each result just needs to support getScore() and isWin().
+    """
+
+    scores = [result.getScore() for result in results]
+    wins = [result.isWin() for result in results]
+    winRate = wins.count(True) / float(len(wins))
+    logging.info('Average Score: %s', sum(scores) / float(len(scores)))
+    logging.info('Scores:        %s', ', '.join([str(score) for score in scores]))
+    logging.info('Win Rate:      %d/%d (%.2f)' % (wins.count(True), len(wins), winRate))
+    logging.info('Record:        %s', ', '.join([['Loss', 'Win'][int(w)] for w in wins]))
+
 def main(argv):
     """
     Entry point for a pacman game.
@@ -571,15 +608,15 @@ def main(argv):
     if (args['gameToReplay'] is not None):
         logging.info('Replaying recorded game %s.' % args['gameToReplay'])
 
-        recorded = None
-        with open(args['gameToReplay'], 'rb') as file:
-            recorded = pickle.load(file)
-
+        recorded = loadReplay(args['gameToReplay'], allowLegacy = args['legacyReplay'])
         recorded['display'] = args['display']
         replayGame(**recorded)
 
         return
 
+    if (args['parallel'] > 1):
+        return runParallelGames(argv, **args)
+
     return runGames(**args)
 
 if __name__ == '__main__':
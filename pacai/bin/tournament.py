@@ -0,0 +1,352 @@
+"""
+Run a round-robin tournament between capture teams.
+
+Every pair of teams plays on every layout, once with each team as red.
+Matches are played on a pool of processes, and each finished match is appended to a results file.
+Running the same tournament again with the same results file will skip the matches
+that were already played, so a crashed or interrupted tournament can be resumed.
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import textwrap
+import time
+
+from pacai.bin import capture
+from pacai.core.game import GameResult
+from pacai.ui.capture.null import CaptureNullView
+from pacai.util.logs import initLogging
+from pacai.util.logs import updateLoggingLevel
+from pacai.util.parallel import MAX_SEED
+from pacai.util.parallel import imapUnorderedInPool
+
+WIN_POINTS = 3
+TIE_POINTS = 1
+LOSS_POINTS = 0
+
+class Match(object):
+    """
+    A single scheduled game between two teams.
+    """
+
+    def __init__(self, red, blue, layout, game, seed):
+        self.red = red
+        self.blue = blue
+        self.layout = layout
+        self.game = game
+        self.seed = seed
+
+    def getKey(self):
+        """
+        The key that identifies this match in a results file.
+        """
+
+        return (self.red, self.blue, self.layout, self.game)
+
+def getSchedule(teams, layouts, numGames, seed):
+    """
+    Get all the matches in a round-robin tournament.
+    The schedule (including each match's seed) only depends on the arguments,
+    so a resumed tournament will schedule the same matches.
+    """
+
+    keys = []
+    for layout in layouts:
+        for (first, second) in itertools.combinations(teams, 2):
+            for game in range(numGames):
+                keys.append((first, second, layout, game))
+                keys.append((second, first, layout, game))
+
+    return [Match(*key, seed = getMatchSeed(seed, key)) for key in keys]
+
+def getMatchSeed(seed, key):
+    """
+    Derive a match's seed from the tournament seed and the match's key.
+    A match gets the same seed wherever it is in the schedule,
+    so resuming with other teams, layouts, or numbers of games does not change its seed.
+    """
+
+    text = json.dumps([seed] + list(key))
+    digest = hashlib.sha256(text.encode()).digest()
+
+    return int.from_bytes(digest[:8], 'big') % (MAX_SEED + 1)
+
+def loadResults(path):
+    """
+    Load the results that have already been saved to a results file (if it exists).
+    Returns a dict of match keys to results.
+    """
+
+    results = {}
+    if (not os.path.isfile(path)):
+        return results
+
+    with open(path, 'r') as file:
+        for line in file:
+            line = line.strip()
+            if (line == ''):
+                continue
+
+            try:
+                result = json.loads(line)
+            except ValueError:
+                # The last line may be partial if a previous run was killed while writing it.
+                logging.warning('Skipping malformed result: %s' % (line))
+                continue
+
+            results[_getResultKey(result)] = result
+
+    return results
+
+def getStandings(teams, results):
+    """
+    Tally the results into a list of standings rows (dicts), best team first.
+    Teams are ordered by points and then by total score difference.
+    """
+
+    standings = {}
+    for team in teams:
+        standings[team] = {
+            'team': team,
+            'played': 0,
+            'wins': 0,
+            'ties': 0,
+            'losses': 0,
+            'points': 0,
+            'scoreDiff': 0,
+        }
+
+    for result in results:
+        red = standings.get(result['red'])
+        blue = standings.get(result['blue'])
+        if (red is None or blue is None):
+            continue
+
+        score = result['score']
+        if (score > 0):
+            _addOutcome(red, 'wins', WIN_POINTS, score)
+            _addOutcome(blue, 'losses', LOSS_POINTS, -score)
+        elif (score < 0):
+            _addOutcome(red, 'losses', LOSS_POINTS, score)
+            _addOutcome(blue, 'wins', WIN_POINTS, -score)
+        else:
+            _addOutcome(red, 'ties', TIE_POINTS, 0)
+            _addOutcome(blue, 'ties', TIE_POINTS, 0)
+
+    rows = list(standings.values())
+    rows.sort(key = lambda row: (-row['points'], -row['scoreDiff'], row['team']))
+
+    return rows
+
+def formatStandings(rows):
+    """
+    Format standings rows into a text table.
+    """
+
+    nameWidth = max([len('Team')] + [len(row['team']) for row in rows])
+    lineFormat = '%4s  %-' + str(nameWidth) + 's  %6s  %4s  %4s  %4s  %6s  %9s'
+
+    lines = [lineFormat % ('Rank', 'Team', 'Played', 'W', 'T', 'L', 'Points', 'ScoreDiff')]
+    for (rank, row) in enumerate(rows):
+        lines.append(lineFormat % (rank + 1, row['team'], row['played'], row['wins'],
+                row['ties'], row['losses'], row['points'], row['scoreDiff']))
+
+    return '\n'.join(lines)
+
+def runTournament(teams, layouts, numGames, resultsPath, parallel, length, seed, **kwargs):
+    """
+    Play all the matches that do not already have results, and return the standings rows.
+    """
+
+    schedule = getSchedule(teams, layouts, numGames, seed)
+    results = loadResults(resultsPath)
+
+    pending = [match for match in schedule if match.getKey() not in results]
+    logging.info('Tournament has %d matches, %d already played.' %
+            (len(schedule), len(schedule) - len(pending)))
+
+    startTime = time.time()
+    matchArgs = [(match.red, match.blue, match.layout, match.game, match.seed, length)
+            for match in pending]
+
+    with open(resultsPath, 'a') as file:
+        for result in imapUnorderedInPool(_runMatch, matchArgs, parallel):
+            # Flush after each match so an interrupted tournament can resume from here.
+            file.write(json.dumps(result, sort_keys = True) + '\n')
+            file.flush()
+
+            results[_getResultKey(result)] = result
+            logging.info('Match %d/%d: %s (red) vs %s (blue) on %s, score: %d.' %
+                    (len(results), len(schedule), result['red'], result['blue'],
+                    result['layout'], result['score']))
+
+    if (len(pending) > 0):
+        logging.info('Played %d matches on %d processes in %.2f seconds.' %
+                (len(pending), parallel, time.time() - startTime))
+
+    scheduled = set([match.getKey() for match in schedule])
+    finished = [result for (key, result) in results.items() if key in scheduled]
+
+    return getStandings(teams, finished)
+
+def _addOutcome(row, outcome, points, scoreDiff):
+    row['played'] += 1
+    row[outcome] += 1
+    row['points'] += points
+    row['scoreDiff'] += scoreDiff
+
+def _getResultKey(result):
+    return (result['red'], result['blue'], result['layout'], result['game'])
+
+def _runMatch(red, blue, layoutName, gameNumber, seed, length):
+    """
+    Play a single match (in a worker process) and return its result as a JSON-friendly dict.
+    A team that fails to load loses the match.
+    """
+
+    random.seed(seed)
+
+    result = {
+        'red': red,
+        'blue': blue,
+        'layout': layoutName,
+        'game': gameNumber,
+        'seed': seed,
+        'score': 0,
+        'crashed': False,
+        'timeout': False,
+        'time': 0.0,
+    }
+
+    startTime = time.time()
+    layout = capture.loadLayout(layoutName)
+
+    teams = []
+    for (isRed, team) in [(True, red), (False, blue)]:
+        try:
+            teams.append(capture.loadAgents(isRed, team, True, {}))
+        except Exception:
+            logging.exception('Failed to load team: %s.' % (team))
+
+            result['crashed'] = True
+            result['score'] = -1 if isRed else 1
+            return result
+
+    agents = sum([list(pair) for pair in zip(*teams)], [])
+
+    rules = capture.CaptureRules()
+    game = rules.newGame(layout, agents, CaptureNullView(), length, True)
+    game.run()
+
+    gameResult = GameResult(game, seed)
+    result['score'] = gameResult.getScore()
+    result['crashed'] = gameResult.agentCrashed
+    result['timeout'] = gameResult.agentTimeout
+    result['time'] = time.time() - startTime
+
+    return result
+
+def parseOptions(argv):
+    """
+    Processes the command used to run a tournament from the command line.
+    """
+
+    description = """
+    DESCRIPTION:
+        This program will run a round-robin tournament between capture teams.
+        Every pair of teams will play on every layout, once with each team as red.
+        Results are saved as each match finishes,
+        so running the same command again will resume an interrupted tournament.
+
+    EXAMPLES:
+        (1) python -m pacai.bin.tournament pacai.core.baselineTeam pacai.student.myTeam
+            - Play the baseline team against the student team on the default layout.
+        (2) python -m pacai.bin.tournament teamA teamB teamC -l defaultCapture RANDOM13
+            - Play three teams against each other on two layouts.
+    """
+
+    parser = argparse.ArgumentParser(description = textwrap.dedent(description),
+        prog = os.path.basename(__file__), formatter_class = argparse.RawTextHelpFormatter)
+
+    parser.add_argument('teams', metavar = 'TEAM',
+            action = 'store', type = str, nargs = '+',
+            help = 'the team modules to play (each must have a createTeam function)')
+
+    parser.add_argument('-d', '--debug', dest = 'debug',
+            action = 'store_true', default = False,
+            help = 'set logging level to debug (default: %(default)s)')
+
+    parser.add_argument('-l', '--layouts', dest = 'layouts',
+            action = 'store', type = str, nargs = '+', default = ['defaultCapture'],
+            help = 'the layouts to play on, RANDOM<seed> generates a seeded map '
+                + '(default: %(default)s)')
+
+    parser.add_argument('-n', '--num-games', dest = 'numGames',
+            action = 'store', type = int, default = 1,
+            help = 'the number of games each pairing plays on each layout as each color '
+                + '(default: %(default)s)')
+
+    parser.add_argument('-o', '--results', dest = 'resultsPath',
+            action = 'store', type = str, default = 'tournament.jsonl',
+            help = 'the file to save (and resume) results in (default: %(default)s)')
+
+    parser.add_argument('-q', '--quiet', dest = 'quiet',
+            action = 'store_true', default = False,
+            help = 'set logging level to warning (default: %(default)s)')
+
+    parser.add_argument('-s', '--seed', dest = 'seed',
+            action = 'store', type = int, default = 0,
+            help = 'the seed used to derive the seed of each match (default: %(default)s)')
+
+    parser.add_argument('--max-moves', dest = 'length',
+            action = 'store', type = int, default = 1200,
+            help = 'set maximum number of moves in a game (default: %(default)s)')
+
+    parser.add_argument('--parallel', dest = 'parallel',
+            action = 'store', type = int, default = os.cpu_count(),
+            help = 'play matches on this many processes at once (default: %(default)s)')
+
+    options, otherjunk = parser.parse_known_args(argv)
+
+    if len(otherjunk) != 0:
+        raise ValueError('Unrecognized options: \'%s\'.' % (str(otherjunk)))
+
+    if options.quiet and options.debug:
+        raise ValueError('Logging cannont be set to both debug and quiet.')
+
+    if options.quiet:
+        updateLoggingLevel(logging.WARNING)
+    elif options.debug:
+        updateLoggingLevel(logging.DEBUG)
+
+    # Drop duplicate teams (keeping the order).
+    options.teams = list(dict.fromkeys(options.teams))
+    if (len(options.teams) < 2):
+        raise ValueError('A tournament needs at least two different teams.')
+
+    return options
+
+def main(argv):
+    """
+    Entry point for a tournament.
+    The args are a blind pass of `sys.argv` with the executable stripped.
+    """
+
+    initLogging()
+
+    options = parseOptions(argv)
+    standings = runTournament(**vars(options))
+
+    # Always show the standings, even in quiet mode.
+    print(formatStandings(standings))
+
+    return standings
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
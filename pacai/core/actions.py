@@ -71,6 +71,46 @@ class Actions:
 
         return possible
 
+    @staticmethod
+    def getNonReversingActions(position, direction, walls):
+        """
+        Get the possible actions that do not stop,
+        and do not turn around unless there is no other choice (like at a dead end).
+        """
+
+        possibleActions = Actions.getPossibleActions(position, direction, walls)
+        reverse = Actions.reverseDirection(direction)
+
+        if (Directions.STOP in possibleActions):
+            possibleActions.remove(Directions.STOP)
+
+        if (reverse in possibleActions and len(possibleActions) > 1):
+            possibleActions.remove(reverse)
+
+        return possibleActions
+
+    @staticmethod
+    def getPossibleActionsTables(walls):
+        """
+        Precompute the actions for every open cell in the walls.
+        Returns two dicts:
+        (x, y) to a tuple of getPossibleActions() (which does not depend on the direction),
+        and (x, y, direction) to a tuple of getNonReversingActions().
+        """
+
+        possibleTable = {}
+        nonReversingTable = {}
+
+        for position in walls.asList(False):
+            possibleTable[position] = tuple(Actions.getPossibleActions(position,
+                    Directions.STOP, walls))
+
+            for direction in Actions._directions:
+                actions = Actions.getNonReversingActions(position, direction, walls)
+                nonReversingTable[position + (direction, )] = tuple(actions)
+
+        return possibleTable, nonReversingTable
+
     @staticmethod
     def getLegalNeighbors(position, walls):
         x, y = position
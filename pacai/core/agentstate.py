@@ -1,6 +1,7 @@
 from pacai.core.actions import Actions
 from pacai.core.directions import Directions
 from pacai.util import util
+from pacai.util import zobrist
 
 class AgentState:
     """
@@ -9,8 +10,15 @@ class AgentState:
     The convention for positions, like a graph, is that (0, 0) is the lower left corner,
     x increases horizontally and y increases vertically.
     Therefore, north is the direction of increasing y, or (0, 1).
+
+    Game states share agent states with their successors until an agent state needs to change
+    (see `pacai.core.gamestate.AbstractGameState.getMutableAgentState`),
+    so agent states are compact (slotted) and cheap to copy.
     """
 
+    __slots__ = ('_startPosition', '_startDirection', '_startIsPacman',
+            '_position', '_direction', '_isPacman', '_scaredTimer', '_hash')
+
     def __init__(self, position, direction, isPacman):
         # Save the starting information for later use.
         self._startPosition = position
@@ -23,18 +31,30 @@ class AgentState:
         self._isPacman = isPacman
         self._scaredTimer = 0
 
+        # A Zobrist hash of the current position, direction, type, and scared timer.
+        # It is updated whenever one of those changes.
+        self._hash = (zobrist.getKey('position', position)
+                ^ zobrist.getKey('direction', direction)
+                ^ zobrist.getKey('isPacman', isPacman)
+                ^ zobrist.getKey('scaredTimer', 0))
+
     def copy(self):
-        state = AgentState(self._startPosition, self._startDirection, self._startIsPacman)
+        # Skip the constructor, everything (including the hash) is copied over.
+        state = AgentState.__new__(AgentState)
 
+        state._startPosition = self._startPosition
+        state._startDirection = self._startDirection
+        state._startIsPacman = self._startIsPacman
         state._isPacman = self._isPacman
         state._position = self._position
         state._direction = self._direction
         state._scaredTimer = self._scaredTimer
+        state._hash = self._hash
 
         return state
 
     def decrementScaredTimer(self):
-        self._scaredTimer = max(0, self._scaredTimer - 1)
+        self._setScaredTimer(max(0, self._scaredTimer - 1))
 
     def getDirection(self):
         return self._direction
@@ -68,27 +88,32 @@ class AgentState:
         return (self.isGhost() and self.isScared())
 
     def setIsPacman(self, isPacman):
+        if (isPacman == self._isPacman):
+            return
+
+        self._hash ^= (zobrist.getKey('isPacman', self._isPacman)
+                ^ zobrist.getKey('isPacman', isPacman))
         self._isPacman = isPacman
 
     def setScaredTimer(self, timer):
-        self._scaredTimer = timer
+        self._setScaredTimer(timer)
 
     def snapToNearestPoint(self):
         """
         Move the agent to the nearest point to its current location.
         """
 
-        self._position = util.nearestPoint(self._position)
+        self._setPosition(util.nearestPoint(self._position))
 
     def respawn(self):
         """
         This agent was killed, respawn it at the start as a pacman.
         """
 
-        self._position = self._startPosition
-        self._direction = self._startDirection
-        self._isPacman = self._startIsPacman
-        self._scaredTimer = 0
+        self._setPosition(self._startPosition)
+        self._setDirection(self._startDirection)
+        self.setIsPacman(self._startIsPacman)
+        self._setScaredTimer(0)
 
     def updatePosition(self, vector):
         """
@@ -98,12 +123,36 @@ class AgentState:
         x, y = self._position
         dx, dy = vector
 
-        self._position = (x + dx, y + dy)
+        self._setPosition((x + dx, y + dy))
 
         direction = Actions.vectorToDirection(vector)
         if (direction != Directions.STOP):
             # If this is a zero vector, face the same direction as before.
-            self._direction = direction
+            self._setDirection(direction)
+
+    def _setDirection(self, direction):
+        if (direction == self._direction):
+            return
+
+        self._hash ^= (zobrist.getKey('direction', self._direction)
+                ^ zobrist.getKey('direction', direction))
+        self._direction = direction
+
+    def _setPosition(self, position):
+        if (position == self._position):
+            return
+
+        self._hash ^= (zobrist.getKey('position', self._position)
+                ^ zobrist.getKey('position', position))
+        self._position = position
+
+    def _setScaredTimer(self, timer):
+        if (timer == self._scaredTimer):
+            return
+
+        self._hash ^= (zobrist.getKey('scaredTimer', self._scaredTimer)
+                ^ zobrist.getKey('scaredTimer', timer))
+        self._scaredTimer = timer
 
     def __eq__(self, other):
         if (other is None):
@@ -115,7 +164,7 @@ class AgentState:
                 and self._scaredTimer == other._scaredTimer)
 
     def __hash__(self):
-        return util.buildHash(self._position, self._direction, self._isPacman, self._scaredTimer)
+        return self._hash
 
     def __str__(self):
         typeString = 'Ghost'
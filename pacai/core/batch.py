@@ -0,0 +1,351 @@
+"""
+A simulator that runs many classic pacman games in lockstep.
+
+Instead of a `pacai.bin.pacman.PacmanGameState` (and its agent states) per game,
+the simulator keeps one flat list per field with one entry per game (struct of arrays):
+positions and directions for each agent, scared timers for each ghost,
+and the food and capsules of each game as a bitboard (an int, like `pacai.core.grid.Grid`).
+All the per-layout work (legal actions, moves, cell numbers) is precomputed into tables,
+so stepping a game is a handful of list lookups and int operations.
+
+Positions are kept in half cells, since scared ghosts move at half speed.
+A position is the single int (2x * 2height + 2y).
+
+The rules are the same as `pacai.bin.pacman.PacmanRules` and `pacai.bin.pacman.GhostRules`,
+and `BatchPacmanSimulator.getState` converts any game back to a `PacmanGameState`.
+"""
+
+from pacai.bin.pacman import BOARD_CLEAR_POINTS
+from pacai.bin.pacman import FOOD_POINTS
+from pacai.bin.pacman import GHOST_POINTS
+from pacai.bin.pacman import LOSE_POINTS
+from pacai.bin.pacman import PACMAN_AGENT_INDEX
+from pacai.bin.pacman import SCARED_TIME
+from pacai.bin.pacman import TIME_PENALTY
+from pacai.bin.pacman import PacmanGameState
+from pacai.core.actions import Actions
+from pacai.core.directions import Directions
+
+DIRECTIONS = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST,
+        Directions.STOP]
+STOP_INDEX = DIRECTIONS.index(Directions.STOP)
+
+# Agents within this many half cells collide (pacman.COLLISION_TOLERANCE is 0.7 cells).
+COLLISION_HALF_CELLS = 1
+
+class BatchPacmanSimulator(object):
+    """
+    Run numGames games on the same layout at once.
+    Each call to `BatchPacmanSimulator.applyActions` moves one agent in every game
+    (games that are over are skipped).
+    Actions are directions, like everywhere else.
+    """
+
+    def __init__(self, layout, numGames):
+        self._layout = layout
+        self._numGames = numGames
+        self._numAgents = len(layout.agentPositions)
+
+        self._buildTables()
+
+        # Each of these has one entry for each game (and is filled by reset()).
+        self._positions = [[0] * numGames for i in range(self._numAgents)]
+        self._directions = [[STOP_INDEX] * numGames for i in range(self._numAgents)]
+        self._scaredTimers = [[0] * numGames for i in range(self._numAgents)]
+        self._food = [0] * numGames
+        self._numFood = [0] * numGames
+        self._capsules = [0] * numGames
+        self._scores = [0] * numGames
+        self._over = [False] * numGames
+        self._wins = [False] * numGames
+        self._lastAgentMoved = [None] * numGames
+
+        self.reset()
+
+    def applyActions(self, agentIndex, actions):
+        """
+        Apply one action (for the given agent) to each game.
+        There must be an action for every game,
+        but the actions for games that are over are ignored (and may be None).
+        Actions are assumed to be legal (see getLegalActions()).
+        """
+
+        if (len(actions) != self._numGames):
+            raise ValueError("Expected %d actions, got %d." % (self._numGames, len(actions)))
+
+        directionIndexes = self._directionIndexes
+        over = self._over
+
+        for gameIndex in range(self._numGames):
+            if (over[gameIndex]):
+                continue
+
+            directionIndex = directionIndexes[actions[gameIndex]]
+            if (agentIndex == PACMAN_AGENT_INDEX):
+                self._movePacman(gameIndex, directionIndex)
+            else:
+                self._moveGhost(gameIndex, agentIndex, directionIndex)
+
+            self._lastAgentMoved[gameIndex] = agentIndex
+
+    def getAgentPosition(self, gameIndex, agentIndex):
+        """
+        Get the (x, y) position of an agent the same way an agent state would have it
+        (floats when between cells).
+        """
+
+        halfX, halfY = divmod(self._positions[agentIndex][gameIndex], self._halfHeight)
+        return (self._toCoordinate(halfX), self._toCoordinate(halfY))
+
+    def getLegalActions(self, gameIndex, agentIndex):
+        """
+        Get the same legal actions (in the same order) as the game state would.
+        """
+
+        if (self._over[gameIndex]):
+            return []
+
+        position = self._positions[agentIndex][gameIndex]
+        direction = self._directions[agentIndex][gameIndex]
+
+        if (agentIndex == PACMAN_AGENT_INDEX):
+            actions = self._possibleActions[position]
+        else:
+            actions = self._nonReversingActions[position * len(DIRECTIONS) + direction]
+
+        if (actions is None):
+            # In between cells, agents must keep going.
+            return [DIRECTIONS[direction]]
+
+        return list(actions)
+
+    def getNumAgents(self):
+        return self._numAgents
+
+    def getNumFood(self, gameIndex):
+        return self._numFood[gameIndex]
+
+    def getNumGames(self):
+        return self._numGames
+
+    def getScaredTimer(self, gameIndex, agentIndex):
+        return self._scaredTimers[agentIndex][gameIndex]
+
+    def getScore(self, gameIndex):
+        return self._scores[gameIndex]
+
+    def getScores(self):
+        return list(self._scores)
+
+    def getState(self, gameIndex):
+        """
+        Get a `pacai.bin.pacman.PacmanGameState` that matches a game.
+        This is slow, and is meant for checking on and displaying games.
+        """
+
+        food = []
+        for (cell, position) in enumerate(self._cellPositions):
+            if (self._food[gameIndex] & (1 << cell)):
+                food.append(position)
+
+        capsules = []
+        for (cell, position) in self._layoutCapsules:
+            if (self._capsules[gameIndex] & (1 << cell)):
+                capsules.append(position)
+
+        agents = []
+        for agentIndex in range(self._numAgents):
+            agents.append([
+                self.getAgentPosition(gameIndex, agentIndex),
+                DIRECTIONS[self._directions[agentIndex][gameIndex]],
+                agentIndex == PACMAN_AGENT_INDEX,
+                self._scaredTimers[agentIndex][gameIndex],
+            ])
+
+        state = PacmanGameState(self._layout)
+        state.restoreCheckpoint({
+            'score': self._scores[gameIndex],
+            'gameover': self._over[gameIndex],
+            'win': self._wins[gameIndex],
+            'lastAgentMoved': self._lastAgentMoved[gameIndex],
+            'food': food,
+            'capsules': capsules,
+            'agents': agents,
+        })
+
+        return state
+
+    def isLose(self, gameIndex):
+        return self._over[gameIndex] and not self._wins[gameIndex]
+
+    def isOver(self, gameIndex):
+        return self._over[gameIndex]
+
+    def isWin(self, gameIndex):
+        return self._over[gameIndex] and self._wins[gameIndex]
+
+    def reset(self, gameIndexes = None):
+        """
+        Start the given games (all games by default) over from the layout.
+        """
+
+        if (gameIndexes is None):
+            gameIndexes = range(self._numGames)
+
+        for gameIndex in gameIndexes:
+            for agentIndex in range(self._numAgents):
+                self._positions[agentIndex][gameIndex] = self._startPositions[agentIndex]
+                self._directions[agentIndex][gameIndex] = STOP_INDEX
+                self._scaredTimers[agentIndex][gameIndex] = 0
+
+            self._food[gameIndex] = self._startFood
+            self._numFood[gameIndex] = self._startNumFood
+            self._capsules[gameIndex] = self._startCapsules
+            self._scores[gameIndex] = 0
+            self._over[gameIndex] = False
+            self._wins[gameIndex] = False
+            self._lastAgentMoved[gameIndex] = None
+
+    def _buildTables(self):
+        layout = self._layout
+        width = layout.getWidth()
+        height = layout.getHeight()
+
+        self._height = height
+        self._halfHeight = 2 * height
+        numHalfCells = (2 * width) * (2 * height)
+
+        self._directionIndexes = {direction: index for (index, direction) in enumerate(DIRECTIONS)}
+
+        # The change in (half cell) position for a move at full and half speed.
+        self._fullMoves = []
+        self._halfMoves = []
+        for direction in DIRECTIONS:
+            dx, dy = Actions.directionToVector(direction, 1)
+            self._halfMoves.append(dx * self._halfHeight + dy)
+            self._fullMoves.append(2 * (dx * self._halfHeight + dy))
+
+        # The cell number (the Grid bit) of each cell, and the position of each cell number.
+        self._cellPositions = [(x, y) for x in range(width) for y in range(height)]
+
+        # Legal actions for each half cell that is on a grid point (None between cells).
+        # Non-reversing actions are indexed by (half cell * number of directions + direction).
+        self._possibleActions = [None] * numHalfCells
+        self._nonReversingActions = [None] * (numHalfCells * len(DIRECTIONS))
+
+        # The cell number for each half cell on a grid point (-1 between cells).
+        self._halfCellToCell = [-1] * numHalfCells
+
+        for (x, y) in layout.walls.asList(False):
+            position = self._toHalfCell(x, y)
+            self._halfCellToCell[position] = x * height + y
+            self._possibleActions[position] = tuple(layout.getPossibleActions((x, y),
+                    Directions.STOP))
+
+            for (directionIndex, direction) in enumerate(DIRECTIONS):
+                actions = tuple(layout.getNonReversingActions((x, y), direction))
+                self._nonReversingActions[position * len(DIRECTIONS) + directionIndex] = actions
+
+        self._startPositions = [self._toHalfCell(*position)
+                for (isPacman, position) in layout.agentPositions]
+
+        self._startFood = 0
+        for (x, y) in layout.food.asList():
+            self._startFood |= (1 << (x * height + y))
+        self._startNumFood = layout.food.count()
+
+        self._layoutCapsules = [(x * height + y, (x, y)) for (x, y) in layout.capsules]
+        self._startCapsules = 0
+        for (cell, position) in self._layoutCapsules:
+            self._startCapsules |= (1 << cell)
+
+    def _canKill(self, pacmanPosition, ghostPosition):
+        pacmanX, pacmanY = divmod(pacmanPosition, self._halfHeight)
+        ghostX, ghostY = divmod(ghostPosition, self._halfHeight)
+
+        return abs(pacmanX - ghostX) + abs(pacmanY - ghostY) <= COLLISION_HALF_CELLS
+
+    def _checkDeath(self, gameIndex, ghostIndex):
+        """
+        Same as `pacai.bin.pacman.GhostRules.collide` if the agents are close enough.
+        """
+
+        ghostPositions = self._positions[ghostIndex]
+        if (not self._canKill(self._positions[PACMAN_AGENT_INDEX][gameIndex],
+                ghostPositions[gameIndex])):
+            return
+
+        if (self._scaredTimers[ghostIndex][gameIndex] > 0):
+            # Pacman ate a ghost.
+            self._scores[gameIndex] += GHOST_POINTS
+            ghostPositions[gameIndex] = self._startPositions[ghostIndex]
+            self._directions[ghostIndex][gameIndex] = STOP_INDEX
+            self._scaredTimers[ghostIndex][gameIndex] = 0
+        elif (not self._over[gameIndex]):
+            # A ghost ate pacman.
+            self._scores[gameIndex] += LOSE_POINTS
+            self._over[gameIndex] = True
+            self._wins[gameIndex] = False
+
+    def _moveGhost(self, gameIndex, ghostIndex, directionIndex):
+        scaredTimers = self._scaredTimers[ghostIndex]
+        positions = self._positions[ghostIndex]
+
+        if (scaredTimers[gameIndex] > 0):
+            positions[gameIndex] += self._halfMoves[directionIndex]
+        else:
+            positions[gameIndex] += self._fullMoves[directionIndex]
+
+        if (directionIndex != STOP_INDEX):
+            self._directions[ghostIndex][gameIndex] = directionIndex
+
+        # Time passes.
+        if (scaredTimers[gameIndex] > 0):
+            scaredTimers[gameIndex] -= 1
+            if (scaredTimers[gameIndex] == 0):
+                # Snap to the nearest grid point (halves round up, like nearestPoint()).
+                halfX, halfY = divmod(positions[gameIndex], self._halfHeight)
+                halfX += halfX & 1
+                halfY += halfY & 1
+                positions[gameIndex] = halfX * self._halfHeight + halfY
+
+        self._checkDeath(gameIndex, ghostIndex)
+
+    def _movePacman(self, gameIndex, directionIndex):
+        positions = self._positions[PACMAN_AGENT_INDEX]
+
+        # Pacman always moves a full cell, so it is always on a grid point.
+        positions[gameIndex] += self._fullMoves[directionIndex]
+        if (directionIndex != STOP_INDEX):
+            self._directions[PACMAN_AGENT_INDEX][gameIndex] = directionIndex
+
+        # Eat.
+        bit = 1 << self._halfCellToCell[positions[gameIndex]]
+        if (self._food[gameIndex] & bit):
+            self._food[gameIndex] ^= bit
+            self._numFood[gameIndex] -= 1
+            self._scores[gameIndex] += FOOD_POINTS
+
+            if (self._numFood[gameIndex] == 0):
+                self._scores[gameIndex] += BOARD_CLEAR_POINTS
+                self._over[gameIndex] = True
+                self._wins[gameIndex] = True
+        elif (self._capsules[gameIndex] & bit):
+            self._capsules[gameIndex] ^= bit
+            for ghostIndex in range(1, self._numAgents):
+                self._scaredTimers[ghostIndex][gameIndex] = SCARED_TIME
+
+        # Time passes.
+        self._scores[gameIndex] -= TIME_PENALTY
+
+        for ghostIndex in range(1, self._numAgents):
+            self._checkDeath(gameIndex, ghostIndex)
+
+    def _toCoordinate(self, halfCoordinate):
+        if (halfCoordinate & 1):
+            return halfCoordinate / 2.0
+
+        return halfCoordinate // 2
+
+    def _toHalfCell(self, x, y):
+        return (2 * x) * self._halfHeight + (2 * y)
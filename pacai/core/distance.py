@@ -39,3 +39,45 @@ def maze(position1, position2, gameState):
     prob = PositionSearchProblem(gameState, start = position1, goal = position2)
 
     return len(search.breadthFirstSearch(prob))
+
+def distanceField(sources, walls):
+    """
+    Returns the maze distance from every position to its closest source
+    (a multi-source breadth first search from all the sources at once),
+    as a dict of position to distance.
+    Positions that can not reach any source are left out.
+
+    Example usage: `distance.distanceField(gameState.getFood().asList(), gameState.getWalls())`.
+    """
+
+    distances = {}
+    frontier = []
+
+    for source in sources:
+        if (source not in distances):
+            distances[source] = 0
+            frontier.append(source)
+
+    width = walls.getWidth()
+    height = walls.getHeight()
+    distance = 0
+
+    while (len(frontier) > 0):
+        distance += 1
+        nextFrontier = []
+
+        for (x, y) in frontier:
+            for neighbor in ((x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)):
+                nextX, nextY = neighbor
+                if (nextX < 0 or nextX >= width or nextY < 0 or nextY >= height):
+                    continue
+
+                if (neighbor in distances or walls.get(nextX, nextY)):
+                    continue
+
+                distances[neighbor] = distance
+                nextFrontier.append(neighbor)
+
+        frontier = nextFrontier
+
+    return distances
@@ -1,10 +1,29 @@
+import array
+import hashlib
+import logging
+import mmap
+import os
+import struct
 import sys
+import tempfile
 
 from pacai.core.distance import manhattan
-from pacai.util import priorityQueue
 
 DEFAULT_DISTANCE = 10000
 
+# Where distance tables are cached on disk by default (they are not cached on disk if unset).
+CACHE_DIR_ENV_VAR = 'PACAI_DISTANCE_CACHE_DIR'
+
+# Pass as a cacheDir to use the default cache dir (see getDefaultCacheDir()).
+DEFAULT_CACHE_DIR = object()
+
+# Distance files are: a header, the open cells as int16 (x, y) pairs, and the int16 matrix.
+# The header has the layout's key (a sha256 digest) and size, which are checked on load.
+# All values are in the native byte order (which is recorded in the header).
+_FILE_MAGIC = b'PACDIST2'
+_FILE_HEADER = struct.Struct('=8s1s32sIII')
+_FILE_EXTENSION = '.dist'
+
 class Distancer(object):
     """
     A class for computing and caching the shortest path between any two points in a given maze.
@@ -14,11 +33,14 @@ class Distancer(object):
     distancer = Distancer(gameState.getInitialLayout())
     distancer.getDistance((1, 1), (10, 10))
     ```
+
+    Distances are cached for the whole process, and on disk in cacheDir (if it is not None).
+    By default, they are only cached on disk if asked for (see getDefaultCacheDir()).
     """
 
-    def __init__(self, layout):
+    def __init__(self, layout, cacheDir = DEFAULT_CACHE_DIR):
         self._distances = None
-        self.dc = DistanceCalculator(layout, self)
+        self.dc = DistanceCalculator(layout, self, cacheDir)
 
     def getMazeDistances(self):
         self.dc.run()
@@ -48,11 +70,7 @@ class Distancer(object):
         return bestDistance
 
     def getDistanceOnGrid(self, pos1, pos2):
-        key = (pos1, pos2)
-        if key in self._distances:
-            return self._distances[key]
-
-        raise Exception("Position not in grid: " + str(key))
+        return self._distances.getDistance(pos1, pos2)
 
     def isReadyForMazeDistance(self):
         return (self._distances is not None)
@@ -80,77 +98,284 @@ def getGrids1D(x):
 
 distanceMap = {}
 
+# Distance tables that this process has already loaded or computed, keyed by getLayoutKey().
+_distanceCache = {}
+
 class DistanceCalculator:
-    def __init__(self, layout, distancer):
+    def __init__(self, layout, distancer, cacheDir = DEFAULT_CACHE_DIR):
         self.layout = layout
         self.distancer = distancer
-        self.cache = {}
+        self.cacheDir = cacheDir
 
     def run(self):
-        if self.layout.walls not in self.cache:
-            self.cache[self.layout.walls] = computeDistances(self.layout)
+        self.distancer._distances = getDistances(self.layout, self.cacheDir)
+
+class DistanceMatrix(object):
+    """
+    The maze distance between every pair of open cells in a layout.
+
+    Each open cell is given an id, and distances are stored in a dense, row-major matrix
+    of 16 bit ints (an `array.array`) indexed by those ids.
+    Cells that cannot reach each other are DEFAULT_DISTANCE apart.
+    """
+
+    def __init__(self, width, height, cells, distances):
+        """
+        Args:
+            cells: The open (x, y) positions, in id order.
+            distances: An array('h') with len(cells) ** 2 entries.
+        """
+
+        self._width = width
+        self._height = height
+        self._cells = cells
+        self._numCells = len(cells)
+        self._distances = distances
+
+        # Maps (x * height + y) to a cell id (-1 for walls).
+        self._cellIds = array.array('i', [-1]) * (width * height)
+        for (cellId, (x, y)) in enumerate(cells):
+            self._cellIds[x * height + y] = cellId
+
+    def getCellId(self, position):
+        """
+        Get the id for a position, or None if the position is not an open cell.
+        """
+
+        x, y = position
+        x = int(x)
+        y = int(y)
 
-        self.distancer._distances = self.cache[self.layout.walls]
+        if (x < 0 or x >= self._width or y < 0 or y >= self._height):
+            return None
+
+        cellId = self._cellIds[x * self._height + y]
+        if (cellId == -1):
+            return None
+
+        return cellId
+
+    def getDistance(self, pos1, pos2):
+        """
+        Get the maze distance between two integral positions.
+        Raises a LookupError if either position is not an open cell.
+        """
+
+        id1 = self.getCellId(pos1)
+        id2 = self.getCellId(pos2)
+
+        if (id1 is None or id2 is None):
+            raise LookupError("Position not in grid: " + str((pos1, pos2)))
+
+        return self._distances[id1 * self._numCells + id2]
+
+    def __contains__(self, key):
+        pos1, pos2 = key
+        return (self.getCellId(pos1) is not None and self.getCellId(pos2) is not None)
+
+    def __reduce__(self):
+        # Distances may be a view of a memory mapped file, so pickle a copy.
+        distances = array.array('h')
+        distances.frombytes(self._distances.tobytes())
+
+        return (DistanceMatrix, (self._width, self._height, self._cells, distances))
 
 def computeDistances(layout):
     """
-    Runs UCS to all other positions from each position.
+    Runs a unit-cost BFS from each open cell to get the distance to all other open cells.
+    Returns a `DistanceMatrix`.
     """
 
-    distances = {}
-    allNodes = layout.walls.asList(False)
-
-    for source in allNodes:
-        dist = {}
-        closed = {}
+    width = layout.width
+    height = layout.height
+    walls = layout.walls
 
-        for node in allNodes:
-            dist[node] = sys.maxsize
+    cells = walls.asList(False)
+    numCells = len(cells)
 
-        queue = priorityQueue.PriorityQueue()
-        queue.push(source, 0)
-        dist[source] = 0
+    cellIds = {}
+    for (cellId, cell) in enumerate(cells):
+        cellIds[cell] = cellId
 
-        while not queue.isEmpty():
-            node = queue.pop()
-            if node in closed:
+    # The ids of the open cells adjacent to each cell.
+    neighbors = []
+    for (x, y) in cells:
+        adjacent = []
+        for (nextX, nextY) in [(x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)]:
+            if (nextX < 0 or nextX >= width or nextY < 0 or nextY >= height):
                 continue
 
-            closed[node] = True
-            nodeDist = dist[node]
-            adjacent = []
-            x, y = node
+            if (not walls.get(nextX, nextY)):
+                adjacent.append(cellIds[(nextX, nextY)])
+
+        neighbors.append(adjacent)
+
+    distances = array.array('h', [DEFAULT_DISTANCE]) * (numCells * numCells)
+    unreached = [DEFAULT_DISTANCE] * numCells
 
-            if not layout.isWall((x, y + 1)):
-                adjacent.append((x, y + 1))
+    for source in range(numCells):
+        row = unreached.copy()
+        row[source] = 0
 
-            if not layout.isWall((x, y - 1)):
-                adjacent.append((x, y - 1))
+        frontier = [source]
+        depth = 0
 
-            if not layout.isWall((x + 1, y)):
-                adjacent.append((x + 1, y))
+        while (len(frontier) > 0):
+            depth += 1
+            nextFrontier = []
 
-            if not layout.isWall((x - 1, y)):
-                adjacent.append((x - 1, y))
+            for node in frontier:
+                for other in neighbors[node]:
+                    if (row[other] == DEFAULT_DISTANCE):
+                        row[other] = depth
+                        nextFrontier.append(other)
 
-            for other in adjacent:
-                if other not in dist:
-                    continue
+            frontier = nextFrontier
 
-                oldDist = dist[other]
-                newDist = nodeDist + 1
-                if newDist < oldDist:
-                    dist[other] = newDist
-                    queue.push(other, newDist)
+        offset = source * numCells
+        distances[offset:offset + numCells] = array.array('h', row)
+
+    return DistanceMatrix(width, height, cells, distances)
+
+def getDefaultCacheDir():
+    """
+    Get where distance tables are cached on disk when no cacheDir is given:
+    the PACAI_DISTANCE_CACHE_DIR environment variable,
+    or None (only cache in this process) if it is not set (or empty).
+    """
 
-        for target in allNodes:
-            distances[(target, source)] = dist[target]
+    cacheDir = os.environ.get(CACHE_DIR_ENV_VAR, '')
+    if (cacheDir == ''):
+        return None
 
+    return cacheDir
+
+def getDistances(layout, cacheDir = DEFAULT_CACHE_DIR):
+    """
+    Get the `DistanceMatrix` for a layout.
+    Tables are looked up in the process-wide cache, then in cacheDir (when not None),
+    and only computed if neither has them.
+    Newly computed tables are saved to cacheDir.
+    """
+
+    key = getLayoutKey(layout)
+    if (key in _distanceCache):
+        return _distanceCache[key]
+
+    if (cacheDir is DEFAULT_CACHE_DIR):
+        cacheDir = getDefaultCacheDir()
+
+    distances = None
+    path = None
+
+    if (cacheDir is not None):
+        path = os.path.join(cacheDir, key + _FILE_EXTENSION)
+        distances = _readDistances(path, layout)
+
+    if (distances is None):
+        distances = computeDistances(layout)
+
+        if (path is not None):
+            _writeDistances(path, distances, key)
+
+    _distanceCache[key] = distances
     return distances
 
+def getLayoutKey(layout):
+    """
+    Get a key that identifies a layout (by the text of the layout).
+    """
+
+    text = '\n'.join(layout.layoutText)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def _readDistances(path, layout):
+    """
+    Load a distance table saved by _writeDistances().
+    The matrix is memory-mapped (not read into memory).
+    Returns None if the file does not exist, is not usable, or is not for this layout.
+    """
+
+    if (not os.path.isfile(path)):
+        return None
+
+    try:
+        with open(path, 'rb') as file:
+            data = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+    except (OSError, ValueError) as ex:
+        logging.warning("Unable to open distance file '%s': %s" % (path, str(ex)))
+        return None
+
+    if (len(data) < _FILE_HEADER.size):
+        return None
+
+    magic, byteorder, layoutKey, width, height, numCells = _FILE_HEADER.unpack_from(data)
+    if (magic != _FILE_MAGIC or byteorder != sys.byteorder[0].encode()):
+        return None
+
+    expectedCells = layout.walls.asList(False)
+    if (layoutKey != bytes.fromhex(getLayoutKey(layout))
+            or (width, height) != (layout.width, layout.height)
+            or numCells != len(expectedCells)):
+        logging.warning("Ignoring distance file for a different layout: '%s'." % (path))
+        return None
+
+    cellsSize = 2 * 2 * numCells
+    matrixSize = 2 * numCells * numCells
+    if (len(data) != _FILE_HEADER.size + cellsSize + matrixSize):
+        logging.warning("Ignoring truncated distance file: '%s'." % (path))
+        return None
+
+    offset = _FILE_HEADER.size
+    rawCells = array.array('h', data[offset:offset + cellsSize])
+    cells = list(zip(rawCells[0::2], rawCells[1::2]))
+
+    if (cells != expectedCells):
+        logging.warning("Ignoring distance file for a different layout: '%s'." % (path))
+        return None
+
+    offset += cellsSize
+    matrix = memoryview(data)[offset:offset + matrixSize].cast('h')
+
+    return DistanceMatrix(width, height, cells, matrix)
+
+def _writeDistances(path, distances, layoutKey):
+    """
+    Save a distance table so that _readDistances() can load it.
+    The file is written to a temp file and then moved into place,
+    so other processes never see a partial file.
+    Failing to write is not an error, the table just will not be cached.
+    """
+
+    rawCells = array.array('h')
+    for (x, y) in distances._cells:
+        rawCells.append(x)
+        rawCells.append(y)
+
+    header = _FILE_HEADER.pack(_FILE_MAGIC, sys.byteorder[0].encode(), bytes.fromhex(layoutKey),
+            distances._width, distances._height, distances._numCells)
+
+    tempPath = None
+
+    try:
+        # Only the user can write (or plant) cached tables.
+        os.makedirs(os.path.dirname(path), mode = 0o700, exist_ok = True)
+
+        handle, tempPath = tempfile.mkstemp(dir = os.path.dirname(path), suffix = '.tmp')
+        with os.fdopen(handle, 'wb') as file:
+            file.write(header)
+            file.write(rawCells.tobytes())
+            file.write(distances._distances.tobytes())
+
+        os.replace(tempPath, path)
+    except OSError as ex:
+        logging.warning("Unable to cache distances to '%s': %s" % (path, str(ex)))
+
+        if (tempPath is not None and os.path.exists(tempPath)):
+            os.remove(tempPath)
+
 def getDistanceOnGrid(distances, pos1, pos2):
-    key = (pos1, pos2)
-    if key in distances:
-        return distances[key]
+    if ((pos1, pos2) in distances):
+        return distances.getDistance(pos1, pos2)
 
     return DEFAULT_DISTANCE
@@ -0,0 +1,143 @@
+"""
+Encode game states as fixed-shape stacks of planes (a tensor), e.g. for learners and datasets.
+
+An encoding is a bytes object of size (NUM_PLANES * width * height),
+where the value for (plane, x, y) is at index (plane * width * height + x * height + y)
+(see `StateEncoder.getIndex`).
+Each value is a 1 or a 0.
+"""
+
+from pacai.util import util
+
+WALLS_PLANE = 0
+FOOD_PLANE = 1
+CAPSULES_PLANE = 2
+PACMAN_PLANE = 3
+GHOSTS_PLANE = 4
+SCARED_GHOSTS_PLANE = 5
+RED_SIDE_PLANE = 6  # Only set in capture.
+
+NUM_PLANES = 7
+
+class StateEncoder(object):
+    """
+    Encodes any `pacai.core.gamestate.AbstractGameState`.
+
+    The planes that never change (walls and sides) are built once per layout and shared
+    between encoders.
+    An encoder also keeps the last encoding it made, and only rewrites the cells that changed
+    since then, so encoding the states of a game in order is cheap.
+    """
+
+    # {(layout text, is capture): static planes}
+    _staticPlanes = {}
+
+    def __init__(self):
+        self._layout = None
+        self._area = 0
+        self._height = 0
+
+        # The last encoding, and what was put into its dynamic planes.
+        self._buffer = None
+        self._food = 0
+        self._capsules = set()
+        self._agentIndexes = []
+
+    def encode(self, state):
+        layout = state.getInitialLayout()
+        if (layout is not self._layout):
+            self._startLayout(layout, hasattr(state, 'isOnRedSide'))
+
+        buffer = self._buffer
+
+        # Food changes are found with a single XOR of the (bit-packed) boards.
+        food = state.getFood().toInt()
+        changed = food ^ self._food
+        offset = FOOD_PLANE * self._area
+
+        while (changed):
+            lowBit = changed & -changed
+            cell = lowBit.bit_length() - 1
+            buffer[offset + cell] = 1 if (food & lowBit) else 0
+            changed ^= lowBit
+
+        self._food = food
+
+        capsules = set(state.getCapsules())
+        for (x, y) in self._capsules - capsules:
+            buffer[self.getIndex(CAPSULES_PLANE, x, y)] = 0
+
+        for (x, y) in capsules - self._capsules:
+            buffer[self.getIndex(CAPSULES_PLANE, x, y)] = 1
+
+        self._capsules = capsules
+
+        # There are only a few agents, so just clear their old cells and mark the new ones.
+        for index in self._agentIndexes:
+            buffer[index] = 0
+
+        self._agentIndexes = []
+        for agentState in state.getAgentStates():
+            position = agentState.getPosition()
+            if (position is None):
+                continue
+
+            if (agentState.isPacman()):
+                plane = PACMAN_PLANE
+            elif (agentState.isScared()):
+                plane = SCARED_GHOSTS_PLANE
+            else:
+                plane = GHOSTS_PLANE
+
+            x, y = util.nearestPoint(position)
+            index = self.getIndex(plane, x, y)
+
+            buffer[index] = 1
+            self._agentIndexes.append(index)
+
+        return bytes(buffer)
+
+    def getIndex(self, plane, x, y):
+        """
+        Get the index of a value in an encoding.
+        """
+
+        return plane * self._area + x * self._height + y
+
+    def getShape(self):
+        """
+        Get the shape (planes, width, height) of the encodings for the current layout.
+        """
+
+        if (self._layout is None):
+            return None
+
+        return (NUM_PLANES, self._layout.getWidth(), self._layout.getHeight())
+
+    def _buildStaticPlanes(self, layout, isCapture):
+        buffer = bytearray(NUM_PLANES * self._area)
+
+        for (x, y) in layout.walls.asList():
+            buffer[self.getIndex(WALLS_PLANE, x, y)] = 1
+
+        if (isCapture):
+            # Red is on the left side (see `pacai.bin.capture.CaptureGameState.isOnRedSide`).
+            for x in range(int(layout.getWidth() / 2)):
+                for y in range(self._height):
+                    buffer[self.getIndex(RED_SIDE_PLANE, x, y)] = 1
+
+        return bytes(buffer)
+
+    def _startLayout(self, layout, isCapture):
+        self._layout = layout
+        self._height = layout.getHeight()
+        self._area = layout.getWidth() * self._height
+
+        key = (tuple(layout.layoutText), isCapture)
+        if (key not in StateEncoder._staticPlanes):
+            StateEncoder._staticPlanes[key] = self._buildStaticPlanes(layout, isCapture)
+
+        self._buffer = bytearray(StateEncoder._staticPlanes[key])
+        self._food = 0
+        self._capsules = set()
+        self._agentIndexes = []
@@ -24,7 +24,7 @@ class Environment(abc.ABC):
         Performs the given action in the current
         environment state and updates the enviornment.
 
-        Returns a (reward, nextState) pair.
+        Returns a (nextState, reward) pair.
         """
 
         pass
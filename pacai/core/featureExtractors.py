@@ -5,8 +5,12 @@ Feature extractors for game states.
 import abc
 
 from pacai.core.actions import Actions
-from pacai.core.search import search
-from pacai.student.searchAgents import AnyFoodSearchProblem
+from pacai.core.distance import distanceField
+from pacai.core.distance import manhattan
+from pacai.util.util import nearestPoint
+
+# The number of food layouts to keep distance fields for.
+FOOD_DISTANCES_CACHE_SIZE = 64
 
 class FeatureExtractor(abc.ABC):
     """
@@ -24,6 +28,55 @@ class FeatureExtractor(abc.ABC):
 
         pass
 
+    def getSparseFeatures(self, state, action, vocabulary):
+        """
+        Returns the features as parallel lists of (indexes, values),
+        where the indexes come from a `FeatureVocabulary`
+        (see `pacai.core.linear.LinearWeights`).
+        By default, this is just getFeatures() run through the vocabulary.
+        """
+
+        indexes = []
+        values = []
+
+        for (feature, value) in self.getFeatures(state, action).items():
+            indexes.append(vocabulary.getIndex(feature))
+            values.append(value)
+
+        return (indexes, values)
+
+class FeatureVocabulary(object):
+    """
+    Gives each feature (a key of a feature dict) a fixed index,
+    in the order that the features are first seen.
+    """
+
+    def __init__(self):
+        self._indexes = {}
+        self._features = []
+
+    def getFeature(self, index):
+        return self._features[index]
+
+    def getIndex(self, feature):
+        """
+        Get the index of a feature, adding it if it is new.
+        """
+
+        index = self._indexes.get(feature)
+        if (index is None):
+            index = len(self._features)
+            self._indexes[feature] = index
+            self._features.append(feature)
+
+        return index
+
+    def __contains__(self, feature):
+        return feature in self._indexes
+
+    def __len__(self):
+        return len(self._features)
+
 class IdentityExtractor(FeatureExtractor):
     def getFeatures(self, state, action):
         feats = {}
@@ -34,8 +87,16 @@ class IdentityExtractor(FeatureExtractor):
 class SimpleExtractor(FeatureExtractor):
     """
     Returns simple features for a basic reflex Pacman.
+
+    The distance to the closest food is looked up in a distance field
+    (see `pacai.core.distance.distanceField`) that is computed once per food layout
+    and shared by all the actions (and all the states with the same food).
     """
 
+    def __init__(self):
+        # {(walls, food) (as bit-packed ints): distance field}, oldest first.
+        self._foodDistances = {}
+
     def getFeatures(self, state, action):
         # Extract the grid of food and wall locations and get the ghost locations.
         food = state.getFood()
@@ -51,15 +112,17 @@ class SimpleExtractor(FeatureExtractor):
         next_x, next_y = int(x + dx), int(y + dy)
 
         # Count the number of ghosts 1-step away.
-        features["#-of-ghosts-1-step-away"] = sum((next_x, next_y) in
-                Actions.getLegalNeighbors(g, walls) for g in ghosts)
+        # A ghost's legal neighbors are the open cells within one step of its nearest grid point.
+        features["#-of-ghosts-1-step-away"] = 0
+        if (not walls.get(next_x, next_y)):
+            features["#-of-ghosts-1-step-away"] = sum(manhattan(nearestPoint(ghost),
+                    (next_x, next_y)) <= 1 for ghost in ghosts)
 
         # If there is no danger of ghosts then add the food feature.
-        if not features["#-of-ghosts-1-step-away"] and food[next_x][next_y]:
+        if not features["#-of-ghosts-1-step-away"] and food.get(next_x, next_y):
             features["eats-food"] = 1.0
 
-        prob = AnyFoodSearchProblem(state, start = (next_x, next_y))
-        dist = len(search.bfs(prob))
+        dist = self._getFoodDistances(food, walls).get((next_x, next_y))
         if dist is not None:
             # Make the distance a number less than one otherwise the update will diverge wildly.
             features["closest-food"] = float(dist) / (walls.getWidth() * walls.getHeight())
@@ -68,3 +131,17 @@ class SimpleExtractor(FeatureExtractor):
             features[key] /= 10.0
 
         return features
+
+    def _getFoodDistances(self, food, walls):
+        key = (walls.toInt(), food.toInt())
+
+        distances = self._foodDistances.get(key)
+        if (distances is None):
+            distances = distanceField(food.asList(), walls)
+
+            if (len(self._foodDistances) >= FOOD_DISTANCES_CACHE_SIZE):
+                del self._foodDistances[next(iter(self._foodDistances))]
+
+            self._foodDistances[key] = distances
+
+        return distances
@@ -18,6 +18,7 @@ class Game:
         self.startingIndex = startingIndex
         self.gameOver = False
         self.moveHistory = []
+        self.replayWriter = None
         self.totalAgentTimes = [0 for agent in agents]
         self.totalAgentTimeWarnings = [0 for agent in agents]
         self.agentTimeout = False
@@ -69,6 +70,8 @@ class Game:
 
             # Execute the action.
             self.moveHistory.append((agentIndex, action))
+            previousState = self.state
+
             try:
                 self.state = self.state.generateSuccessor(agentIndex, action)
             except Exception as ex:
@@ -78,6 +81,10 @@ class Game:
                 self._agentCrash(agentIndex, ex)
                 return False
 
+            # Only moves that were actually made are recorded (so a bad action can't break it).
+            if (self.replayWriter is not None):
+                self.replayWriter.writeMove(agentIndex, action, previousState)
+
             # Update the display.
             self.display.update(self.state)
 
@@ -200,3 +207,24 @@ class Game:
                 return False
 
         return True
+
+class GameResult(object):
+    """
+    A small, picklable summary of a finished game.
+    This is what is sent back from games that are run in other processes.
+    """
+
+    def __init__(self, game, seed = None):
+        self.seed = seed
+        self.score = game.state.getScore()
+        self.win = game.state.isWin()
+        self.numMoves = len(game.moveHistory)
+        self.agentCrashed = game.agentCrashed
+        self.agentTimeout = game.agentTimeout
+        self.totalAgentTimes = list(game.totalAgentTimes)
+
+    def getScore(self):
+        return self.score
+
+    def isWin(self):
+        return self.win
@@ -0,0 +1,249 @@
+"""
+Environments that step pacman and capture games directly, without a `pacai.core.game.Game`.
+
+A learner controls a single agent, and every other agent is played by a normal agent object
+(e.g. ghosts, or the other team in capture).
+An episode looks like:
+```
+observation = environment.reset()
+while (not done):
+    action = ...
+    observation, reward, done, info = environment.step(action)
+```
+The reward is the change in score (from the learner's point of view) since its last action,
+and observations are made by the environment's encoder (the raw game state by default).
+There is no view, so an episode costs no more than generating its successors.
+"""
+
+import abc
+
+from pacai.agents.ghost.random import RandomGhost
+from pacai.bin.capture import CaptureGameState
+from pacai.bin.pacman import PACMAN_AGENT_INDEX
+from pacai.bin.pacman import PacmanGameState
+from pacai.core.baselineTeam import createTeam
+from pacai.core.environment import Environment
+
+DEFAULT_CAPTURE_LENGTH = 1200
+
+class GameEnvironment(Environment):
+    """
+    The common stepping logic for game environments.
+    Subclasses make the initial state and the agents that the learner plays against.
+
+    encoder is a function that turns a game state into an observation
+    (e.g. the encode() method of a `pacai.core.encoder.StateEncoder`).
+    maxSteps (if set) ends episodes after the learner has taken that many actions.
+
+    When an episode ends (or is cut short by reset()),
+    the other agents get their final() call, just like at the end of a game.
+    """
+
+    def __init__(self, agentIndex, encoder = None, maxSteps = None):
+        self._agentIndex = agentIndex
+        self._encoder = encoder
+        self._maxSteps = maxSteps
+
+        self._agents = None
+        self._state = None
+        self._steps = 0
+        self._finished = True
+
+    def doAction(self, action):
+        """
+        Returns a (nextState, reward) pair (see `pacai.core.environment.Environment`).
+        """
+
+        observation, reward, done, info = self.step(action)
+        return (self._state, reward)
+
+    def getAgentIndex(self):
+        return self._agentIndex
+
+    def getCurrentState(self):
+        return self._state
+
+    def getPossibleActions(self, state):
+        if (self._isDone(state)):
+            return []
+
+        return state.getLegalActions(self._agentIndex)
+
+    def reset(self):
+        """
+        Start a new episode.
+        Returns the first observation.
+        """
+
+        self._finishEpisode()
+
+        self._state = self._createInitialState()
+        self._steps = 0
+        self._finished = False
+
+        self._agents = self._createAgents(self._state)
+        for (agentIndex, agent) in enumerate(self._agents):
+            if (agentIndex != self._agentIndex):
+                agent.registerInitialState(self._state)
+
+        # Let the agents that go before the learner move.
+        self._state = self._playOthers(self._state, 0)
+
+        return self._observe(self._state)
+
+    def step(self, action):
+        """
+        Take the learner's action, and then let all the other agents move.
+        Returns (observation, reward, done, info),
+        where info is a dict with the game's score and whether the game is over.
+        """
+
+        if (self._state is None):
+            raise RuntimeError('The environment must be reset() before it is stepped.')
+
+        if (self._isDone(self._state)):
+            raise RuntimeError("Can't step an environment that is done.")
+
+        oldValue = self._getValue(self._state)
+
+        state = self._state.generateSuccessor(self._agentIndex, action)
+        state = self._playOthers(state, self._agentIndex + 1)
+
+        self._state = state
+        self._steps += 1
+
+        reward = self._getValue(state) - oldValue
+        done = self._isDone(state)
+
+        if (done):
+            self._finishEpisode()
+
+        info = {
+            'score': state.getScore(),
+            'gameover': state.isOver(),
+        }
+
+        return (self._observe(state), reward, done, info)
+
+    @abc.abstractmethod
+    def _createAgents(self, state):
+        """
+        Get a list with an agent for every index (the learner's entry is ignored).
+        """
+
+        pass
+
+    @abc.abstractmethod
+    def _createInitialState(self):
+        pass
+
+    def _finishEpisode(self):
+        """
+        Tell the other agents that the episode is over (once per episode).
+        Agents are reused between episodes, so this is where they let go of the episode
+        (e.g. the observation history of a `pacai.agents.capture.capture.CaptureAgent`).
+        """
+
+        if (self._finished):
+            return
+
+        self._finished = True
+
+        for (agentIndex, agent) in enumerate(self._agents):
+            if (agentIndex != self._agentIndex and agent is not None):
+                agent.final(self._state)
+
+    def _getValue(self, state):
+        """
+        The score from the learner's point of view.
+        """
+
+        return state.getScore()
+
+    def _isDone(self, state):
+        return state.isOver() or (self._maxSteps is not None and self._steps >= self._maxSteps)
+
+    def _observe(self, state):
+        if (self._encoder is None):
+            return state
+
+        return self._encoder(state)
+
+    def _playOthers(self, state, agentIndex):
+        """
+        Let the other agents move (starting at agentIndex), until it is the learner's turn again.
+        """
+
+        numAgents = state.getNumAgents()
+        agentIndex %= numAgents
+
+        while (agentIndex != self._agentIndex and not self._isDone(state)):
+            agent = self._agents[agentIndex]
+
+            agent.observationFunction(state)
+            state = state.generateSuccessor(agentIndex, agent.getAction(state))
+
+            agentIndex = (agentIndex + 1) % numAgents
+
+        return state
+
+class PacmanEnvironment(GameEnvironment):
+    """
+    The learner plays pacman against ghosts.
+    ghostAgents is a list of agents for the ghosts (in index order),
+    it defaults to `pacai.agents.ghost.random.RandomGhost`s.
+    """
+
+    def __init__(self, layout, ghostAgents = None, **kwargs):
+        super().__init__(PACMAN_AGENT_INDEX, **kwargs)
+
+        self._layout = layout
+
+        self._ghostAgents = ghostAgents
+        if (self._ghostAgents is None):
+            self._ghostAgents = [RandomGhost(index + 1) for index in range(layout.getNumGhosts())]
+
+    def _createAgents(self, state):
+        return [None] + list(self._ghostAgents)
+
+    def _createInitialState(self):
+        return PacmanGameState(self._layout)
+
+class CaptureEnvironment(GameEnvironment):
+    """
+    The learner plays one agent in capture (agent 0, on the red team, by default).
+    otherAgents is a dict of agent index to agent for everyone else,
+    it defaults to the agents from `pacai.core.baselineTeam`.
+
+    Since there is no game to check the clock, an episode ends when the time runs out.
+    """
+
+    def __init__(self, layout, agentIndex = 0, otherAgents = None,
+            length = DEFAULT_CAPTURE_LENGTH, **kwargs):
+        super().__init__(agentIndex, **kwargs)
+
+        self._layout = layout
+        self._length = length
+
+        self._otherAgents = otherAgents
+        if (self._otherAgents is None):
+            self._otherAgents = {}
+            for isRed in [True, False]:
+                firstIndex = 0 if isRed else 1
+                for agent in createTeam(firstIndex, firstIndex + 2, isRed):
+                    self._otherAgents[agent.index] = agent
+
+    def _createAgents(self, state):
+        return [self._otherAgents.get(index) for index in range(state.getNumAgents())]
+
+    def _createInitialState(self):
+        return CaptureGameState(self._layout, self._length)
+
+    def _getValue(self, state):
+        if (state.isOnRedTeam(self._agentIndex)):
+            return state.getScore()
+
+        return -state.getScore()
+
+    def _isDone(self, state):
+        return super()._isDone(state) or state.getTimeleft() <= 0
@@ -3,7 +3,7 @@ import copy
 
 from pacai.core.agentstate import AgentState
 from pacai.core.directions import Directions
-from pacai.util import util
+from pacai.util import zobrist
 
 class AbstractGameState(abc.ABC):
     """
@@ -22,10 +22,6 @@ class AbstractGameState(abc.ABC):
 
         self._layout = layout
 
-        # Keep a copy of the hash, since it is expensive to compute.
-        # Any children should be sure to clear the hash when modifications are made.
-        self._hash = None
-
         # For food and capsules, we will only copy on write (if we eat one of them).
         # This avoid additional copies on successors that don't eat.
 
@@ -45,8 +41,17 @@ class AbstractGameState(abc.ABC):
         for (isPacman, position) in layout.agentPositions:
             self._agentStates.append(AgentState(position, Directions.STOP, isPacman))
 
+        # Agent states are also copy on write (see getMutableAgentState()).
+        # Bit i is set if agent state i is owned by this state (and can be modified in place).
+        self._agentStatesCopied = (1 << len(self._agentStates)) - 1
+
         self._score = 0
 
+        # A Zobrist hash (see `pacai.util.zobrist`) of everything but the agent states.
+        # It is computed once here and then updated in O(1) as the state changes.
+        # Agent states maintain their own hashes, which are mixed in by __hash__().
+        self._hash = self._computeHash()
+
     @abc.abstractmethod
     def generateSuccessor(self, agentIndex, action):
         """
@@ -65,8 +70,44 @@ class AbstractGameState(abc.ABC):
         pass
 
     def addScore(self, score):
-        self._hash = None
-        self._score += score
+        self.setScore(self._score + score)
+
+    def applyAction(self, agentIndex, action, trusted = False):
+        """
+        Apply the action to this state in place (instead of making a new state).
+        Returns an undo record that can be passed to undoAction() to roll the state back.
+
+        This is meant for search, where generating a successor (a copy of the state and
+        all its agent states) for every node is expensive.
+        Instead, a search can apply an action, recurse, and then undo the action.
+        This still copies the state's attributes and its list of agent states on every call
+        (only the agent states, food, and capsules are copied lazily),
+        so it is cheaper than generateSuccessor() but not free.
+
+        Undo records must be undone in the reverse order that they were applied.
+        The state may be the game's own state, so undo in a finally block
+        to roll back even if the search raises.
+
+        If trusted is true, then the action is assumed to be legal
+        (e.g. it just came from getLegalActions()) and is not checked again.
+        """
+
+        if (self.isOver()):
+            raise RuntimeError("Can't apply actions to a terminal state.")
+
+        # Everything is either immutable or copied (never modified) on write,
+        # so a shallow copy of the attributes is enough to roll back.
+        undo = self.__dict__.copy()
+
+        # Make everything copy on write, so the saved references are not modified.
+        self._foodCopied = False
+        self._capsulesCopied = False
+        self._agentStates = self._agentStates.copy()
+        self._agentStatesCopied = 0
+
+        self._applySuccessorAction(agentIndex, action, trusted)
+
+        return undo
 
     def eatCapsule(self, x, y):
         """
@@ -83,7 +124,7 @@ class AbstractGameState(abc.ABC):
         self._capsules.remove((x, y))
         self._lastCapsuleEaten = (x, y)
 
-        self._hash = None
+        self._hash ^= zobrist.getKey('capsule', x, y)
         return True
 
     def eatFood(self, x, y):
@@ -98,17 +139,19 @@ class AbstractGameState(abc.ABC):
             self._food = self._food.copy()
             self._foodCopied = True
 
-        self._food[x][y] = False
+        self._food.set(x, y, False)
         self._lastFoodEaten = (x, y)
 
-        self._hash = None
+        self._hash ^= zobrist.getKey('food', x, y)
         return True
 
     def endGame(self, win):
+        self._hash ^= zobrist.getKey('gameover', self._gameover, self._win)
+
         self._gameover = True
         self._win = win
 
-        self._hash = None
+        self._hash ^= zobrist.getKey('gameover', self._gameover, self._win)
 
     def getAgentPosition(self, index):
         """
@@ -137,6 +180,24 @@ class AbstractGameState(abc.ABC):
 
         return self._capsules
 
+    def getCheckpoint(self):
+        """
+        Get a JSON-friendly dict of everything that changes over the course of a game.
+        A fresh state on the same layout can be brought to this state with restoreCheckpoint().
+        """
+
+        return {
+            'score': self._score,
+            'gameover': self._gameover,
+            'win': self._win,
+            'lastAgentMoved': self._lastAgentMoved,
+            'food': self._food.asList(),
+            'capsules': list(self._capsules),
+            'agents': [[agentState.getPosition(), agentState.getDirection(),
+                    agentState.isPacman(), agentState.getScaredTimer()]
+                    for agentState in self._agentStates],
+        }
+
     def getFood(self):
         """
         Returns a Grid of boolean food indicator variables.
@@ -173,6 +234,20 @@ class AbstractGameState(abc.ABC):
     def getLastFoodEaten(self):
         return self._lastFoodEaten
 
+    def getMutableAgentState(self, index):
+        """
+        Get an agent state that can be modified.
+        Agent states are shared between a state and its successors until they are modified,
+        so the rules must use this (instead of getAgentState()) to get an agent state to change.
+        Everyone else should treat agent states as read-only.
+        """
+
+        if (not (self._agentStatesCopied & (1 << index))):
+            self._agentStates[index] = self._agentStates[index].copy()
+            self._agentStatesCopied |= (1 << index)
+
+        return self._agentStates[index]
+
     def getNumAgents(self):
         return len(self._agentStates)
 
@@ -217,14 +292,14 @@ class AbstractGameState(abc.ABC):
         Returns true if the location (x, y) has food.
         """
 
-        return self._food[x][y]
+        return self._food.get(x, y)
 
     def hasWall(self, x, y):
         """
         Returns true if (x, y) has a wall, false otherwise.
         """
 
-        return self._layout.walls[x][y]
+        return self._layout.walls.get(x, y)
 
     def isLose(self):
         return self.isOver() and not self._win
@@ -235,12 +310,90 @@ class AbstractGameState(abc.ABC):
     def isWin(self):
         return self.isOver() and self._win
 
+    def restoreCheckpoint(self, checkpoint):
+        """
+        Set this state to match a checkpoint from getCheckpoint().
+        This state must have been started from the same layout as the checkpointed state.
+        Objects that may be shared with other states are replaced rather than modified,
+        so this is safe to call on a shallow copy of another state.
+        """
+
+        self._score = checkpoint['score']
+        self._gameover = checkpoint['gameover']
+        self._win = checkpoint['win']
+        self._lastAgentMoved = checkpoint['lastAgentMoved']
+
+        self._food = self._food.copy()
+        self._foodCopied = True
+        for (x, y) in self._food.asList():
+            self._food.set(x, y, False)
+
+        for (x, y) in checkpoint['food']:
+            self._food.set(x, y, True)
+
+        self._capsules = [tuple(capsule) for capsule in checkpoint['capsules']]
+        self._capsulesCopied = True
+
+        self._lastFoodEaten = None
+        self._lastCapsuleEaten = None
+
+        agentStates = []
+        for (agentState, values) in zip(self._agentStates, checkpoint['agents']):
+            position, direction, isPacman, scaredTimer = values
+            if (position is not None):
+                position = tuple(position)
+
+            agentState = agentState.copy()
+            agentState._setPosition(position)
+            agentState._setDirection(direction)
+            agentState.setIsPacman(isPacman)
+            agentState.setScaredTimer(scaredTimer)
+
+            agentStates.append(agentState)
+
+        self._agentStates = agentStates
+        self._agentStatesCopied = (1 << len(agentStates)) - 1
+        self._hash = self._computeHash()
+
     def setHighlightLocations(self, locations):
         self._highlightLocations = list(locations)
 
     def setScore(self, score):
+        self._hash ^= zobrist.getKey('score', self._score) ^ zobrist.getKey('score', score)
         self._score = score
-        self._hash = None
+
+    def undoAction(self, undo):
+        """
+        Roll back an action applied with applyAction().
+        """
+
+        self.__dict__.update(undo)
+
+    @abc.abstractmethod
+    def _applySuccessorAction(self, agentIndex, action, trusted = False):
+        """
+        Apply the action to the context state (self).
+        Each game implements its rules here.
+        """
+
+        pass
+
+    def _computeHash(self):
+        """
+        Compute the hash of the score, game over flags, food, capsules, and layout from scratch.
+        """
+
+        hashCode = (zobrist.getKey('layout', tuple(self._layout.layoutText))
+                ^ zobrist.getKey('score', self._score)
+                ^ zobrist.getKey('gameover', self._gameover, self._win))
+
+        for (x, y) in self._food.asList():
+            hashCode ^= zobrist.getKey('food', x, y)
+
+        for (x, y) in self._capsules:
+            hashCode ^= zobrist.getKey('capsule', x, y)
+
+        return hashCode
 
     def _initSuccessor(self):
         """
@@ -249,15 +402,16 @@ class AbstractGameState(abc.ABC):
         """
 
         # Start with a shallow copy.
+        # The hash is also copied, since it is kept up-to-date as the successor is modified.
         successor = copy.copy(self)
-        successor._hash = None
 
         # Leave food and capsules as a shallow copy, but mark them to be copied on write.
         successor._foodCopied = False
         successor._capsulesCopied = False
 
-        # Agent states need to be deep copied.
-        successor._agentStates = [agentState.copy() for agentState in self._agentStates]
+        # Agent states are shared until they are modified.
+        successor._agentStates = self._agentStates.copy()
+        successor._agentStatesCopied = 0
 
         return successor
 
@@ -288,8 +442,8 @@ class AbstractGameState(abc.ABC):
                 and self._layout == other._layout)
 
     def __hash__(self):
-        if (self._hash is None):
-            self._hash = util.buildHash(self._score, self._gameover, self._win, *self._capsules,
-                self._food, *self._agentStates, self._layout)
+        hashCode = self._hash
+        for index in range(len(self._agentStates)):
+            hashCode ^= zobrist.mixIndex(hash(self._agentStates[index]), index)
 
-        return self._hash
+        return hashCode
@@ -1,8 +1,20 @@
+import sys
+
+# Python hashes a non-negative int as the value modulo this Mersenne prime (2^61 - 1 on 64 bit).
+# Since the bitboard is just an int, we can maintain its hash incrementally.
+_HASH_MODULUS = sys.hash_info.modulus
+_HASH_BITS = _HASH_MODULUS.bit_length()
+
 class Grid:
     """
-    A 2-dimensional array of objects backed by a list of lists.
+    A 2-dimensional array of booleans backed by a single bit-packed integer (a bitboard).
     Data is accessed via grid[x][y] where (x, y) are positions on a Pacman map with x horizontal,
     y vertical and the origin (0, 0) in the bottom left corner.
+
+    The cell (x, y) is stored in bit (x * height + y).
+    Since Python ints are immutable, copies are O(1) and share the board until one is written to.
+    The hash and the number of true cells are maintained on every write,
+    so hashing and counting do not need to scan the board.
     """
 
     def __init__(self, width, height, initialValue = False):
@@ -11,74 +23,198 @@ class Grid:
 
         self._width = width
         self._height = height
-        self._data = [[initialValue for y in range(height)] for x in range(width)]
+
+        self._bits = 0
+        self._count = 0
+        self._hash = 0
+
+        if (initialValue):
+            self._setBits((1 << (width * height)) - 1)
 
     def asList(self, key = True):
-        values = []
+        """
+        Get a list of all the (x, y) positions that hold the given value.
+        Positions are ordered by x and then y.
+        """
 
-        for x in range(self._width):
-            for y in range(self._height):
-                if self[x][y] == key:
-                    values.append((x, y))
+        bits = self._bits
+        if (not key):
+            bits = ~bits & self._mask()
+
+        values = []
+        while (bits):
+            lowBit = bits & -bits
+            values.append(self._cellIndexToPosition(lowBit.bit_length() - 1))
+            bits ^= lowBit
 
         return values
 
     def copy(self):
-        grid = Grid(self._width, self._height)
-        grid._data = [row.copy() for row in self._data]
+        grid = Grid.__new__(Grid)
+
+        grid._width = self._width
+        grid._height = self._height
+        grid._bits = self._bits
+        grid._count = self._count
+        grid._hash = self._hash
+
         return grid
 
-    def count(self, item =True):
-        return sum([x.count(item) for x in self._data])
+    def count(self, item = True):
+        if (item):
+            return self._count
+
+        return (self._width * self._height) - self._count
 
     def deepCopy(self):
         return self.copy()
 
+    def get(self, x, y):
+        """
+        Get the value at (x, y).
+        This is the same as grid[x][y], but skips building a column view.
+        """
+
+        return bool((self._bits >> self._positionToCellIndex(x, y)) & 1)
+
     def getHeight(self):
         return self._height
 
     def getWidth(self):
         return self._width
 
+    def set(self, x, y, value):
+        """
+        Set the value at (x, y).
+        This is the same as grid[x][y] = value, but skips building a column view.
+        """
+
+        index = self._positionToCellIndex(x, y)
+        isSet = (self._bits >> index) & 1
+
+        if (bool(value) == bool(isSet)):
+            return
+
+        weight = 1 << (index % _HASH_BITS)
+        if (value):
+            self._bits |= (1 << index)
+            self._count += 1
+            self._hash = (self._hash + weight) % _HASH_MODULUS
+        else:
+            self._bits ^= (1 << index)
+            self._count -= 1
+            self._hash = (self._hash - weight) % _HASH_MODULUS
+
     def shallowCopy(self):
-        grid = Grid(self._width, self._height)
-        grid._data = self._data
-        return grid
+        """
+        Since the underlying board is immutable until written, this is the same as copy().
+        """
+
+        return self.copy()
+
+    def toInt(self):
+        """
+        Get the whole board as a bit-packed int, where cell (x, y) is bit (x * height + y).
+        """
+
+        return self._bits
 
     def _cellIndexToPosition(self, index):
-        x = index / self._height
-        y = index % self._height
+        return divmod(index, self._height)
 
-        return x, y
+    def _mask(self):
+        return (1 << (self._width * self._height)) - 1
+
+    def _positionToCellIndex(self, x, y):
+        # Allow negative indexing like the lists that used to back grids.
+        if (x < 0):
+            x += self._width
+
+        if (y < 0):
+            y += self._height
+
+        if (x < 0 or x >= self._width or y < 0 or y >= self._height):
+            raise IndexError('Grid position out of range: (%s, %s).' % (str(x), str(y)))
+
+        return x * self._height + y
+
+    def _setBits(self, bits):
+        """
+        Replace the entire board and recompute the derived values.
+        """
+
+        self._bits = bits
+        self._count = bin(bits).count('1')
+        self._hash = bits % _HASH_MODULUS
 
     def __eq__(self, other):
         if (other is None):
             return False
 
-        return self._data == other._data
+        return (self._bits == other._bits
+                and self._width == other._width
+                and self._height == other._height)
 
     def __getitem__(self, i):
-        return self._data[i]
+        if (i < 0):
+            i += self._width
 
-    def __hash__(self):
-        hashcode = 0
-        base = 1
+        if (i < 0 or i >= self._width):
+            raise IndexError('Grid column out of range: %s.' % (str(i)))
 
-        for row in self._data:
-            for value in row:
-                if (value):
-                    hashcode += base
-                base *= 2
+        return _GridColumn(self, i)
 
-        return hash(hashcode)
+    def __hash__(self):
+        # Matches hash(self._bits), which is what the list-backed grid used to compute.
+        return self._hash
 
     def __lt__(self, other):
         return self.__hash__() < other.__hash__()
 
     def __setitem__(self, key, item):
-        self._data[key] = item
+        """
+        Replace an entire column: grid[x] = [values for y].
+        """
+
+        if (len(item) != self._height):
+            raise ValueError('Column size (%d) does not match grid height (%d).' %
+                    (len(item), self._height))
+
+        for y in range(self._height):
+            self.set(key, y, item[y])
 
     def __str__(self):
-        out = [[str(self._data[x][y])[0] for x in range(self._width)] for y in range(self._height)]
+        out = [[str(self.get(x, y))[0] for x in range(self._width)] for y in range(self._height)]
         out.reverse()
         return '\n'.join([''.join(x) for x in out])
+
+class _GridColumn:
+    """
+    A lightweight view of a single column of a grid.
+    This allows the classic grid[x][y] notation to read and write the underlying bitboard.
+    """
+
+    __slots__ = ('_grid', '_x')
+
+    def __init__(self, grid, x):
+        self._grid = grid
+        self._x = x
+
+    def __getitem__(self, y):
+        return self._grid.get(self._x, y)
+
+    def __setitem__(self, y, value):
+        self._grid.set(self._x, y, value)
+
+    def __iter__(self):
+        for y in range(self._grid._height):
+            yield self._grid.get(self._x, y)
+
+    def __len__(self):
+        return self._grid._height
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def count(self, item):
+        return list(self).count(item)
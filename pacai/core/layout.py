@@ -1,6 +1,7 @@
 import os
 import random
 
+from pacai.core.actions import Actions
 from pacai.core.distance import manhattan
 from pacai.core.grid import Grid
 
@@ -26,9 +27,44 @@ class Layout(object):
 
         self.processLayoutText(layoutText, maxGhosts)
 
+        # Tables of the actions for each cell, built the first time they are needed.
+        # See getPossibleActions() and getNonReversingActions().
+        self._possibleActions = None
+        self._nonReversingActions = None
+
+    def getNonReversingActions(self, position, direction):
+        """
+        Same as `pacai.core.actions.Actions.getNonReversingActions` on this layout's walls,
+        but looked up in a precomputed table when the position is on a grid point.
+        """
+
+        if (self._nonReversingActions is None):
+            self._buildActionTables()
+
+        actions = self._nonReversingActions.get((position[0], position[1], direction))
+        if (actions is None):
+            return Actions.getNonReversingActions(position, direction, self.walls)
+
+        return list(actions)
+
     def getNumGhosts(self):
         return self.numGhosts
 
+    def getPossibleActions(self, position, direction):
+        """
+        Same as `pacai.core.actions.Actions.getPossibleActions` on this layout's walls,
+        but looked up in a precomputed table when the position is on a grid point.
+        """
+
+        if (self._possibleActions is None):
+            self._buildActionTables()
+
+        actions = self._possibleActions.get(position)
+        if (actions is None):
+            return Actions.getPossibleActions(position, direction, self.walls)
+
+        return list(actions)
+
     def isWall(self, pos):
         x, col = pos
         return self.walls[x][col]
@@ -118,6 +154,12 @@ class Layout(object):
             self.agentPositions.append((int(layoutChar), (x, y)))
             self.numGhosts += 1
 
+    def _buildActionTables(self):
+        # Walls never change, so the actions at each grid point never change.
+        tables = Actions.getPossibleActionsTables(self.walls)
+        self._possibleActions, self._nonReversingActions = tables
+
+
 def getLayout(name, layout_dir = DEFAULT_LAYOUT_DIR, maxGhosts = None):
     if (not name.endswith('.lay')):
         name += '.lay'
@@ -0,0 +1,95 @@
+"""
+A store of weights for linear functions over sparse features, like approximate Q-values.
+"""
+
+import array
+import operator
+
+from pacai.core.featureExtractors import FeatureVocabulary
+
+class LinearWeights(object):
+    """
+    Weights held in a flat array of doubles,
+    indexed by a `pacai.core.featureExtractors.FeatureVocabulary`.
+    Features are given as parallel lists of (indexes, values)
+    (see `pacai.core.featureExtractors.FeatureExtractor.getSparseFeatures`),
+    so only the features that are present are touched.
+    Weights for features that have not been updated yet are 0.
+    """
+
+    def __init__(self, vocabulary = None):
+        self._vocabulary = vocabulary
+        if (self._vocabulary is None):
+            self._vocabulary = FeatureVocabulary()
+
+        self._weights = array.array('d')
+
+    def add(self, indexes, values, scale):
+        """
+        weights += scale * features
+        """
+
+        self._grow()
+
+        weights = self._weights
+        for (index, value) in zip(indexes, values):
+            weights[index] += scale * value
+
+    def dot(self, indexes, values):
+        """
+        Get (weights * features).
+        """
+
+        self._grow()
+        return sum(map(operator.mul, map(self._weights.__getitem__, indexes), values))
+
+    def dotAll(self, featureBatch):
+        """
+        Get (weights * features) for each (indexes, values) in a batch.
+        """
+
+        self._grow()
+
+        getWeight = self._weights.__getitem__
+        return [sum(map(operator.mul, map(getWeight, indexes), values))
+                for (indexes, values) in featureBatch]
+
+    def get(self, feature):
+        """
+        Get the weight of a single feature (0 for unknown features).
+        """
+
+        if (feature not in self._vocabulary):
+            return 0.0
+
+        self._grow()
+        return self._weights[self._vocabulary.getIndex(feature)]
+
+    def getVocabulary(self):
+        return self._vocabulary
+
+    def items(self):
+        """
+        Get a list of (feature, weight) pairs for every known feature.
+        """
+
+        self._grow()
+        return [(self._vocabulary.getFeature(index), weight)
+                for (index, weight) in enumerate(self._weights)]
+
+    def set(self, feature, weight):
+        index = self._vocabulary.getIndex(feature)
+        self._grow()
+        self._weights[index] = weight
+
+    def _grow(self):
+        """
+        Make room for any features that were added to the vocabulary since the last call.
+        """
+
+        missing = len(self._vocabulary) - len(self._weights)
+        if (missing > 0):
+            self._weights.extend([0.0] * missing)
+
+    def __len__(self):
+        return len(self._vocabulary)
@@ -0,0 +1,404 @@
+"""
+Solvers for `pacai.core.mdp.MarkovDecisionProcess`es.
+
+An MDP is first compiled (see `CompiledMDP`) into flat arrays:
+states and actions become indexes, and the transitions become a sparse matrix
+with one row per (state, action) pair (in compressed sparse row form).
+A Bellman backup of every state is then a sparse matrix-vector product
+followed by a max over each state's rows,
+with no calls back into the MDP.
+
+All the solvers take the same arguments (see `valueIteration`),
+and return a `MDPSolution` that reports how many backups were done and how long it took,
+so solvers can be compared on the same MDP (see `SOLVERS`).
+"""
+
+import array
+import operator
+import time
+
+from pacai.util.priorityQueue import PriorityQueue
+
+class CompiledMDP(object):
+    """
+    An MDP compiled into sparse arrays.
+
+    For row r (a single (state, action) pair),
+    the transitions are at [rowStarts[r], rowStarts[r + 1]) in nextStates and probabilities,
+    and rewards[r] is the expected immediate reward.
+    The rows of state s are [actionStarts[s], actionStarts[s + 1]),
+    so states with no actions (like terminal states) have no rows.
+    """
+
+    def __init__(self, mdp):
+        self.mdp = mdp
+
+        self.states = list(mdp.getStates())
+        self.stateIndexes = {state: index for (index, state) in enumerate(self.states)}
+
+        self.actionStarts = array.array('l', [0])
+        self.rowActions = []
+
+        self.rowStarts = array.array('l', [0])
+        self.nextStates = array.array('l')
+        self.probabilities = array.array('d')
+        self.rewards = array.array('d')
+
+        for state in self.states:
+            for action in mdp.getPossibleActions(state):
+                reward = 0.0
+                for (nextState, probability) in mdp.getTransitionStatesAndProbs(state, action):
+                    self.nextStates.append(self.stateIndexes[nextState])
+                    self.probabilities.append(probability)
+                    reward += probability * mdp.getReward(state, action, nextState)
+
+                self.rowActions.append(action)
+                self.rowStarts.append(len(self.nextStates))
+                self.rewards.append(reward)
+
+            self.actionStarts.append(len(self.rowActions))
+
+        self._predecessors = None
+
+    def getActiveStates(self):
+        """
+        Get the indexes of all the states that have actions.
+        States without actions keep their value.
+        """
+
+        actionStarts = self.actionStarts
+        return [state for state in range(len(self.states))
+                if (actionStarts[state] != actionStarts[state + 1])]
+
+    def getBestRow(self, state, values, discountRate):
+        """
+        Get the row of the best action in a state (the first on ties),
+        or None if the state has no actions.
+        """
+
+        rows = range(self.actionStarts[state], self.actionStarts[state + 1])
+        if (len(rows) == 0):
+            return None
+
+        qvalues = [self.getRowQValue(row, values, discountRate) for row in rows]
+        return rows[qvalues.index(max(qvalues))]
+
+    def getNumRows(self):
+        return len(self.rowActions)
+
+    def getNumStates(self):
+        return len(self.states)
+
+    def getPredecessors(self):
+        """
+        Get, for each state, the indexes of the states with an action that can lead to it.
+        """
+
+        if (self._predecessors is None):
+            predecessors = [set() for _ in self.states]
+
+            for state in range(len(self.states)):
+                for row in range(self.actionStarts[state], self.actionStarts[state + 1]):
+                    for nextState in self.nextStates[self.rowStarts[row]:self.rowStarts[row + 1]]:
+                        predecessors[nextState].add(state)
+
+            self._predecessors = [sorted(states) for states in predecessors]
+
+        return self._predecessors
+
+    def getQValues(self, values, discountRate):
+        """
+        Get the Q-value of every row (a sparse matrix-vector product),
+        where values is a list with the value of each state.
+        """
+
+        rowStarts = self.rowStarts
+        nextStates = self.nextStates
+        probabilities = self.probabilities
+        rewards = self.rewards
+        getValue = values.__getitem__
+
+        return [rewards[row] + discountRate * sum(map(operator.mul,
+                probabilities[rowStarts[row]:rowStarts[row + 1]],
+                map(getValue, nextStates[rowStarts[row]:rowStarts[row + 1]])))
+                for row in range(len(rewards))]
+
+    def getRowQValue(self, row, values, discountRate):
+        """
+        Get the Q-value of a single row.
+        """
+
+        start = self.rowStarts[row]
+        end = self.rowStarts[row + 1]
+
+        return self.rewards[row] + discountRate * sum(map(operator.mul,
+                self.probabilities[start:end], map(values.__getitem__, self.nextStates[start:end])))
+
+    def getStateValue(self, state, values, discountRate):
+        """
+        Get the backed up value of a single state (the max of its Q-values).
+        """
+
+        return max([self.getRowQValue(row, values, discountRate)
+                for row in range(self.actionStarts[state], self.actionStarts[state + 1])])
+
+class MDPSolution(object):
+    """
+    The values found by a solver, along with how much work it took.
+
+    iterations are sweeps for value iteration and Gauss-Seidel,
+    values updated for prioritized sweeping,
+    and policy improvements for policy iteration.
+    backups are the number of times a state's value was computed from its successors.
+    """
+
+    def __init__(self, compiledMDP, discountRate, values, iterations, backups, seconds):
+        self.compiledMDP = compiledMDP
+        self.discountRate = discountRate
+        self.values = values
+        self.iterations = iterations
+        self.backups = backups
+        self.seconds = seconds
+
+    def getPolicy(self, state):
+        """
+        Get the best action in a state according to the values (None if there are no actions).
+        """
+
+        row = self.compiledMDP.getBestRow(self.compiledMDP.stateIndexes[state],
+                self.values, self.discountRate)
+        if (row is None):
+            return None
+
+        return self.compiledMDP.rowActions[row]
+
+    def getValue(self, state):
+        return self.values[self.compiledMDP.stateIndexes[state]]
+
+    def getValues(self):
+        """
+        Get a dict of state to value.
+        """
+
+        return dict(zip(self.compiledMDP.states, self.values))
+
+def gaussSeidel(mdp, discountRate, iterations, tolerance = 0.0, values = None):
+    """
+    Value iteration that updates values in place,
+    so each backup in a sweep already sees the values backed up before it in the same sweep.
+    Takes the same arguments as `valueIteration`.
+    """
+
+    startTime = time.time()
+
+    compiledMDP = _compile(mdp)
+    values = _initValues(compiledMDP, values)
+    activeStates = compiledMDP.getActiveStates()
+
+    iteration = 0
+    backups = 0
+
+    while (iteration < iterations):
+        delta = 0.0
+        for state in activeStates:
+            value = compiledMDP.getStateValue(state, values, discountRate)
+            delta = max(delta, abs(value - values[state]))
+            values[state] = value
+
+        iteration += 1
+        backups += len(activeStates)
+
+        if (delta <= tolerance):
+            break
+
+    return MDPSolution(compiledMDP, discountRate, values, iteration, backups,
+            time.time() - startTime)
+
+def getSolver(name):
+    """
+    Get a solver function from its name in `SOLVERS`.
+    """
+
+    if (name not in SOLVERS):
+        raise ValueError("Unknown MDP solver: '%s'. Known solvers: %s." % (name,
+                ', '.join(sorted(SOLVERS))))
+
+    return SOLVERS[name]
+
+def policyIteration(mdp, discountRate, iterations, tolerance = 0.0, values = None,
+        evaluationSweeps = 100):
+    """
+    (Modified) policy iteration:
+    alternately evaluate the current policy (with up to evaluationSweeps in-place sweeps,
+    stopping once no value changes by more than the tolerance)
+    and improve the policy greedily.
+    Stops after the given number of improvements, or once the policy is stable.
+    Takes the same arguments as `valueIteration`.
+    """
+
+    startTime = time.time()
+
+    compiledMDP = _compile(mdp)
+    values = _initValues(compiledMDP, values)
+    activeStates = compiledMDP.getActiveStates()
+
+    policy = [compiledMDP.getBestRow(state, values, discountRate) for state in activeStates]
+
+    iteration = 0
+    backups = len(activeStates)
+
+    while (iteration < iterations):
+        for _ in range(evaluationSweeps):
+            delta = 0.0
+            for (state, row) in zip(activeStates, policy):
+                value = compiledMDP.getRowQValue(row, values, discountRate)
+                delta = max(delta, abs(value - values[state]))
+                values[state] = value
+
+            backups += len(activeStates)
+
+            if (delta <= tolerance):
+                break
+
+        # Only switch actions when strictly better, so ties can't keep the policy from settling.
+        newPolicy = []
+        for (state, row) in zip(activeStates, policy):
+            bestRow = compiledMDP.getBestRow(state, values, discountRate)
+            if (compiledMDP.getRowQValue(bestRow, values, discountRate)
+                    > compiledMDP.getRowQValue(row, values, discountRate)):
+                row = bestRow
+
+            newPolicy.append(row)
+
+        iteration += 1
+        backups += len(activeStates)
+
+        if (newPolicy == policy):
+            break
+
+        policy = newPolicy
+
+    return MDPSolution(compiledMDP, discountRate, values, iteration, backups,
+            time.time() - startTime)
+
+def prioritizedSweeping(mdp, discountRate, iterations, tolerance = 0.0, values = None):
+    """
+    Back up states in order of their Bellman error (the change a backup would make),
+    and after a state changes only re-check the states that can lead to it.
+    States whose error is not more than the tolerance are not updated.
+    Stops once no state is left to update,
+    or after as many backups as the given number of full sweeps would do.
+    Takes the same arguments as `valueIteration`.
+    """
+
+    startTime = time.time()
+
+    compiledMDP = _compile(mdp)
+    values = _initValues(compiledMDP, values)
+    activeStates = compiledMDP.getActiveStates()
+    predecessors = compiledMDP.getPredecessors()
+
+    maxBackups = iterations * len(activeStates)
+    hasActions = [False] * compiledMDP.getNumStates()
+
+    # The backed up value of each state in the queue.
+    # The queue can't change priorities, so a state may be in it more than once;
+    # only its first (highest priority) entry is used.
+    pendingValues = {}
+    queue = PriorityQueue()
+
+    for state in activeStates:
+        hasActions[state] = True
+
+        value = compiledMDP.getStateValue(state, values, discountRate)
+        error = abs(value - values[state])
+        if (error > tolerance):
+            pendingValues[state] = value
+            queue.push(state, -error)
+
+    updates = 0
+    backups = len(activeStates)
+
+    while (not queue.isEmpty() and backups < maxBackups):
+        state = queue.pop()
+        if (state not in pendingValues):
+            continue
+
+        values[state] = pendingValues.pop(state)
+        updates += 1
+
+        for predecessor in predecessors[state]:
+            if (not hasActions[predecessor]):
+                continue
+
+            value = compiledMDP.getStateValue(predecessor, values, discountRate)
+            backups += 1
+
+            error = abs(value - values[predecessor])
+            if (error > tolerance):
+                pendingValues[predecessor] = value
+                queue.push(predecessor, -error)
+            else:
+                pendingValues.pop(predecessor, None)
+
+    return MDPSolution(compiledMDP, discountRate, values, updates, backups,
+            time.time() - startTime)
+
+def valueIteration(mdp, discountRate, iterations, tolerance = 0.0, values = None):
+    """
+    Synchronous value iteration: every sweep backs up all the states from the last sweep's values.
+    Stops after the given number of iterations,
+    or as soon as a sweep changes no value by more than the tolerance.
+
+    mdp may be a `CompiledMDP` (to reuse the compilation) or any MDP.
+    values (a list in compiled state order) are the initial values, all zeros by default.
+    """
+
+    startTime = time.time()
+
+    compiledMDP = _compile(mdp)
+    values = _initValues(compiledMDP, values)
+    actionStarts = compiledMDP.actionStarts
+    activeStates = compiledMDP.getActiveStates()
+
+    iteration = 0
+    backups = 0
+
+    while (iteration < iterations):
+        qvalues = compiledMDP.getQValues(values, discountRate)
+
+        newValues = list(values)
+        for state in activeStates:
+            newValues[state] = max(qvalues[actionStarts[state]:actionStarts[state + 1]])
+
+        iteration += 1
+        backups += len(activeStates)
+
+        delta = max([abs(newValue - value) for (newValue, value) in zip(newValues, values)],
+                default = 0.0)
+        values = newValues
+
+        if (delta <= tolerance):
+            break
+
+    return MDPSolution(compiledMDP, discountRate, values, iteration, backups,
+            time.time() - startTime)
+
+def _compile(mdp):
+    if (isinstance(mdp, CompiledMDP)):
+        return mdp
+
+    return CompiledMDP(mdp)
+
+def _initValues(compiledMDP, values):
+    if (values is None):
+        return [0.0] * compiledMDP.getNumStates()
+
+    return list(values)
+
+SOLVERS = {
+    'gauss-seidel': gaussSeidel,
+    'policy': policyIteration,
+    'prioritized': prioritizedSweeping,
+    'value': valueIteration,
+}
@@ -0,0 +1,183 @@
+"""
+Save and load what learning agents have learned (Q-values and linear weights),
+so that training can be resumed in a later run.
+
+A file is laid out as:
+```
+    MAGIC
+    varint(header size) JSON header (the kind of table, its actions or features, and its size)
+    arrays ...
+```
+Q-values are keyed by state key (see `getStateKey`) rather than by pickled states,
+and are stored as three parallel arrays:
+state keys (unsigned 64 bit), action indexes into the header's actions (unsigned 16 bit),
+and values (doubles).
+Weights are a single array of doubles in the order of the header's features.
+Arrays are little-endian.
+Like replays, loading a file never executes code from the file.
+"""
+
+import array
+import json
+import sys
+
+from pacai.core.featureExtractors import FeatureVocabulary
+from pacai.core.gamestate import AbstractGameState
+from pacai.core.linear import LinearWeights
+from pacai.core.replay import decodeVarint
+from pacai.core.replay import encodeVarint
+from pacai.util import zobrist
+
+MAGIC = b'PACAIQT1'
+
+QVALUES_TYPE = 'qvalues'
+WEIGHTS_TYPE = 'weights'
+
+def getStateKey(state):
+    """
+    Get a 64 bit key for a state that is the same in every process.
+    Game states use their (Zobrist) hash,
+    and anything else (like gridworld positions) is keyed by its value
+    (see `pacai.util.zobrist.getKey`).
+    """
+
+    if (isinstance(state, AbstractGameState)):
+        return hash(state) & zobrist.KEY_MASK
+
+    return zobrist.getKey('state', state)
+
+def loadQValues(path):
+    """
+    Load Q-values saved with saveQValues().
+    Returns a dict of (state key, action) to value.
+    """
+
+    header, data, offset = _read(path, QVALUES_TYPE)
+    actions = [_decodeValue(action) for action in header['actions']]
+    count = header['count']
+
+    keys, offset = _readArray(data, offset, 'Q', count)
+    actionIndexes, offset = _readArray(data, offset, 'H', count)
+    values, offset = _readArray(data, offset, 'd', count)
+
+    return {(key, actions[actionIndex]): value
+            for (key, actionIndex, value) in zip(keys, actionIndexes, values)}
+
+def loadWeights(path):
+    """
+    Load weights saved with saveWeights().
+    Returns a `pacai.core.linear.LinearWeights`.
+    """
+
+    header, data, offset = _read(path, WEIGHTS_TYPE)
+    values, offset = _readArray(data, offset, 'd', len(header['features']))
+
+    weights = LinearWeights(FeatureVocabulary())
+    for (feature, value) in zip(header['features'], values):
+        weights.set(_decodeValue(feature), value)
+
+    return weights
+
+def saveQValues(path, qvalues):
+    """
+    Save a dict of (state key, action) to Q-value.
+    Actions must be JSON-friendly (like directions).
+    """
+
+    actions = []
+    actionIndexes = {}
+
+    keys = array.array('Q')
+    indexes = array.array('H')
+    values = array.array('d')
+
+    for ((key, action), value) in qvalues.items():
+        if (action not in actionIndexes):
+            actionIndexes[action] = len(actions)
+            actions.append(action)
+
+        keys.append(key)
+        indexes.append(actionIndexes[action])
+        values.append(value)
+
+    header = {
+        'type': QVALUES_TYPE,
+        'actions': [_encodeValue(action) for action in actions],
+        'count': len(keys),
+    }
+
+    _write(path, header, [keys, indexes, values])
+
+def saveWeights(path, weights):
+    """
+    Save a `pacai.core.linear.LinearWeights`.
+    Features must be JSON-friendly (strings, numbers, and tuples of those).
+    """
+
+    features = []
+    values = array.array('d')
+
+    for (feature, value) in weights.items():
+        features.append(_encodeValue(feature))
+        values.append(value)
+
+    header = {
+        'type': WEIGHTS_TYPE,
+        'features': features,
+    }
+
+    _write(path, header, [values])
+
+def _decodeValue(value):
+    # JSON turns tuples into lists, so turn them back (into hashable tuples).
+    if (isinstance(value, list)):
+        return tuple([_decodeValue(item) for item in value])
+
+    return value
+
+def _encodeValue(value):
+    if (isinstance(value, tuple)):
+        return [_encodeValue(item) for item in value]
+
+    if (value is None or isinstance(value, (str, int, float, bool))):
+        return value
+
+    raise ValueError("Can't save a value of type %s: %s." % (type(value).__name__, str(value)))
+
+def _read(path, expectedType):
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    if (not data.startswith(MAGIC)):
+        raise ValueError("Not a Q-table file: '%s'." % (path))
+
+    headerSize, offset = decodeVarint(data, len(MAGIC))
+    header = json.loads(data[offset:offset + headerSize].decode())
+
+    if (header['type'] != expectedType):
+        raise ValueError("Expected %s in '%s', found %s." % (expectedType, path, header['type']))
+
+    return header, data, offset + headerSize
+
+def _readArray(data, offset, typecode, count):
+    values = array.array(typecode)
+    size = values.itemsize * count
+
+    values.frombytes(data[offset:offset + size])
+    if (sys.byteorder != 'little'):
+        values.byteswap()
+
+    return values, offset + size
+
+def _write(path, header, arrays):
+    headerBytes = json.dumps(header, separators = (',', ':')).encode()
+
+    with open(path, 'wb') as file:
+        file.write(MAGIC + encodeVarint(len(headerBytes)) + headerBytes)
+
+        for values in arrays:
+            if (sys.byteorder != 'little'):
+                values = array.array(values.typecode, values)
+                values.byteswap()
+
+            file.write(values.tobytes())
@@ -0,0 +1,392 @@
+"""
+A compact, streamable format for recording and replaying games.
+
+A replay file is laid out as:
+```
+    MAGIC
+    varint(header size) JSON header (the layout text, keyframe interval, and game metadata)
+    records ...
+```
+Each record starts with a varint.
+A non-zero varint is a single move, encoded as `1 + agentIndex * NUM_ACTIONS + actionIndex`
+(so most moves take a single byte).
+A zero is a keyframe, which is followed by `varint(turn) varint(checkpoint size) checkpoint`.
+Keyframes are written every keyframe interval turns.
+The checkpoint is the JSON of the game state's getCheckpoint() before the keyframe's turn,
+so a reader can get the state at any turn by restoring the closest checkpoint
+and simulating at most a keyframe interval of moves (see `ReplayReader.getState()`).
+
+Records are appended as the game is played,
+so a partially written file (e.g. from a crashed game) is still readable up to the last record.
+Readers memory-map the file, so records are only loaded as they are decoded
+(and a reader sees the file as it was when the reader was created).
+Reading a replay never executes code from the file.
+"""
+
+import copy
+import json
+import logging
+import mmap
+import pickle
+
+from pacai.core.directions import Directions
+from pacai.core.layout import Layout
+
+MAGIC = b'PACAIRP1'
+
+DEFAULT_KEYFRAME_INTERVAL = 100
+
+# The index of each action is its code in the file.
+# None is included since a crashing agent may not have produced an action.
+ACTIONS = [
+    Directions.NORTH,
+    Directions.SOUTH,
+    Directions.EAST,
+    Directions.WEST,
+    Directions.STOP,
+    None,
+]
+NUM_ACTIONS = len(ACTIONS)
+
+_ACTION_CODES = dict([(action, index) for (index, action) in enumerate(ACTIONS)])
+
+class ReplayWriter(object):
+    """
+    Write a replay one move at a time as a game is played.
+    """
+
+    def __init__(self, path, layout, keyframeInterval = DEFAULT_KEYFRAME_INTERVAL, **metadata):
+        """
+        Args:
+            layout: The `pacai.core.layout.Layout` the game is played on.
+            keyframeInterval: The number of turns between keyframes.
+            metadata: Any other JSON-friendly information needed to replay the game.
+        """
+
+        self._keyframeInterval = int(keyframeInterval)
+        self._numMoves = 0
+
+        header = {
+            'layout': layout.layoutText,
+            'maxGhosts': layout.getNumGhosts(),
+            'keyframeInterval': self._keyframeInterval,
+            'metadata': metadata,
+        }
+        headerBytes = json.dumps(header, sort_keys = True).encode()
+
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC + encodeVarint(len(headerBytes)) + headerBytes)
+        self._file.flush()
+
+    def close(self):
+        if (self._file is not None):
+            self._file.close()
+            self._file = None
+
+    def writeMove(self, agentIndex, action, state = None):
+        """
+        Record that the agent took the action in the given state
+        (the state before the action is applied).
+        """
+
+        if (self._numMoves > 0 and self._numMoves % self._keyframeInterval == 0):
+            self._writeKeyframe(state)
+
+        code = 1 + agentIndex * NUM_ACTIONS + _ACTION_CODES[action]
+        self._file.write(encodeVarint(code))
+        self._numMoves += 1
+
+    def _getCheckpoint(self, state):
+        """
+        Get the bytes to store in a keyframe.
+        """
+
+        if (state is None):
+            return b''
+
+        return json.dumps(state.getCheckpoint(), separators = (',', ':')).encode()
+
+    def _writeKeyframe(self, state):
+        checkpoint = self._getCheckpoint(state)
+
+        self._file.write(encodeVarint(0) + encodeVarint(self._numMoves)
+                + encodeVarint(len(checkpoint)) + checkpoint)
+
+        # Make sure everything up to the keyframe is visible to anyone streaming the file.
+        self._file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exceptionType, exceptionValue, traceback):
+        self.close()
+
+class ReplayReader(object):
+    """
+    Read a replay written by `ReplayWriter`.
+    The file is memory-mapped (not read into memory) until the reader is closed.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            try:
+                data = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files can't be mapped.
+                data = b''
+
+        if (data[:len(MAGIC)] != MAGIC):
+            raise ValueError("Not a replay file: '%s'." % (path))
+
+        headerSize, offset = decodeVarint(data, len(MAGIC))
+        header = json.loads(data[offset:offset + headerSize].decode())
+
+        self._data = data
+        self._bodyOffset = offset + headerSize
+
+        self._layoutText = header['layout']
+        self._maxGhosts = header['maxGhosts']
+        self._keyframeInterval = header['keyframeInterval']
+        self._metadata = header['metadata']
+
+        # [(turn, offset of the first move after the keyframe, checkpoint), ...].
+        # Built the first time it is needed.
+        self._keyframes = None
+
+    def close(self):
+        if (isinstance(self._data, mmap.mmap)):
+            self._data.close()
+
+    def getKeyframeInterval(self):
+        return self._keyframeInterval
+
+    def getKeyframes(self):
+        """
+        Get a list of (turn, checkpoint bytes) for each keyframe in the replay.
+        """
+
+        return [(turn, checkpoint) for (turn, offset, checkpoint) in self._getKeyframes()]
+
+    def getState(self, initialState, turn):
+        """
+        Get the game state after the given number of turns.
+        The initial state must be the starting state of the recorded game
+        (e.g. `PacmanGameState(reader.getLayout())`), and is not modified.
+
+        The state is restored from the closest checkpoint at or before the turn,
+        so this takes at most a keyframe interval of moves no matter the turn.
+        This makes it cheap to jump around (or step backwards) in a replay.
+        """
+
+        for state in self.getStates(initialState, turn):
+            return state
+
+        raise IndexError('Turn %d is past the end of the replay.' % (turn))
+
+    def getStates(self, initialState, startTurn = 0):
+        """
+        Get a generator of the game states starting at the given turn
+        (the state after the last move is included).
+        """
+
+        keyframeTurn, offset, checkpoint = self._seek(startTurn)
+
+        state = initialState
+        if (len(checkpoint) > 0):
+            state = copy.copy(initialState)
+            state.restoreCheckpoint(json.loads(checkpoint.decode()))
+        else:
+            keyframeTurn, offset = 0, self._bodyOffset
+
+        turn = keyframeTurn
+        for (agentIndex, action) in self._decodeMoves(offset):
+            if (turn >= startTurn):
+                yield state
+
+            state = state.generateSuccessor(agentIndex, action)
+            turn += 1
+
+        if (turn >= startTurn):
+            yield state
+
+    def getLayout(self):
+        return Layout(self._layoutText, maxGhosts = self._maxGhosts)
+
+    def getMetadata(self):
+        return self._metadata
+
+    def getMoves(self, startTurn = 0):
+        """
+        Get a generator of (agentIndex, action) for each move starting at the given turn.
+        Moves are decoded as they are requested.
+        """
+
+        turn, offset, checkpoint = self._seek(startTurn)
+
+        for (agentIndex, action) in self._decodeMoves(offset):
+            if (turn >= startTurn):
+                yield (agentIndex, action)
+
+            turn += 1
+
+    def getNumMoves(self):
+        numMoves = 0
+        for move in self._decodeMoves(self._bodyOffset):
+            numMoves += 1
+
+        return numMoves
+
+    def _decodeMoves(self, offset):
+        """
+        Decode moves starting at a record offset, skipping over keyframes.
+        A truncated final record is ignored.
+        """
+
+        data = self._data
+
+        try:
+            while (offset < len(data)):
+                code, offset = decodeVarint(data, offset)
+
+                if (code == 0):
+                    turn, offset = decodeVarint(data, offset)
+                    size, offset = decodeVarint(data, offset)
+                    offset += size
+                    continue
+
+                agentIndex, actionIndex = divmod(code - 1, NUM_ACTIONS)
+                yield (agentIndex, ACTIONS[actionIndex])
+        except IndexError:
+            return
+
+    def _getKeyframes(self):
+        if (self._keyframes is not None):
+            return self._keyframes
+
+        keyframes = []
+        data = self._data
+        offset = self._bodyOffset
+
+        try:
+            while (offset < len(data)):
+                code, offset = decodeVarint(data, offset)
+                if (code != 0):
+                    continue
+
+                turn, offset = decodeVarint(data, offset)
+                size, offset = decodeVarint(data, offset)
+
+                checkpoint = data[offset:offset + size]
+                offset += size
+
+                if (len(checkpoint) == size):
+                    keyframes.append((turn, offset, checkpoint))
+        except IndexError:
+            pass
+
+        self._keyframes = keyframes
+        return keyframes
+
+    def _seek(self, turn):
+        """
+        Get the (turn, offset, checkpoint) of the last keyframe at or before the given turn.
+        """
+
+        best = (0, self._bodyOffset, b'')
+
+        for keyframe in self._getKeyframes():
+            if (keyframe[0] > turn):
+                break
+
+            best = keyframe
+
+        return best
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exceptionType, exceptionValue, traceback):
+        self.close()
+
+def loadReplay(path, allowLegacy = False):
+    """
+    Load a replay as a dict of the arguments to the game's replayGame() function
+    (except the display).
+    The actions are streamed from the file as they are played.
+
+    Legacy pickled replays are only loaded (with loadLegacyReplay()) if allowLegacy is set,
+    otherwise a file that is not in this format raises a ValueError.
+    """
+
+    if (not isReplayFile(path)):
+        if (allowLegacy):
+            return loadLegacyReplay(path)
+
+        raise ValueError(("Not a replay file: '%s'. If it is a legacy pickled replay"
+                + " from a trusted source, it can be loaded with --legacy-replay.") % (path))
+
+    reader = ReplayReader(path)
+
+    replay = dict(reader.getMetadata())
+    replay['layout'] = reader.getLayout()
+    replay['actions'] = reader.getMoves()
+
+    return replay
+
+def loadLegacyReplay(path):
+    """
+    Load a legacy pickled replay (a pickled dict of the arguments to replayGame()).
+    Unpickling can run arbitrary code, so only load these from trusted sources.
+    """
+
+    logging.warning("Loading legacy pickled replay: '%s'." % (path))
+
+    with open(path, 'rb') as file:
+        return pickle.load(file)
+
+def isReplayFile(path):
+    """
+    Check if a file is in this replay format (as opposed to a legacy pickled replay).
+    """
+
+    with open(path, 'rb') as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+def encodeVarint(value):
+    """
+    Encode a non-negative int as a little-endian base-128 varint.
+    """
+
+    if (value < 0):
+        raise ValueError('Varints must be non-negative, got: %d.' % (value))
+
+    output = bytearray()
+    while (True):
+        bits = value & 0x7F
+        value >>= 7
+
+        if (value == 0):
+            output.append(bits)
+            return bytes(output)
+
+        output.append(bits | 0x80)
+
+def decodeVarint(data, offset):
+    """
+    Decode a varint from data at the given offset.
+    Returns the value and the offset after the varint.
+    Raises an IndexError if the data ends in the middle of the varint.
+    """
+
+    value = 0
+    shift = 0
+
+    while (True):
+        byte = data[offset]
+        offset += 1
+
+        value |= (byte & 0x7F) << shift
+        shift += 7
+
+        if (not (byte & 0x80)):
+            return value, offset
@@ -99,6 +99,12 @@ class MinimaxAgent(MultiAgentSearchAgent):
     `pacai.core.gamestate.AbstractGameState.generateSuccessor`:
     Get the successor game state after an agent takes an action.
 
+    `pacai.core.gamestate.AbstractGameState.applyAction`:
+    A cheaper alternative to generateSuccessor() for search.
+    Applies an action to the state in place,
+    and returns a record that `pacai.core.gamestate.AbstractGameState.undoAction` can roll back.
+    Undo in a finally block, so an exception never leaves the game's state changed.
+
     `pacai.core.directions.Directions.STOP`:
     The stop direction, which is always legal, but you may not want to include in your search.
 
@@ -127,7 +133,12 @@ class MinimaxAgent(MultiAgentSearchAgent):
 
         # Iterate through legal moves to find highest possible value after traversing depth
         for action in legalMoves:
-            val2 = self.minFunc(state.generateSuccessor(0, action), depth, 1)
+            # Search in place, and roll the move back afterwards
+            undo = state.applyAction(0, action, trusted = True)
+            try:
+                val2 = self.minFunc(state, depth, 1)
+            finally:
+                state.undoAction(undo)
 
             if val2 > val:
                 val = val2
@@ -155,16 +166,18 @@ class MinimaxAgent(MultiAgentSearchAgent):
 
         # Iterate through legal moves to find lowest possible value after traversing depth
         for action in legalMoves:
-            newState = state.generateSuccessor(curAgent, action)
-
-            if nextAgent == 0:  # If on last ghost
-                if depth == self.getTreeDepth() - 1:  # If at max depth, finish up
-                    val2 = self.getEvaluationFunction()(newState)
-                else:
-                    val2 = self.maxFunc(newState, depth + 1)
-
-            else:  # Move on to next ghost
-                val2 = self.minFunc(newState, depth, nextAgent)
+            undo = state.applyAction(curAgent, action, trusted = True)
+            try:
+                if nextAgent == 0:  # If on last ghost
+                    if depth == self.getTreeDepth() - 1:  # If at max depth, finish up
+                        val2 = self.getEvaluationFunction()(state)
+                    else:
+                        val2 = self.maxFunc(state, depth + 1)
+
+                else:  # Move on to next ghost
+                    val2 = self.minFunc(state, depth, nextAgent)
+            finally:
+                state.undoAction(undo)
 
             if val2 < val:
                 val = val2
@@ -204,7 +217,11 @@ class AlphaBetaAgent(MultiAgentSearchAgent):
         legalMoves = self.rmStop(state.getLegalActions())
 
         for action in legalMoves:
-            val2 = self.minFunc(state.generateSuccessor(0, action), depth, 1, alpha, beta)
+            undo = state.applyAction(0, action, trusted = True)
+            try:
+                val2 = self.minFunc(state, depth, 1, alpha, beta)
+            finally:
+                state.undoAction(undo)
 
             if val2 > val:
                 val = val2
@@ -232,15 +249,17 @@ class AlphaBetaAgent(MultiAgentSearchAgent):
         legalMoves = self.rmStop(state.getLegalActions(curAgent))
 
         for action in legalMoves:
-            newState = state.generateSuccessor(curAgent, action)
-
-            if nextAgent == 0:
-                if depth == self.getTreeDepth() - 1:
-                    val2 = self.getEvaluationFunction()(newState)
+            undo = state.applyAction(curAgent, action, trusted = True)
+            try:
+                if nextAgent == 0:
+                    if depth == self.getTreeDepth() - 1:
+                        val2 = self.getEvaluationFunction()(state)
+                    else:
+                        val2 = self.maxFunc(state, depth + 1, alpha, beta)
                 else:
-                    val2 = self.maxFunc(newState, depth + 1, alpha, beta)
-            else:
-                val2 = self.minFunc(newState, depth, nextAgent, alpha, beta)
+                    val2 = self.minFunc(state, depth, nextAgent, alpha, beta)
+            finally:
+                state.undoAction(undo)
 
             if val2 < val:
                 val = val2
@@ -286,7 +305,11 @@ class ExpectimaxAgent(MultiAgentSearchAgent):
         legalMoves = self.rmStop(state.getLegalActions())
 
         for action in legalMoves:
-            val2 = self.minFunc(state.generateSuccessor(0, action), depth, 1)
+            undo = state.applyAction(0, action, trusted = True)
+            try:
+                val2 = self.minFunc(state, depth, 1)
+            finally:
+                state.undoAction(undo)
 
             if val2 > val:
                 val = val2
@@ -310,14 +333,18 @@ class ExpectimaxAgent(MultiAgentSearchAgent):
         chance = 1.0 / len(legalMoves)  # Get chance of any possible move
 
         for action in legalMoves:
-            if nextAgent == 0:
-                if depth == self.getTreeDepth() - 1:
-                    val2 = self.getEvaluationFunction()(state.generateSuccessor(curAgent, action))
-                else:
-                    val2 = self.maxFunc(state.generateSuccessor(curAgent, action), depth + 1)
+            undo = state.applyAction(curAgent, action, trusted = True)
+            try:
+                if nextAgent == 0:
+                    if depth == self.getTreeDepth() - 1:
+                        val2 = self.getEvaluationFunction()(state)
+                    else:
+                        val2 = self.maxFunc(state, depth + 1)
 
-            else:
-                val2 = self.minFunc(state.generateSuccessor(curAgent, action), depth, nextAgent)
+                else:
+                    val2 = self.minFunc(state, depth, nextAgent)
+            finally:
+                state.undoAction(undo)
 
             val += val2 * chance  # Assume all ghosts choose moves randomly to add score
 
@@ -1,9 +1,10 @@
 from pacai.agents.learning.reinforcement import ReinforcementAgent
+from pacai.core import qtable
+from pacai.core.linear import LinearWeights
 from pacai.util import reflection
 from pacai.util import probability
 from collections import Counter
 import random
-import math
 
 class QLearningAgent(ReinforcementAgent):
     """
@@ -54,6 +55,8 @@ class QLearningAgent(ReinforcementAgent):
         super().__init__(index, **kwargs)
 
         # You can initialize Q-values here.
+        # Q-values are keyed by (state key, action),
+        # so they can be saved and loaded (see `pacai.core.qtable`).
         self.qvalues = Counter()
 
     def getQValue(self, state, action):
@@ -64,11 +67,20 @@ class QLearningAgent(ReinforcementAgent):
         """
 
         # Return Q-Value in dictionary
-        if (state, action) in self.qvalues:
-            return self.qvalues[(state, action)]
+        key = (qtable.getStateKey(state), action)
+        if key in self.qvalues:
+            return self.qvalues[key]
         else:
             return 0.0
 
+    def getQValues(self, state, actions):
+        """
+        Get a list of the Q-Values for each of the actions in a state.
+        Subclasses can override this to evaluate all the actions at once.
+        """
+
+        return [self.getQValue(state, action) for action in actions]
+
     def getValue(self, state):
         """
         Return the value of the best action in a state.
@@ -88,13 +100,7 @@ class QLearningAgent(ReinforcementAgent):
             return 0.0
 
         # Find best Q-value out of all actions in state
-        bestVal = math.inf * -1
-        for action in actions:
-            val = self.getQValue(state, action)
-            if bestVal < val:
-                bestVal = val
-
-        return bestVal
+        return max(self.getQValues(state, actions))
 
     def getPolicy(self, state):
         """
@@ -115,13 +121,10 @@ class QLearningAgent(ReinforcementAgent):
         if len(actions) == 0:
             return None
 
-        # Use getValue() to find all best actions
-        bestVal = self.getValue(state)
-        bestAction = []
-        for action in actions:
-            val = self.getQValue(state, action)
-            if bestVal == val:
-                bestAction.append(action)
+        # Find all best actions (evaluating each action once)
+        values = self.getQValues(state, actions)
+        bestVal = max(values)
+        bestAction = [action for (action, val) in zip(actions, values) if bestVal == val]
 
         # Return a randomly chosen one of the best actions
         return random.choice(bestAction)
@@ -145,7 +148,33 @@ class QLearningAgent(ReinforcementAgent):
         q = self.getQValue(state, action)
         d = self.getDiscountRate()
         v = self.getValue(nextState)
-        self.qvalues[(state, action)] = (1 - a) * q + a * (reward + d * v)
+        self.qvalues[(qtable.getStateKey(state), action)] = (1 - a) * q + a * (reward + d * v)
+
+    # Replay memory keeps state keys and the next state's legal actions, not states
+    def encodeTransition(self, state, action, nextState, reward):
+        return (qtable.getStateKey(state), action, reward,
+                qtable.getStateKey(nextState), tuple(self.getLegalActions(nextState)))
+
+    # Same Q-Value formula as update, on an encoded transition
+    def replayTransition(self, transition):
+        stateKey, action, reward, nextStateKey, nextActions = transition
+
+        v = 0.0
+        if (len(nextActions) > 0):
+            v = max([self.qvalues[(nextStateKey, nextAction)] for nextAction in nextActions])
+
+        a = self.getAlpha()
+        q = self.qvalues[(stateKey, action)]
+        target = reward + self.getDiscountRate() * v
+        self.qvalues[(stateKey, action)] = (1 - a) * q + a * target
+
+        return target - q
+
+    def load(self, path):
+        self.qvalues.update(qtable.loadQValues(path))
+
+    def save(self, path):
+        qtable.saveQValues(path, self.qvalues)
 
 class PacmanQAgent(QLearningAgent):
     """
@@ -189,9 +218,9 @@ class ApproximateQAgent(PacmanQAgent):
     Should update your weights based on transition.
 
     DESCRIPTION: <Write something here so we know what you did.>
-    Made weight Counter, initialized feature Extractor. Returned
-    dot product of weights and feature Vector in getQValue. Used given
-    formula in update().
+    Made weights a LinearWeights, initialized feature Extractor. Returned
+    dot product of weights and feature Vector in getQValue (and for all actions
+    at once in getQValues). Used given formula in update().
     """
 
     def __init__(self, index,
@@ -199,24 +228,52 @@ class ApproximateQAgent(PacmanQAgent):
         super().__init__(index, **kwargs)
         self.featExtractor = reflection.qualifiedImport(extractor)()
         # You might want to initialize weights here.
-        self.weights = Counter()  # Initialized to Counter
+        # Weights are kept in a flat array indexed by a feature vocabulary,
+        # so Q-values and updates only touch the features that are present.
+        self.weights = LinearWeights()
 
     # Return dot product of feature Vector and weight Vector
     def getQValue(self, state, action):
-        w = self.weights
-        featureVector = self.featExtractor.getFeatures(state, action)
-        return sum(w[key] * featureVector.get(key, 0) for key in w)
+        return self.weights.dot(*self._getFeatures(state, action))
+
+    # Extract the features of every action once, and evaluate them all together
+    def getQValues(self, state, actions):
+        return self.weights.dotAll([self._getFeatures(state, action) for action in actions])
 
     # Use given update formula and do it on every feature in feature Vector
     def update(self, state, action, nextState, reward):
-        fV = self.featExtractor.getFeatures(state, action)
-        w = self.weights
+        indexes, values = self._getFeatures(state, action)
         a = self.getAlpha()
         d = self.getDiscountRate()
         v = self.getValue(nextState)
-        q = self.getQValue(state, action)
-        for i in fV:
-            w[i] = w[i] + a * ((reward + d * v) - q) * fV[i]
+        q = self.weights.dot(indexes, values)
+        self.weights.add(indexes, values, a * ((reward + d * v) - q))
+
+    # Replay memory keeps sparse features (for this action and every next action), not states
+    def encodeTransition(self, state, action, nextState, reward):
+        nextFeatures = [self._getFeatures(nextState, nextAction)
+                for nextAction in self.getLegalActions(nextState)]
+        return (self._getFeatures(state, action), reward, nextFeatures)
+
+    # Same update formula as update, on an encoded transition
+    def replayTransition(self, transition):
+        (indexes, values), reward, nextFeatures = transition
+
+        v = 0.0
+        if (len(nextFeatures) > 0):
+            v = max(self.weights.dotAll(nextFeatures))
+
+        q = self.weights.dot(indexes, values)
+        difference = (reward + self.getDiscountRate() * v) - q
+        self.weights.add(indexes, values, self.getAlpha() * difference)
+
+        return difference
+
+    def load(self, path):
+        self.weights = qtable.loadWeights(path)
+
+    def save(self, path):
+        qtable.saveWeights(path, self.weights)
 
     def final(self, state):
         """
@@ -225,3 +282,6 @@ class ApproximateQAgent(PacmanQAgent):
 
         # Call the super-class final method.
         super().final(state)
+
+    def _getFeatures(self, state, action):
+        return self.featExtractor.getSparseFeatures(state, action, self.weights.getVocabulary())
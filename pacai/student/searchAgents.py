@@ -325,7 +325,7 @@ class AnyFoodSearchProblem(PositionSearchProblem):
 
     # AnyFoodSearchProblem is happy when any food is reached
     def isGoal(self, state):
-        return state in self.food.asList()
+        return self.food.get(*state)
 
 class ApproximateSearchAgent(BaseAgent):
     """
@@ -1,4 +1,5 @@
 from pacai.agents.learning.value import ValueEstimationAgent
+from pacai.core import mdpSolvers
 from collections import Counter
 import math
 
@@ -32,7 +33,8 @@ class ValueIterationAgent(ValueEstimationAgent):
     you should return None.
     """
 
-    def __init__(self, index, mdp, discountRate = 0.9, iters = 100, **kwargs):
+    def __init__(self, index, mdp, discountRate = 0.9, iters = 100, tolerance = 0.0,
+            solver = 'value', **kwargs):
         super().__init__(index, **kwargs)
 
         self.mdp = mdp
@@ -41,18 +43,12 @@ class ValueIterationAgent(ValueEstimationAgent):
         self.values = Counter()  # A dictionary which holds the q-values for each state.
 
         # Compute the values here.
-        for _ in range(self.iters):
-            valCopy = self.values.copy()  # Make copy of dict to not mix up updating
-            for state in self.mdp.getStates():
-
-                # Don't check if terminal state
-                if len(self.mdp.getPossibleActions(state)) == 0:
-                    continue
-
-                # Get the Q-value for the state and best possible action
-                valCopy[state] = self.getQValue(state, self.getAction(state))
-
-            self.values = valCopy  # Fill the actual dict with accumulated data
+        # The MDP is compiled into sparse arrays once, and each sweep is a sparse mat-vec.
+        # Stops early once no value changes by more than the tolerance.
+        # Other solvers (see pacai.core.mdpSolvers.SOLVERS) may need far fewer backups.
+        solve = mdpSolvers.getSolver(solver)
+        self.solution = solve(self.mdp, self.discountRate, self.iters, tolerance = tolerance)
+        self.values.update(self.solution.getValues())
 
     def getValue(self, state):
         """
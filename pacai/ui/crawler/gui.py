@@ -1,3 +1,4 @@
+import logging
 import math
 import time
 import threading
@@ -7,6 +8,14 @@ import traceback
 from pacai.student.qlearningAgents import QLearningAgent
 from pacai.core.environment import Environment
 
+CANVAS_WIDTH = 1000
+CANVAS_HEIGHT = 200
+
+# The learning parameters the GUI starts with.
+DEFAULT_EPSILON = 0.5
+DEFAULT_DISCOUNT = 0.8
+DEFAULT_LEARNING_RATE = 0.8
+
 class CrawlingRobotEnvironment(Environment):
     """
     A GUI display for crawler.
@@ -361,27 +370,34 @@ class CrawlingRobot(object):
         self.minHandAngle = -(5.0 / 6.0) * math.pi
 
         # Draw Ground
-        self.totWidth = canvas.winfo_reqwidth()
-        self.totHeight = canvas.winfo_reqheight()
+        # A robot without a canvas (for headless training) can move, but not be drawn.
+        if (canvas is not None):
+            self.totWidth = canvas.winfo_reqwidth()
+            self.totHeight = canvas.winfo_reqheight()
+        else:
+            self.totWidth = CANVAS_WIDTH
+            self.totHeight = CANVAS_HEIGHT
+
         self.groundHeight = 40
         self.groundY = self.totHeight - self.groundHeight
 
-        self.ground = canvas.create_rectangle(0, self.groundY, self.totWidth, self.totHeight,
-                fill = 'blue')
-
         # Robot Body
         self.robotWidth = 80
         self.robotHeight = 40
         self.robotPos = (20, self.groundY)
-        self.robotBody = canvas.create_polygon(0, 0, 0, 0, 0, 0, 0, 0, fill='green')
 
         # Robot Arm
         self.armLength = 60
-        self.robotArm = canvas.create_line(0, 0, 0, 0, fill='orange', width=5)
 
         # Robot Hand
         self.handLength = 40
-        self.robotHand = canvas.create_line(0, 0, 0, 0, fill='red', width=3)
+
+        if (canvas is not None):
+            self.ground = canvas.create_rectangle(0, self.groundY, self.totWidth, self.totHeight,
+                    fill = 'blue')
+            self.robotBody = canvas.create_polygon(0, 0, 0, 0, 0, 0, 0, 0, fill='green')
+            self.robotArm = canvas.create_line(0, 0, 0, 0, fill='orange', width=5)
+            self.robotHand = canvas.create_line(0, 0, 0, 0, fill='red', width=3)
 
         self.positions = [0, 0]
         # self.angleSums = [0, 0]
@@ -478,7 +494,7 @@ class Application(object):
         # self.setupSimulationButtons(win)
 
         # Canvas
-        self.canvas = tkinter.Canvas(root, height=200, width=1000)
+        self.canvas = tkinter.Canvas(root, height=CANVAS_HEIGHT, width=CANVAS_WIDTH)
         self.canvas.grid(row=2, columnspan=10)
 
     def setupAlphaButtonAndLabel(self, win):
@@ -624,3 +640,46 @@ def run(max_steps = None):
     app.exit()
 
     return app.exit_status
+
+def runHeadless(max_steps, epsilon = DEFAULT_EPSILON, discount = DEFAULT_DISCOUNT,
+        learning_rate = DEFAULT_LEARNING_RATE):
+    """
+    Train the crawler for max_steps steps as fast as possible, without a GUI.
+    Returns the learner and the number of steps per second.
+    """
+
+    robot = CrawlingRobot(None)
+    environment = CrawlingRobotEnvironment(robot)
+
+    learner = QLearningAgent(0, actionFn = environment.getPossibleActions)
+    learner.setEpsilon(epsilon)
+    learner.setLearningRate(learning_rate)
+    learner.setDiscount(discount)
+
+    getPossibleActions = environment.getPossibleActions
+    doAction = environment.doAction
+
+    startTime = time.time()
+    learner.startEpisode()
+
+    for step in range(max_steps):
+        state = environment.getCurrentState()
+        if (len(getPossibleActions(state)) == 0):
+            environment.reset()
+            state = environment.getCurrentState()
+
+        action = learner.getAction(state)
+        if (action is None):
+            raise Exception('None action returned: Code Not Complete')
+
+        nextState, reward = doAction(action)
+        learner.observeTransition(state, action, nextState, reward)
+
+    learner.stopEpisode()
+    seconds = time.time() - startTime
+
+    logging.info('Ran %d steps in %.2f seconds: %.0f steps per second.',
+            max_steps, seconds, max_steps / max(seconds, 1e-9))
+    logging.info('Robot position: %.2f', robot.getRobotPosition()[0])
+
+    return learner, max_steps / max(seconds, 1e-9)
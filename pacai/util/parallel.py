@@ -0,0 +1,126 @@
+"""
+Utilities for running independent work (like whole games) on a pool of processes.
+"""
+
+import logging
+import multiprocessing
+import random
+import time
+
+from pacai.core.game import GameResult
+from pacai.util.logs import initLogging
+from pacai.util.logs import updateLoggingLevel
+
+MAX_SEED = 2**32
+
+def getSeeds(seed, count):
+    """
+    Derive a deterministic list of seeds (one per task) from a single seed.
+    The same seed will always produce the same list.
+    """
+
+    rng = random.Random(seed)
+    return [rng.randint(0, MAX_SEED) for i in range(count)]
+
+def checkParallelOptions(options):
+    """
+    Check that a game program's options (see `pacai.bin.arguments`) can be used with --parallel.
+    Raises a ValueError if they can't.
+    """
+
+    if (options.parallel <= 1):
+        return
+
+    if (not options.nullGraphics):
+        raise ValueError('Parallel games require --null-graphics.')
+
+    if (options.numTraining > 0 or options.record is not None or options.replay is not None):
+        raise ValueError('Parallel games cannot be used with training, recording, or replays.')
+
+def runGamesInPool(readCommand, newGame, argv, layout, numGames, parallel, seed):
+    """
+    Play independent games on a pool of `parallel` processes.
+    Each game is set up by readCommand() from the same command line (so agents are loaded the
+    same way), but with its own seed from getSeeds(seed, numGames),
+    and is then created on the layout by newGame(args, layout).
+    Both functions must be defined at the top level of a module so that they can be pickled.
+    Returns a list of `pacai.core.game.GameResult`.
+    """
+
+    startTime = time.time()
+
+    gameArgs = [(readCommand, newGame, argv, gameSeed, layout)
+            for gameSeed in getSeeds(seed, numGames)]
+    results = mapInPool(_runGame, gameArgs, parallel)
+
+    logging.info('Played %d games on %d processes in %.2f seconds.' %
+            (len(results), parallel, time.time() - startTime))
+
+    return results
+
+def mapInPool(function, argsList, numWorkers):
+    """
+    Call function(*args) for each args in argsList on a pool of numWorkers processes.
+    The function must be defined at the top level of a module so that it can be pickled,
+    and the args and return values must also be picklable.
+    Results are returned in the same order as argsList.
+    """
+
+    if (numWorkers <= 1 or len(argsList) <= 1):
+        return [function(*args) for args in argsList]
+
+    numWorkers = min(numWorkers, len(argsList))
+    loggingLevel = logging.getLogger().getEffectiveLevel()
+
+    with multiprocessing.Pool(numWorkers, initializer = _initWorker,
+            initargs = (loggingLevel, )) as pool:
+        return pool.starmap(function, argsList, chunksize = 1)
+
+def imapUnorderedInPool(function, argsList, numWorkers):
+    """
+    Like mapInPool(), but yield each result as soon as it is ready (in any order).
+    This lets callers save results incrementally.
+    """
+
+    if (numWorkers <= 1 or len(argsList) <= 1):
+        for args in argsList:
+            yield function(*args)
+
+        return
+
+    numWorkers = min(numWorkers, len(argsList))
+    loggingLevel = logging.getLogger().getEffectiveLevel()
+
+    with multiprocessing.Pool(numWorkers, initializer = _initWorker,
+            initargs = (loggingLevel, )) as pool:
+        functionArgs = [(function, args) for args in argsList]
+        for result in pool.imap_unordered(_starCall, functionArgs, chunksize = 1):
+            yield result
+
+def _starCall(functionArgs):
+    function, args = functionArgs
+    return function(*args)
+
+def _runGame(readCommand, newGame, argv, seed, layout):
+    """
+    Play a single game (in a worker process) and summarize it.
+    """
+
+    args = readCommand(argv + ['--null-graphics', '--num-games', '1', '--parallel', '1',
+            '--seed', str(seed)])
+
+    # Games played one at a time also start from their own seed (see the game's runGames()).
+    random.seed(seed)
+
+    game = newGame(args, layout)
+    game.run()
+
+    return GameResult(game, seed)
+
+def _initWorker(loggingLevel):
+    """
+    Workers may not inherit the parent's logging setup (depending on the platform).
+    """
+
+    initLogging(loggingLevel)
+    updateLoggingLevel(loggingLevel)
@@ -0,0 +1,153 @@
+"""
+A replay memory for reinforcement learning agents (experience replay).
+"""
+
+import array
+import random
+
+DEFAULT_PRIORITY_EXPONENT = 0.6
+
+# Added to every priority, so no transition stops being replayed.
+PRIORITY_EPSILON = 1e-6
+
+class ReplayMemory(object):
+    """
+    A fixed capacity ring buffer of transitions.
+    Once the memory is full, each new transition replaces the oldest one.
+    Transitions are whatever the agent stores (ideally something more compact than game states),
+    and are referred to by their slot in the buffer.
+
+    Transitions are sampled (with replacement) either uniformly,
+    or, if prioritized, in proportion to (priority ** priorityExponent).
+    Prioritized sampling uses a sum tree over the priorities,
+    so sampling and updating priorities take O(log(capacity)).
+    New transitions get the highest priority seen so far, so they are replayed soon.
+    """
+
+    def __init__(self, capacity, prioritized = False,
+            priorityExponent = DEFAULT_PRIORITY_EXPONENT, rng = None):
+        if (capacity <= 0):
+            raise ValueError('A replay memory needs a positive capacity, got %d.' % (capacity))
+
+        self._capacity = capacity
+        self._prioritized = prioritized
+        self._priorityExponent = priorityExponent
+
+        self._rng = rng
+        if (self._rng is None):
+            self._rng = random.Random(random.random())
+
+        self._transitions = [None] * capacity
+        self._next = 0
+        self._size = 0
+
+        self._priorities = array.array('d', [0.0]) * capacity
+        self._maxPriority = 1.0
+
+        # A binary tree where each node holds the sum of its children
+        # and the leaves (starting at _treeSize) hold the (exponentiated) priorities.
+        self._treeSize = 1
+        while (self._treeSize < capacity):
+            self._treeSize *= 2
+
+        self._tree = array.array('d', [0.0]) * (2 * self._treeSize)
+
+    def add(self, transition):
+        """
+        Remember a transition, replacing the oldest one if the memory is full.
+        Returns the transition's slot.
+        """
+
+        slot = self._next
+        self._transitions[slot] = transition
+
+        self._next = (slot + 1) % self._capacity
+        self._size = min(self._size + 1, self._capacity)
+
+        if (self._prioritized):
+            self._setPriority(slot, self._maxPriority)
+
+        return slot
+
+    def get(self, slot):
+        return self._transitions[slot]
+
+    def getCapacity(self):
+        return self._capacity
+
+    def getPriority(self, slot):
+        return self._priorities[slot]
+
+    def isPrioritized(self):
+        return self._prioritized
+
+    def sample(self, batchSize):
+        """
+        Sample a batch of transitions (with replacement).
+        Returns parallel lists of (slots, transitions).
+        """
+
+        if (self._size == 0):
+            return [], []
+
+        if (self._prioritized):
+            total = self._tree[1]
+            slots = [self._findSlot(self._rng.random() * total) for _ in range(batchSize)]
+        else:
+            slots = [self._rng.randrange(self._size) for _ in range(batchSize)]
+
+        return slots, [self._transitions[slot] for slot in slots]
+
+    def updatePriorities(self, slots, priorities):
+        """
+        Set new priorities (like the magnitude of a TD error) for sampled transitions.
+        None priorities are skipped.
+        Does nothing if the memory is not prioritized.
+        """
+
+        if (not self._prioritized):
+            return
+
+        for (slot, priority) in zip(slots, priorities):
+            if (priority is None):
+                continue
+
+            priority = abs(priority) + PRIORITY_EPSILON
+            self._maxPriority = max(self._maxPriority, priority)
+            self._setPriority(slot, priority)
+
+    def _findSlot(self, value):
+        """
+        Find the slot whose range of the cumulative (exponentiated) priorities holds the value.
+        """
+
+        tree = self._tree
+
+        node = 1
+        while (node < self._treeSize):
+            left = 2 * node
+            if (value < tree[left]):
+                node = left
+            else:
+                value -= tree[left]
+                node = left + 1
+
+        # Rounding can walk off the end of the used slots.
+        return min(node - self._treeSize, self._size - 1)
+
+    def _setPriority(self, slot, priority):
+        self._priorities[slot] = priority
+
+        tree = self._tree
+
+        node = self._treeSize + slot
+        tree[node] = priority ** self._priorityExponent
+
+        # Recompute (rather than adjust) the sums, so rounding errors don't build up.
+        node //= 2
+        while (node >= 1):
+            tree[node] = tree[2 * node] + tree[2 * node + 1]
+            node //= 2
+
+    def __len__(self):
+        return self._size
@@ -0,0 +1,59 @@
+"""
+Zobrist hashing.
+
+A Zobrist hash assigns a random bit string (key) to every feature a state can have
+(e.g. "there is food at (3, 4)" or "agent 1 has a scared timer of 12"),
+and hashes a state as the XOR of the keys of all the features that it has.
+Adding or removing a feature is then just a single XOR,
+so a hash can be updated in O(1) as a state changes.
+
+Keys are derived from the feature itself (not from a random number generator),
+so they are the same in every process and do not disturb any seeded randomness.
+"""
+
+import hashlib
+
+KEY_BITS = 64
+KEY_MASK = (1 << KEY_BITS) - 1
+
+_keys = {}
+
+def getKey(*feature):
+    """
+    Get the key for a feature.
+    A feature is any tuple of ints, floats, strings, and bools (and tuples of those).
+    """
+
+    key = _keys.get(feature)
+    if (key is None):
+        text = repr(_canonicalize(feature)).encode()
+        digest = hashlib.blake2b(text, digest_size = KEY_BITS // 8).digest()
+
+        key = int.from_bytes(digest, 'little')
+        _keys[feature] = key
+
+    return key
+
+def mixIndex(hashCode, index):
+    """
+    Make a hash specific to a position in a sequence (like an agent index),
+    so that the same hash at different indexes does not cancel out when XORed together.
+    """
+
+    return (hashCode * (getKey('index', index) | 1)) & KEY_MASK
+
+def _canonicalize(value):
+    """
+    Equal values (like 1 and 1.0) must get the same key no matter which one is seen first.
+    """
+
+    if (isinstance(value, tuple)):
+        return tuple([_canonicalize(item) for item in value])
+
+    if (isinstance(value, bool)):
+        return int(value)
+
+    if (isinstance(value, float) and value.is_integer()):
+        return int(value)
+
+    return value
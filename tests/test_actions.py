@@ -0,0 +1,47 @@
+import unittest
+
+from pacai.core.actions import Actions
+from pacai.core.directions import Directions
+from pacai.core.layout import getLayout
+
+DIRECTIONS = [
+    Directions.NORTH,
+    Directions.SOUTH,
+    Directions.EAST,
+    Directions.WEST,
+    Directions.STOP,
+]
+
+"""
+Test the precomputed action tables on layouts.
+"""
+class ActionsTest(unittest.TestCase):
+    def test_action_tables(self):
+        for name in ['mediumClassic', 'defaultCapture', 'tinyMaze']:
+            layout = getLayout(name)
+
+            for position in layout.walls.asList(False):
+                for direction in DIRECTIONS:
+                    self.assertEqual(
+                            Actions.getPossibleActions(position, direction, layout.walls),
+                            layout.getPossibleActions(position, direction))
+
+                    self.assertEqual(
+                            Actions.getNonReversingActions(position, direction, layout.walls),
+                            layout.getNonReversingActions(position, direction))
+
+    def test_fractional_positions(self):
+        layout = getLayout('mediumClassic')
+
+        # Between grid points, agents have to keep going.
+        position = (1, 1.5)
+        self.assertEqual([Directions.NORTH], layout.getPossibleActions(position, Directions.NORTH))
+        self.assertEqual([Directions.NORTH],
+                layout.getNonReversingActions(position, Directions.NORTH))
+
+        # Float positions on grid points still use the table.
+        self.assertEqual(layout.getPossibleActions((1, 1), Directions.STOP),
+                layout.getPossibleActions((1.0, 1.0), Directions.STOP))
+
+if __name__ == '__main__':
+    unittest.main()
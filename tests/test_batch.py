@@ -0,0 +1,76 @@
+import random
+import unittest
+
+from pacai.bin.pacman import PacmanGameState
+from pacai.core.batch import BatchPacmanSimulator
+from pacai.core.layout import getLayout
+
+NUM_GAMES = 20
+MAX_ROUNDS = 300
+
+"""
+Test that the batch simulator follows the same rules as pacman game states.
+"""
+class BatchPacmanSimulatorTest(unittest.TestCase):
+    def test_small_classic(self):
+        self._checkConformance('smallClassic', random.Random(10))
+
+    def test_medium_classic(self):
+        self._checkConformance('mediumClassic', random.Random(11))
+
+    def test_capsule_classic(self):
+        # Lots of capsules, so lots of scared (half speed) ghosts.
+        self._checkConformance('capsuleClassic', random.Random(12))
+
+    def test_reset(self):
+        layout = getLayout('smallClassic')
+        simulator = BatchPacmanSimulator(layout, 2)
+        initialState = PacmanGameState(layout)
+
+        simulator.applyActions(0, [simulator.getLegalActions(i, 0)[0] for i in range(2)])
+        self.assertNotEqual(initialState, simulator.getState(0))
+
+        simulator.reset([0])
+        self.assertEqual(initialState, simulator.getState(0))
+        self.assertNotEqual(initialState, simulator.getState(1))
+
+    def _checkConformance(self, layoutName, rng):
+        """
+        Play random games on both the simulator and on game states, and check they always match.
+        """
+
+        layout = getLayout(layoutName)
+        simulator = BatchPacmanSimulator(layout, NUM_GAMES)
+        states = [PacmanGameState(layout) for i in range(NUM_GAMES)]
+
+        for round in range(MAX_ROUNDS):
+            for agentIndex in range(simulator.getNumAgents()):
+                actions = []
+                for gameIndex in range(NUM_GAMES):
+                    state = states[gameIndex]
+                    legalActions = state.getLegalActions(agentIndex)
+                    self.assertEqual(legalActions,
+                            simulator.getLegalActions(gameIndex, agentIndex))
+
+                    if (state.isOver()):
+                        actions.append(None)
+                        continue
+
+                    action = rng.choice(legalActions)
+                    actions.append(action)
+                    states[gameIndex] = state.generateSuccessor(agentIndex, action)
+
+                simulator.applyActions(agentIndex, actions)
+
+                for gameIndex in range(NUM_GAMES):
+                    state = states[gameIndex]
+                    self.assertEqual(state.getScore(), simulator.getScore(gameIndex))
+                    self.assertEqual(state.isWin(), simulator.isWin(gameIndex))
+                    self.assertEqual(state.isLose(), simulator.isLose(gameIndex))
+                    self.assertEqual(state, simulator.getState(gameIndex))
+
+            if (all([state.isOver() for state in states])):
+                break
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,13 @@
+import os
+import tempfile
 import unittest
 
 from pacai.bin import capture
+from pacai.bin import crawler
 from pacai.bin import gridworld
 from pacai.bin import pacman
+from pacai.bin import tournament
+from pacai.student.qlearningAgents import QLearningAgent
 
 """
 This is a test class to assess the executables of this project.
@@ -45,6 +50,31 @@ class BinTest(unittest.TestCase):
         # Run game of gridworld with default agents.
         gridworld.main(['--null-graphics'])
 
+    def test_gridworld_headless(self):
+        # Train a q-learner with no display.
+        gridworld.main(['--headless', '-a', 'q', '-k', '50'])
+
+        # Every episode is finished, so the agent leaves training just like in a normal run.
+        mdp = gridworld.Gridworld(gridworld.BOOK_GRID)
+        agent = QLearningAgent(0, actionFn = mdp.getPossibleActions, numTraining = 10)
+        gridworld.runHeadlessEpisodes(agent, gridworld.GridworldEnvironment(mdp), 0.9,
+                agent.getAction, 20)
+
+        self.assertEqual(20, agent.episodesSoFar)
+        self.assertFalse(agent.isInTraining())
+        self.assertEqual(0.0, agent.epsilon)
+
+        # Headless runs can't be manual.
+        with self.assertRaises(ValueError):
+            gridworld.main(['--headless', '--manual'])
+
+    def test_crawler_headless(self):
+        # Train the crawler with no GUI.
+        with self.assertRaises(SystemExit) as status:
+            crawler.main(['crawler', '--headless', '1000'])
+
+        self.assertEqual(0, status.exception.code)
+
     def test_gridworld_help(self):
         # Show all gridworld arguments.
         try:
@@ -60,6 +90,54 @@ class BinTest(unittest.TestCase):
         # Run game of pacman with seed value entry.
         pacman.main(['-p', 'GreedyAgent', '--null-graphics', '--seed', '1234'])
 
+    def test_parallel_runs(self):
+        # The same seed should give the same games, no matter how many processes are used.
+        argv = ['-p', 'GreedyAgent', '--null-graphics', '--num-games', '3', '--seed', '1234']
+        oneProcess = pacman.main(argv)
+        twoProcesses = pacman.main(argv + ['--parallel', '2'])
+        threeProcesses = pacman.main(argv + ['--parallel', '3'])
+
+        self.assertEqual(3, len(twoProcesses))
+        scores = [game.state.getScore() for game in oneProcess]
+        self.assertEqual(scores, [result.getScore() for result in twoProcesses])
+        self.assertEqual(scores, [result.getScore() for result in threeProcesses])
+
+        argv = ['--null-graphics', '--num-games', '2', '--seed', '1234', '--max-moves', '100']
+        oneProcess = capture.main(argv)
+        results = capture.main(argv + ['--parallel', '2'])
+        self.assertEqual(2, len(results))
+        self.assertEqual([game.state.getScore() for game in oneProcess],
+                [result.getScore() for result in results])
+
+    def test_tournament(self):
+        with tempfile.TemporaryDirectory() as tempDir:
+            argv = ['pacai.core.baselineTeam', 'pacai.student.myTeam', '--quiet',
+                '--layouts', 'defaultCapture', 'RANDOM3', '--max-moves', '50', '--parallel', '2',
+                '--results', os.path.join(tempDir, 'results.jsonl')]
+
+            standings = tournament.main(argv)
+            self.assertEqual([4, 4], [row['played'] for row in standings])
+
+            # All the matches are saved, so running again should resume with nothing to play.
+            self.assertEqual(standings, tournament.main(argv))
+
+    def test_tournament_schedule(self):
+        teams = ['a', 'b']
+        layouts = ['defaultCapture']
+        schedule = tournament.getSchedule(teams, layouts, 2, 7)
+        seeds = {match.getKey(): match.seed for match in schedule}
+        self.assertEqual(4, len(set(seeds.values())))
+
+        # A match's seed only depends on its key (and the tournament seed),
+        # not on where it is in the schedule.
+        bigger = tournament.getSchedule(['c'] + teams, ['RANDOM3'] + layouts, 3, 7)
+        for match in bigger:
+            if (match.getKey() in seeds):
+                self.assertEqual(seeds[match.getKey()], match.seed)
+
+        other = tournament.getSchedule(teams, layouts, 2, 8)
+        self.assertNotEqual(seeds, {match.getKey(): match.seed for match in other})
+
     def test_capture_seeded_maze_generations(self):
         # Run game of capture with random generated map without seed value.
         capture.main(['--null-graphics', '--layout', 'RANDOM']) 
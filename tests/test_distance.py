@@ -0,0 +1,118 @@
+import collections
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+from pacai.core import distanceCalculator
+from pacai.core.layout import getLayout
+
+"""
+Test the maze distance machinery.
+"""
+class DistanceTest(unittest.TestCase):
+    def test_maze_distances(self):
+        layout = getLayout('tinyCapture')
+
+        distancer = distanceCalculator.Distancer(layout, cacheDir = None)
+        distancer.getMazeDistances()
+        self.assertTrue(distancer.isReadyForMazeDistance())
+
+        cells = layout.walls.asList(False)
+        for source in cells:
+            expected = self._bfs(layout, source)
+            for target in cells:
+                self.assertEqual(expected[target], distancer.getDistance(source, target))
+
+        # Positions between cells snap to the closest grid points.
+        self.assertEqual(distancer.getDistance((1, 1), (1, 2)) + 0.5,
+                distancer.getDistance((1, 1), (1, 2.5)))
+
+        self.assertRaises(LookupError, distancer.getDistance, (0, 0), (1, 1))
+
+    def test_distance_cache(self):
+        layout = getLayout('tinyCapture')
+        cells = layout.walls.asList(False)
+
+        with tempfile.TemporaryDirectory() as cacheDir:
+            distanceCalculator._distanceCache.clear()
+
+            computed = distanceCalculator.getDistances(layout, cacheDir)
+            path = os.path.join(cacheDir, distanceCalculator.getLayoutKey(layout) + '.dist')
+            self.assertTrue(os.path.isfile(path))
+
+            # The process-wide cache should hand back the same table.
+            self.assertIs(computed, distanceCalculator.getDistances(layout, cacheDir))
+
+            # Without the process-wide cache, the table should come from disk.
+            distanceCalculator._distanceCache.clear()
+            loaded = distanceCalculator.getDistances(layout, cacheDir)
+            self.assertIsNot(computed, loaded)
+
+            for source in cells:
+                for target in cells:
+                    self.assertEqual(computed.getDistance(source, target),
+                            loaded.getDistance(source, target))
+
+            distanceCalculator._distanceCache.clear()
+
+    def test_mismatched_cache_file(self):
+        layout = getLayout('tinyCapture')
+        otherLayout = getLayout('fastCapture')
+        cells = otherLayout.walls.asList(False)
+
+        with tempfile.TemporaryDirectory() as cacheDir:
+            distanceCalculator._distanceCache.clear()
+
+            # Plant the table for one layout where the other layout's table goes.
+            distanceCalculator.getDistances(layout, cacheDir)
+            path = os.path.join(cacheDir, distanceCalculator.getLayoutKey(layout) + '.dist')
+            otherPath = os.path.join(cacheDir,
+                    distanceCalculator.getLayoutKey(otherLayout) + '.dist')
+            shutil.copyfile(path, otherPath)
+
+            self.assertIsNone(distanceCalculator._readDistances(otherPath, otherLayout))
+
+            # The table should be recomputed (and the file replaced).
+            distanceCalculator._distanceCache.clear()
+            distances = distanceCalculator.getDistances(otherLayout, cacheDir)
+            self.assertIsNotNone(distanceCalculator._readDistances(otherPath, otherLayout))
+
+            source = cells[0]
+            expected = self._bfs(otherLayout, source)
+            for target in cells:
+                self.assertEqual(expected[target], distances.getDistance(source, target))
+
+            distanceCalculator._distanceCache.clear()
+
+    def test_default_cache_dir(self):
+        envVar = distanceCalculator.CACHE_DIR_ENV_VAR
+
+        with unittest.mock.patch.dict(os.environ, {envVar: 'someDir'}):
+            self.assertEqual('someDir', distanceCalculator.getDefaultCacheDir())
+
+        # Tables are only cached on disk when asked for.
+        with unittest.mock.patch.dict(os.environ, {envVar: ''}):
+            self.assertIsNone(distanceCalculator.getDefaultCacheDir())
+
+            del os.environ[envVar]
+            self.assertIsNone(distanceCalculator.getDefaultCacheDir())
+
+    def _bfs(self, layout, source):
+        distances = {source: 0}
+        queue = collections.deque([source])
+
+        while (len(queue) > 0):
+            (x, y) = queue.popleft()
+            for neighbor in [(x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)]:
+                if (layout.isWall(neighbor) or neighbor in distances):
+                    continue
+
+                distances[neighbor] = distances[(x, y)] + 1
+                queue.append(neighbor)
+
+        return distances
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import random
+import unittest
+
+from pacai.bin.capture import CaptureGameState
+from pacai.bin.pacman import PacmanGameState
+from pacai.core import encoder
+from pacai.core.encoder import StateEncoder
+from pacai.core.layout import getLayout
+from pacai.util import util
+
+"""
+Test encoding game states as planes.
+"""
+class StateEncoderTest(unittest.TestCase):
+    def test_pacman(self):
+        state = PacmanGameState(getLayout('capsuleClassic'))
+        self._checkGame(state, random.Random(1))
+
+    def test_capture(self):
+        state = CaptureGameState(getLayout('defaultCapture'), 300)
+        self._checkGame(state, random.Random(2))
+
+    def test_shape(self):
+        layout = getLayout('smallClassic')
+        stateEncoder = StateEncoder()
+        self.assertIsNone(stateEncoder.getShape())
+
+        encoding = stateEncoder.encode(PacmanGameState(layout))
+        shape = stateEncoder.getShape()
+
+        self.assertEqual((encoder.NUM_PLANES, layout.getWidth(), layout.getHeight()), shape)
+        self.assertEqual(shape[0] * shape[1] * shape[2], len(encoding))
+
+    def _checkGame(self, state, rng):
+        """
+        Encoding a game in order (incrementally) must always match encoding each state from scratch,
+        and each plane must match the state.
+        """
+
+        stateEncoder = StateEncoder()
+        agentIndex = 0
+
+        for i in range(200):
+            encoding = stateEncoder.encode(state)
+            self.assertEqual(StateEncoder().encode(state), encoding)
+            self._checkPlanes(stateEncoder, state, encoding)
+
+            if (state.isOver()):
+                break
+
+            action = rng.choice(state.getLegalActions(agentIndex))
+            state = state.generateSuccessor(agentIndex, action)
+            agentIndex = (agentIndex + 1) % state.getNumAgents()
+
+    def _checkPlanes(self, stateEncoder, state, encoding):
+        expected = {plane: set() for plane in range(encoder.NUM_PLANES)}
+
+        expected[encoder.WALLS_PLANE] = set(state.getWalls().asList())
+        expected[encoder.FOOD_PLANE] = set(state.getFood().asList())
+        expected[encoder.CAPSULES_PLANE] = set(state.getCapsules())
+
+        for agentState in state.getAgentStates():
+            position = util.nearestPoint(agentState.getPosition())
+            if (agentState.isPacman()):
+                expected[encoder.PACMAN_PLANE].add(position)
+            elif (agentState.isScared()):
+                expected[encoder.SCARED_GHOSTS_PLANE].add(position)
+            else:
+                expected[encoder.GHOSTS_PLANE].add(position)
+
+        if (isinstance(state, CaptureGameState)):
+            walls = state.getWalls()
+            expected[encoder.RED_SIDE_PLANE] = set([(x, y) for x in range(walls.getWidth())
+                    for y in range(walls.getHeight()) if state.isOnRedSide((x, y))])
+
+        width, height = stateEncoder.getShape()[1:]
+        for plane in range(encoder.NUM_PLANES):
+            actual = set([(x, y) for x in range(width) for y in range(height)
+                    if encoding[stateEncoder.getIndex(plane, x, y)]])
+            self.assertEqual(expected[plane], actual, 'Plane %d' % (plane))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import random
+import unittest
+
+from pacai.bin.pacman import PacmanGameState
+from pacai.core.actions import Actions
+from pacai.core.distance import distanceField
+from pacai.core.featureExtractors import SimpleExtractor
+from pacai.core.layout import getLayout
+from pacai.core.search import search
+from pacai.student.searchAgents import AnyFoodSearchProblem
+
+"""
+Test feature extractors.
+"""
+class FeatureExtractorsTest(unittest.TestCase):
+    def test_simple_extractor(self):
+        rng = random.Random(3)
+        state = PacmanGameState(getLayout('mediumClassic'))
+        extractor = SimpleExtractor()
+        agentIndex = 0
+
+        for i in range(300):
+            if (state.isOver()):
+                break
+
+            if (agentIndex == 0):
+                for action in state.getLegalActions(0):
+                    self.assertEqual(self._getSimpleFeatures(state, action),
+                            extractor.getFeatures(state, action))
+
+            action = rng.choice(state.getLegalActions(agentIndex))
+            state = state.generateSuccessor(agentIndex, action)
+            agentIndex = (agentIndex + 1) % state.getNumAgents()
+
+    def test_distance_field(self):
+        state = PacmanGameState(getLayout('tinyMaze'))
+        walls = state.getWalls()
+        sources = [(1, 1), (5, 5)]
+
+        distances = distanceField(sources, walls)
+
+        self.assertEqual(set(walls.asList(False)), set(distances.keys()))
+        for position in walls.asList(False):
+            problem = AnyFoodSearchProblem(state, start = position)
+            problem.food = _Positions(sources)
+            self.assertEqual(self._getSearchDistance(problem), distances[position])
+
+    def _getSearchDistance(self, problem):
+        if (problem.isGoal(problem.startingState())):
+            return 0
+
+        return len(search.bfs(problem))
+
+    def _getSimpleFeatures(self, state, action):
+        """
+        The simple features, computed with a search for every action.
+        """
+
+        food = state.getFood()
+        walls = state.getWalls()
+
+        x, y = state.getPacmanPosition()
+        dx, dy = Actions.directionToVector(action)
+        next_x, next_y = int(x + dx), int(y + dy)
+
+        features = {'bias': 1.0}
+        features['#-of-ghosts-1-step-away'] = sum((next_x, next_y) in
+                Actions.getLegalNeighbors(ghost, walls) for ghost in state.getGhostPositions())
+
+        if not features['#-of-ghosts-1-step-away'] and food[next_x][next_y]:
+            features['eats-food'] = 1.0
+
+        features['closest-food'] = (self._getSearchDistance(AnyFoodSearchProblem(state,
+                start = (next_x, next_y))) / (walls.getWidth() * walls.getHeight()))
+
+        for key in features:
+            features[key] /= 10.0
+
+        return features
+
+class _Positions(object):
+    """
+    Stands in for a food grid with food at only the given positions.
+    """
+
+    def __init__(self, positions):
+        self._positions = set(positions)
+
+    def get(self, x, y):
+        return (x, y) in self._positions
+
+if __name__ == '__main__':
+    unittest.main()
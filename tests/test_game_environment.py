@@ -0,0 +1,103 @@
+import random
+import unittest
+
+from pacai.agents.ghost.directional import DirectionalGhost
+from pacai.core.baselineTeam import createTeam
+from pacai.core.gameEnvironment import CaptureEnvironment
+from pacai.core.gameEnvironment import PacmanEnvironment
+from pacai.core.layout import getLayout
+
+"""
+Test stepping games through environments.
+"""
+class GameEnvironmentTest(unittest.TestCase):
+    def test_pacman_episode(self):
+        random.seed(4)
+        environment = PacmanEnvironment(getLayout('smallClassic'))
+        self._checkEpisode(environment)
+
+    def test_pacman_ghost_agents(self):
+        random.seed(5)
+        layout = getLayout('smallClassic', maxGhosts = 1)
+        environment = PacmanEnvironment(layout, ghostAgents = [DirectionalGhost(1)],
+                encoder = lambda state: state.getGhostPosition(1))
+
+        position = environment.reset()
+        self.assertEqual(layout.agentPositions[1][1], position)
+
+        action = environment.getPossibleActions(environment.getCurrentState())[0]
+        position, reward, done, info = environment.step(action)
+        self.assertEqual(environment.getCurrentState().getGhostPosition(1), position)
+
+    def test_max_steps(self):
+        random.seed(6)
+        environment = PacmanEnvironment(getLayout('mediumClassic'), maxSteps = 3)
+        self.assertEqual(3, self._checkEpisode(environment))
+
+    def test_capture_episode(self):
+        random.seed(7)
+        environment = CaptureEnvironment(getLayout('tinyCapture'), agentIndex = 1, length = 200)
+        self._checkEpisode(environment)
+
+        state = environment.getCurrentState()
+        self.assertTrue(state.isOver() or state.getTimeleft() <= 0)
+
+    def test_capture_episodes_finish_agents(self):
+        random.seed(8)
+        others = createTeam(0, 2, True)[1:] + createTeam(1, 3, False)
+        environment = CaptureEnvironment(getLayout('tinyCapture'), agentIndex = 0, length = 40,
+                otherAgents = {agent.index: agent for agent in others})
+
+        # Every episode ends with final(), so the other agents don't keep old game states.
+        for _ in range(3):
+            self._checkEpisode(environment)
+            for agent in others:
+                self.assertEqual([], agent.observationHistory)
+
+        # An episode cut short by reset() is finished too.
+        state = environment.reset()
+        environment.step(random.choice(environment.getPossibleActions(state)))
+        self.assertTrue(any([len(agent.observationHistory) > 0 for agent in others]))
+
+        environment.reset()
+        for agent in others:
+            self.assertLessEqual(len(agent.observationHistory), 1)
+
+    def _checkEpisode(self, environment):
+        """
+        Play random actions until the episode ends,
+        and check that the rewards add up to the final score.
+        Returns the number of steps.
+        """
+
+        state = environment.reset()
+        agentIndex = environment.getAgentIndex()
+        sign = 1
+        if (agentIndex % 2 == 1 and isinstance(environment, CaptureEnvironment)):
+            sign = -1
+
+        totalReward = sign * state.getScore()
+        steps = 0
+        done = False
+
+        while (not done):
+            actions = environment.getPossibleActions(state)
+            self.assertEqual(state.getLegalActions(agentIndex), actions)
+
+            state, reward, done, info = environment.step(random.choice(actions))
+            totalReward += reward
+            steps += 1
+
+            self.assertEqual(info['score'], state.getScore())
+
+        self.assertEqual(sign * state.getScore(), totalReward)
+        self.assertEqual([], environment.getPossibleActions(state))
+        self.assertTrue(environment.isTerminal())
+
+        with self.assertRaises(RuntimeError):
+            environment.step(actions[0])
+
+        return steps
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import random
+import unittest
+
+from pacai.bin.capture import CaptureGameState
+from pacai.bin.pacman import PacmanGameState
+from pacai.core.agentstate import AgentState
+from pacai.core.layout import getLayout
+from pacai.student.multiagents import AlphaBetaAgent
+from pacai.student.multiagents import ExpectimaxAgent
+from pacai.student.multiagents import MinimaxAgent
+
+NUM_MOVES = 300
+
+"""
+Test the game state machinery shared by pacman and capture.
+"""
+class GameStateTest(unittest.TestCase):
+    def test_pacman_hash(self):
+        state = PacmanGameState(getLayout('smallClassic'))
+        self._checkRandomGame(state, random.Random(10))
+
+    def test_capture_hash(self):
+        state = CaptureGameState(getLayout('defaultCapture'), NUM_MOVES)
+        self._checkRandomGame(state, random.Random(11))
+
+    def test_shared_agent_states(self):
+        state = PacmanGameState(getLayout('mediumClassic'))
+        action = state.getLegalActions(1)[0]
+        successor = state.generateSuccessor(1, action)
+
+        # Only the ghost that moved should get a new agent state.
+        self.assertIs(state.getAgentState(0), successor.getAgentState(0))
+        self.assertIsNot(state.getAgentState(1), successor.getAgentState(1))
+        self.assertNotEqual(state.getAgentState(1), successor.getAgentState(1))
+
+    def test_pacman_apply_undo(self):
+        state = PacmanGameState(getLayout('mediumClassic'))
+        self._checkApplyUndo(state, random.Random(12))
+
+    def test_capture_apply_undo(self):
+        state = CaptureGameState(getLayout('defaultCapture'), NUM_MOVES)
+        self._checkApplyUndo(state, random.Random(13))
+
+    def test_search_exception_undo(self):
+        state = PacmanGameState(getLayout('smallClassic', maxGhosts = 2))
+        original = state._initSuccessor()
+        stateHash = hash(state)
+
+        # Agents that search in place must leave the state alone, even when the search raises.
+        for agentClass in [MinimaxAgent, AlphaBetaAgent, ExpectimaxAgent]:
+            agent = agentClass(0, depth = 2)
+            agent._evaluationFunction = _FailingEvaluation(5)
+
+            with self.assertRaises(ValueError):
+                agent.getAction(state)
+
+            self.assertEqual(original, state)
+            self.assertEqual(stateHash, hash(state))
+
+    def _checkApplyUndo(self, state, rng):
+        """
+        Applying actions in place should match generating successors,
+        and undoing them should get back to the original state.
+        """
+
+        agentIndex = 0
+
+        for i in range(NUM_MOVES):
+            if (state.isOver()):
+                break
+
+            original = state._initSuccessor()
+
+            # Apply a few moves deep, checking each against generateSuccessor().
+            expected = [state]
+            undos = []
+            for depth in range(3):
+                index = (agentIndex + depth) % state.getNumAgents()
+                if (expected[-1].isOver()):
+                    break
+
+                action = rng.choice(expected[-1].getLegalActions(index))
+                expected.append(expected[-1].generateSuccessor(index, action))
+
+                undos.append(state.applyAction(index, action, trusted = (depth % 2 == 0)))
+                self.assertEqual(expected[-1], state)
+                self.assertEqual(hash(expected[-1]), hash(state))
+                self.assertEqual(expected[-1].getLastFoodEaten(), state.getLastFoodEaten())
+
+            for undo in reversed(undos):
+                state.undoAction(undo)
+
+            self.assertEqual(original, state)
+            self.assertEqual(hash(original), hash(state))
+
+            action = rng.choice(state.getLegalActions(agentIndex))
+            state = state.generateSuccessor(agentIndex, action)
+            agentIndex = (agentIndex + 1) % state.getNumAgents()
+
+    def _checkRandomGame(self, state, rng):
+        """
+        Play random moves and make sure the incrementally updated hashes
+        always match hashes computed from scratch.
+        """
+
+        initialHash = hash(state)
+        agentIndex = 0
+
+        for i in range(NUM_MOVES):
+            if (state.isOver()):
+                break
+
+            action = rng.choice(state.getLegalActions(agentIndex))
+            successor = state.generateSuccessor(agentIndex, action)
+
+            # Generating a successor should never change the parent.
+            self.assertEqual(initialHash, hash(state))
+
+            state = successor
+            initialHash = hash(state)
+            agentIndex = (agentIndex + 1) % state.getNumAgents()
+
+            self.assertEqual(state._computeHash(), state._hash)
+            for agentState in state.getAgentStates():
+                self.assertEqual(self._freshAgentHash(agentState), hash(agentState))
+
+    def _freshAgentHash(self, agentState):
+        fresh = AgentState(agentState.getPosition(), agentState.getDirection(),
+                agentState.isPacman())
+        fresh.setScaredTimer(agentState.getScaredTimer())
+
+        return hash(fresh)
+
+class _FailingEvaluation(object):
+    """
+    Scores states, but raises after a number of evaluations.
+    """
+
+    def __init__(self, numEvaluations):
+        self._numEvaluations = numEvaluations
+
+    def __call__(self, state):
+        if (self._numEvaluations == 0):
+            raise ValueError('Evaluation failed.')
+
+        self._numEvaluations -= 1
+        return state.getScore()
+
+if __name__ == '__main__':
+    unittest.main()
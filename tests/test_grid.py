@@ -0,0 +1,69 @@
+import random
+import unittest
+
+from pacai.core.grid import Grid
+
+WIDTH = 7
+HEIGHT = 5
+
+"""
+Test the bit-packed grid against a plain list of lists.
+"""
+class GridTest(unittest.TestCase):
+    def test_matches_lists(self):
+        rng = random.Random(4)
+
+        grid = Grid(WIDTH, HEIGHT)
+        expected = [[False for y in range(HEIGHT)] for x in range(WIDTH)]
+
+        for i in range(500):
+            x = rng.randrange(WIDTH)
+            y = rng.randrange(HEIGHT)
+            value = rng.random() < 0.5
+
+            grid[x][y] = value
+            expected[x][y] = value
+
+            self.assertEqual(value, grid[x][y])
+            self.assertEqual(hash(grid), hash(self._listHash(expected)))
+            self.assertEqual(sum([column.count(True) for column in expected]), grid.count())
+
+        positions = [(x, y) for x in range(WIDTH) for y in range(HEIGHT)]
+        self.assertEqual([pos for pos in positions if expected[pos[0]][pos[1]]], grid.asList())
+        self.assertEqual([pos for pos in positions if not expected[pos[0]][pos[1]]],
+                grid.asList(False))
+        self.assertEqual(WIDTH * HEIGHT - grid.count(), grid.count(False))
+
+    def test_copy(self):
+        grid = Grid(WIDTH, HEIGHT, initialValue = True)
+        self.assertEqual(WIDTH * HEIGHT, grid.count())
+
+        other = grid.copy()
+        self.assertEqual(grid, other)
+        self.assertEqual(hash(grid), hash(other))
+
+        other[1][2] = False
+        self.assertTrue(grid[1][2])
+        self.assertFalse(other[1][2])
+        self.assertNotEqual(grid, other)
+        self.assertEqual(grid.count() - 1, other.count())
+
+        other[1][2] = True
+        self.assertEqual(grid, other)
+        self.assertEqual(hash(grid), hash(other))
+
+    def _listHash(self, data):
+        # The hash that the list-backed grid used to compute.
+        hashcode = 0
+        base = 1
+
+        for column in data:
+            for value in column:
+                if (value):
+                    hashcode += base
+                base *= 2
+
+        return hashcode
+
+if __name__ == '__main__':
+    unittest.main()
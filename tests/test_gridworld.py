@@ -0,0 +1,61 @@
+import unittest
+
+from pacai.bin import gridworld
+
+def _getModel(mdp):
+    model = {}
+    for state in mdp.getStates():
+        for action in mdp.getPossibleActions(state):
+            for (nextState, prob) in mdp.getTransitionStatesAndProbs(state, action):
+                model[(state, action, nextState)] = (prob,
+                        mdp.getReward(state, action, nextState))
+
+    return model
+
+def _getGridworld(grid, noise, livingReward):
+    mdp = gridworld.Gridworld(grid)
+    mdp.setNoise(noise)
+    mdp.setLivingReward(livingReward)
+    return mdp
+
+"""
+Test that the cached gridworld model follows changes to the grid and parameters.
+"""
+class GridworldTest(unittest.TestCase):
+    def test_cache(self):
+        mdp = gridworld.Gridworld(gridworld.BOOK_GRID)
+        _getModel(mdp)
+
+        mdp.setNoise(0.0)
+        self.assertEqual(_getModel(_getGridworld(gridworld.BOOK_GRID, 0.0, 0.0)), _getModel(mdp))
+
+        mdp.setLivingReward(-1.0)
+        self.assertEqual(_getModel(_getGridworld(gridworld.BOOK_GRID, 0.0, -1.0)), _getModel(mdp))
+
+        mdp.noise = 0.5
+        mdp.livingReward = 2.0
+        self.assertEqual(_getModel(_getGridworld(gridworld.BOOK_GRID, 0.5, 2.0)), _getModel(mdp))
+
+        mdp.grid = gridworld.makeGrid(gridworld.MAZE_GRID)
+        self.assertEqual(_getModel(_getGridworld(gridworld.MAZE_GRID, 0.5, 2.0)), _getModel(mdp))
+
+    def test_results_are_copies(self):
+        mdp = gridworld.Gridworld(gridworld.BOOK_GRID)
+
+        mdp.getStates().clear()
+        mdp.getTransitionStatesAndProbs((0, 0), 'north').clear()
+
+        self.assertEqual(12 - 1 + 1, len(mdp.getStates()))
+        self.assertEqual(3, len(mdp.getTransitionStatesAndProbs((0, 0), 'north')))
+
+    def test_illegal_action(self):
+        mdp = gridworld.Gridworld(gridworld.BOOK_GRID)
+
+        with self.assertRaises(Exception):
+            mdp.getTransitionStatesAndProbs((3, 2), 'north')
+
+        with self.assertRaises(Exception):
+            mdp.getTransitionStatesAndProbs(mdp.grid.terminalState, 'exit')
+
+if __name__ == '__main__':
+    unittest.main()
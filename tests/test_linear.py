@@ -0,0 +1,93 @@
+import random
+import unittest
+
+from pacai.bin.pacman import PacmanGameState
+from pacai.core.featureExtractors import SimpleExtractor
+from pacai.core.layout import getLayout
+from pacai.core.linear import LinearWeights
+from pacai.student.qlearningAgents import ApproximateQAgent
+
+"""
+Test linear weights and the approximate Q-learner that uses them.
+"""
+class LinearWeightsTest(unittest.TestCase):
+    def test_weights(self):
+        weights = LinearWeights()
+        vocabulary = weights.getVocabulary()
+
+        indexes = [vocabulary.getIndex(feature) for feature in ['a', 'b', 'c']]
+        self.assertEqual([0, 1, 2], indexes)
+        self.assertEqual(0.0, weights.dot(indexes, [1.0, 2.0, 3.0]))
+
+        weights.add([0, 2], [1.0, 2.0], 0.5)
+        self.assertEqual(0.5, weights.get('a'))
+        self.assertEqual(0.0, weights.get('b'))
+        self.assertEqual(1.0, weights.get('c'))
+        self.assertEqual(0.0, weights.get('unknown'))
+
+        # Features added after the last update have no weight yet.
+        indexes.append(vocabulary.getIndex('d'))
+        self.assertEqual(0.5 + 3.0, weights.dot(indexes, [1.0, 2.0, 3.0, 4.0]))
+        self.assertEqual([0.5, 1.0], weights.dotAll([([0], [1.0]), ([2, 3], [1.0, 1.0])]))
+
+        weights.set('d', -1.0)
+        self.assertEqual([('a', 0.5), ('b', 0.0), ('c', 1.0), ('d', -1.0)], weights.items())
+
+    def test_approximate_agent(self):
+        """
+        Check the agent against Q-learning with a plain dict of weights.
+        """
+
+        rng = random.Random(7)
+        state = PacmanGameState(getLayout('smallClassic'))
+
+        agent = ApproximateQAgent(0, extractor = 'pacai.core.featureExtractors.SimpleExtractor')
+        extractor = SimpleExtractor()
+        expectedWeights = {}
+
+        def getQValue(state, action):
+            features = extractor.getFeatures(state, action)
+            return sum([expectedWeights.get(key, 0.0) * value for (key, value) in features.items()])
+
+        agentIndex = 0
+        lastState = None
+        lastAction = None
+
+        for i in range(200):
+            if (state.isOver()):
+                break
+
+            if (agentIndex == 0):
+                actions = state.getLegalActions(0)
+                expectedValues = [getQValue(state, action) for action in actions]
+
+                self.assertEqual(expectedValues, agent.getQValues(state, actions))
+                self.assertEqual(expectedValues[0], agent.getQValue(state, actions[0]))
+
+                if (lastState is not None):
+                    reward = state.getScore() - lastState.getScore()
+                    value = max(expectedValues)
+                    difference = (reward + agent.getDiscountRate() * value
+                            - getQValue(lastState, lastAction))
+
+                    features = extractor.getFeatures(lastState, lastAction)
+                    for (key, featureValue) in features.items():
+                        expectedWeights[key] = (expectedWeights.get(key, 0.0)
+                                + agent.getAlpha() * difference * featureValue)
+
+                    agent.update(lastState, lastAction, state, reward)
+
+                lastState = state
+                lastAction = rng.choice(actions)
+                action = lastAction
+            else:
+                action = rng.choice(state.getLegalActions(agentIndex))
+
+            state = state.generateSuccessor(agentIndex, action)
+            agentIndex = (agentIndex + 1) % state.getNumAgents()
+
+        for (key, weight) in expectedWeights.items():
+            self.assertAlmostEqual(weight, agent.weights.get(key))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import math
+import random
+import time
+import unittest
+
+from pacai.agents.capture.mcts import MonteCarloCaptureAgent
+from pacai.agents.search.mcts import MonteCarloAgent
+from pacai.agents.search.mcts import MonteCarloTreeSearch
+from pacai.bin.capture import CaptureGameState
+from pacai.bin.pacman import PacmanGameState
+from pacai.core.eval import score
+from pacai.core.layout import Layout
+from pacai.core.layout import getLayout
+
+"""
+Test the Monte Carlo tree search engine.
+"""
+class MonteCarloTreeSearchTest(unittest.TestCase):
+    def test_state_untouched(self):
+        state = PacmanGameState(getLayout('smallClassic', maxGhosts = 2))
+        engine = MonteCarloTreeSearch(score, [0], rng = random.Random(4))
+
+        stateHash = hash(state)
+        copy = state._initSuccessor()
+
+        action = engine.search(state, 0, math.inf, 200)
+
+        self.assertIn(action, state.getLegalActions(0))
+        self.assertEqual(200, engine.lastRollouts)
+        self.assertEqual(stateHash, hash(state))
+        self.assertEqual(copy, state)
+
+    def test_tree_reuse(self):
+        state = PacmanGameState(getLayout('smallClassic', maxGhosts = 2))
+        engine = MonteCarloTreeSearch(score, [0], rng = random.Random(5))
+
+        action = engine.search(state, 0, math.inf, 500)
+        state = state.generateSuccessor(0, action)
+        for agentIndex in range(1, state.getNumAgents()):
+            state = state.generateSuccessor(agentIndex, state.getLegalActions(agentIndex)[0])
+
+        # The new root should come from the old tree, so it will already have visits.
+        root = engine._findRoot(state, 0)
+        self.assertGreater(root.visits, 0)
+        self.assertEqual(hash(state), root.stateHash)
+
+    def test_avoid_ghost(self):
+        # Pacman is between a ghost and the last food.
+        layoutText = [
+            '%%%%%%%%%',
+            '%.  P G %',
+            '%%%%%%%%%',
+        ]
+
+        state = PacmanGameState(Layout(layoutText))
+        engine = MonteCarloTreeSearch(score, [0], rng = random.Random(6))
+
+        self.assertEqual('West', engine.search(state, 0, math.inf, 500))
+
+    def test_deadline(self):
+        state = PacmanGameState(getLayout('mediumClassic'))
+        agent = MonteCarloAgent(0, moveTime = 0.1)
+
+        startTime = time.time()
+        action = agent.getAction(state)
+
+        self.assertIn(action, state.getLegalActions(0))
+        self.assertLess(time.time() - startTime, 1.0)
+        self.assertGreater(agent._search.getRolloutsPerSecond(), 0)
+
+    def test_capture_agent(self):
+        state = CaptureGameState(getLayout('defaultCapture'), 300)
+        agent = MonteCarloCaptureAgent(0, moveTime = 0.05)
+        agent.registerInitialState(state)
+
+        stateHash = hash(state)
+        self.assertIn(agent.getAction(state), state.getLegalActions(0))
+        self.assertEqual(stateHash, hash(state))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import unittest
+
+from pacai.bin import gridworld
+from pacai.core import mdpSolvers
+from pacai.student.valueIterationAgent import ValueIterationAgent
+
+GRIDS = [
+    gridworld.BOOK_GRID,
+    gridworld.BRIDGE_GRID,
+    gridworld.CLIFF_GRID,
+    gridworld.DISCOUNT_GRID,
+    gridworld.MAZE_GRID,
+]
+
+def _valueIteration(mdp, discountRate, iterations):
+    """
+    Value iteration straight over the MDP's methods.
+    """
+
+    values = {state: 0.0 for state in mdp.getStates()}
+
+    for _ in range(iterations):
+        newValues = dict(values)
+
+        for state in mdp.getStates():
+            actions = mdp.getPossibleActions(state)
+            if (len(actions) == 0):
+                continue
+
+            newValues[state] = max([sum([prob * (mdp.getReward(state, action, nextState)
+                    + discountRate * values[nextState])
+                    for (nextState, prob) in mdp.getTransitionStatesAndProbs(state, action)])
+                    for action in actions])
+
+        values = newValues
+
+    return values
+
+"""
+Test the MDP solvers against plain value iteration.
+"""
+class MDPSolversTest(unittest.TestCase):
+    def test_compile(self):
+        mdp = gridworld.Gridworld(gridworld.BOOK_GRID)
+        compiledMDP = mdpSolvers.CompiledMDP(mdp)
+
+        self.assertEqual(mdp.getStates(), compiledMDP.states)
+        self.assertEqual(len(compiledMDP.states), compiledMDP.getNumStates())
+
+        # The terminal state has no actions, exits have one, and everything else has four.
+        self.assertEqual(1 * 2 + 4 * 9, compiledMDP.getNumRows())
+
+        for state in compiledMDP.states:
+            index = compiledMDP.stateIndexes[state]
+            rows = range(compiledMDP.actionStarts[index], compiledMDP.actionStarts[index + 1])
+            self.assertEqual(list(mdp.getPossibleActions(state)),
+                    [compiledMDP.rowActions[row] for row in rows])
+
+            for row in rows:
+                start = compiledMDP.rowStarts[row]
+                end = compiledMDP.rowStarts[row + 1]
+                self.assertAlmostEqual(1.0, sum(compiledMDP.probabilities[start:end]))
+
+    def test_value_iteration(self):
+        for grid in GRIDS:
+            mdp = gridworld.Gridworld(grid)
+            mdp.setLivingReward(-0.1)
+
+            for iterations in [0, 1, 5, 100]:
+                expected = _valueIteration(mdp, 0.9, iterations)
+                solution = mdpSolvers.valueIteration(mdp, 0.9, iterations)
+
+                self.assertEqual(expected.keys(), solution.getValues().keys())
+                for (state, value) in expected.items():
+                    self.assertAlmostEqual(value, solution.getValue(state))
+
+    def test_tolerance(self):
+        mdp = gridworld.Gridworld(gridworld.DISCOUNT_GRID)
+        compiledMDP = mdpSolvers.CompiledMDP(mdp)
+
+        full = mdpSolvers.valueIteration(compiledMDP, 0.9, 1000)
+        early = mdpSolvers.valueIteration(compiledMDP, 0.9, 1000, tolerance = 1e-6)
+
+        self.assertLess(early.iterations, full.iterations)
+        self.assertEqual(early.iterations * (compiledMDP.getNumStates() - 1), early.backups)
+
+        for state in compiledMDP.states:
+            self.assertAlmostEqual(full.getValue(state), early.getValue(state), places = 4)
+
+    def test_solvers(self):
+        for grid in GRIDS:
+            mdp = gridworld.Gridworld(grid)
+            mdp.setLivingReward(-0.1)
+
+            compiledMDP = mdpSolvers.CompiledMDP(mdp)
+            expected = mdpSolvers.valueIteration(compiledMDP, 0.9, 1000)
+
+            for (name, solve) in mdpSolvers.SOLVERS.items():
+                solution = solve(compiledMDP, 0.9, 1000, tolerance = 1e-9)
+                self.assertGreater(solution.backups, 0)
+                self.assertGreaterEqual(solution.seconds, 0.0)
+
+                for state in compiledMDP.states:
+                    self.assertAlmostEqual(expected.getValue(state), solution.getValue(state),
+                            places = 6, msg = name)
+                    self.assertEqual(expected.getPolicy(state), solution.getPolicy(state),
+                            msg = name)
+
+    def test_solver_limits(self):
+        mdp = gridworld.Gridworld(gridworld.BRIDGE_GRID)
+        compiledMDP = mdpSolvers.CompiledMDP(mdp)
+        numActiveStates = len(compiledMDP.getActiveStates())
+
+        self.assertEqual(2 * numActiveStates, mdpSolvers.gaussSeidel(compiledMDP, 0.9, 2).backups)
+
+        solution = mdpSolvers.prioritizedSweeping(compiledMDP, 0.9, 2)
+        self.assertLessEqual(solution.backups, 2 * numActiveStates + max(
+                [len(states) for states in compiledMDP.getPredecessors()]))
+
+        solution = mdpSolvers.policyIteration(compiledMDP, 0.9, 1, evaluationSweeps = 3)
+        self.assertEqual(1, solution.iterations)
+        self.assertEqual(5 * numActiveStates, solution.backups)
+
+        with self.assertRaises(ValueError):
+            mdpSolvers.getSolver('unknown')
+
+    def test_agent(self):
+        mdp = gridworld.Gridworld(gridworld.BOOK_GRID)
+        agent = ValueIterationAgent(0, mdp, 0.9, 100)
+        expected = _valueIteration(mdp, 0.9, 100)
+
+        for state in mdp.getStates():
+            self.assertAlmostEqual(expected[state], agent.getValue(state))
+
+        self.assertEqual('north', agent.getPolicy((0, 0)))
+        self.assertEqual('exit', agent.getPolicy((3, 2)))
+        self.assertIsNone(agent.getPolicy(mdp.grid.terminalState))
+
+        agent = ValueIterationAgent(0, mdp, 0.9, 100, tolerance = 1e-9, solver = 'prioritized')
+        for state in mdp.getStates():
+            self.assertAlmostEqual(expected[state], agent.getValue(state), places = 6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+
+from pacai.bin.pacman import PacmanGameState
+from pacai.core import qtable
+from pacai.core.layout import getLayout
+from pacai.core.linear import LinearWeights
+from pacai.student.qlearningAgents import ApproximateQAgent
+from pacai.student.qlearningAgents import PacmanQAgent
+
+"""
+Test saving and loading what learning agents learn.
+"""
+class QTableTest(unittest.TestCase):
+    def setUp(self):
+        self._tempDir = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._tempDir.name, 'learned.bin')
+
+    def tearDown(self):
+        self._tempDir.cleanup()
+
+    def test_qvalues(self):
+        qvalues = {
+            (qtable.getStateKey((1, 2)), 'north'): 1.5,
+            (qtable.getStateKey('TERMINAL_STATE'), 'exit'): -10.0,
+            (2 ** 64 - 1, 'north'): 0.25,
+        }
+
+        qtable.saveQValues(self._path, qvalues)
+        self.assertEqual(qvalues, qtable.loadQValues(self._path))
+
+        with self.assertRaises(ValueError):
+            qtable.loadWeights(self._path)
+
+    def test_weights(self):
+        weights = LinearWeights()
+        weights.set('bias', 1.0)
+        weights.set(('eats-food', 2), -0.5)
+
+        qtable.saveWeights(self._path, weights)
+        loaded = qtable.loadWeights(self._path)
+
+        self.assertEqual(weights.items(), loaded.items())
+
+        weights.set(PacmanGameState(getLayout('smallClassic')), 1.0)
+        with self.assertRaises(ValueError):
+            qtable.saveWeights(self._path, weights)
+
+    def test_state_key(self):
+        layout = getLayout('smallClassic')
+        self.assertEqual(qtable.getStateKey(PacmanGameState(layout)),
+                qtable.getStateKey(PacmanGameState(layout)))
+        self.assertEqual(qtable.getStateKey((1, 2)), qtable.getStateKey((1.0, 2.0)))
+        self.assertNotEqual(qtable.getStateKey((1, 2)), qtable.getStateKey((2, 1)))
+
+    def test_resume(self):
+        state = PacmanGameState(getLayout('smallClassic'))
+        action = state.getLegalActions(0)[0]
+        nextState = state.generateSuccessor(0, action)
+
+        # Training is done after one episode, which saves what was learned.
+        agent = PacmanQAgent(0, numTraining = 1, learningFile = self._path)
+        agent.startEpisode()
+        agent.update(state, action, nextState, 10.0)
+        agent.stopEpisode()
+
+        resumed = PacmanQAgent(0, learningFile = self._path, resume = 1)
+        self.assertEqual(0.0, resumed.getQValue(state, action))
+
+        resumed.startEpisode()
+        self.assertNotEqual(0.0, resumed.getQValue(state, action))
+        self.assertEqual(agent.getQValue(state, action), resumed.getQValue(state, action))
+
+    def test_resume_weights(self):
+        state = PacmanGameState(getLayout('smallClassic'))
+        action = state.getLegalActions(0)[0]
+        nextState = state.generateSuccessor(0, action)
+
+        extractor = 'pacai.core.featureExtractors.SimpleExtractor'
+        agent = ApproximateQAgent(0, extractor = extractor, numTraining = 1,
+                learningFile = self._path)
+        agent.startEpisode()
+        agent.update(state, action, nextState, 10.0)
+        agent.stopEpisode()
+
+        resumed = ApproximateQAgent(0, extractor = extractor, learningFile = self._path,
+                resume = '1')
+        resumed.startEpisode()
+        self.assertEqual(agent.getQValue(state, action), resumed.getQValue(state, action))
+
+if __name__ == '__main__':
+    unittest.main()
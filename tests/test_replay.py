@@ -1,12 +1,22 @@
 import os
+import pickle
 import tempfile
 import unittest
 
+from pacai.agents.base import BaseAgent
+from pacai.agents.ghost.random import RandomGhost
 from pacai.bin import capture
 from pacai.bin import pacman
+from pacai.core.layout import getLayout
+from pacai.core import replay
+from pacai.ui.pacman.null import PacmanNullView
 
 PACMAN_FILENAME = 'pacai_unittest_pacman.replay'
 CAPTURE_FILENAME = 'pacai_unittest_capture.replay'
+FORMAT_FILENAME = 'pacai_unittest_format.replay'
+LEGACY_FILENAME = 'pacai_unittest_legacy.replay'
+BAD_ACTION_FILENAME = 'pacai_unittest_bad_action.replay'
+SEEK_FILENAME = 'pacai_unittest_seek.replay'
 
 """
 Test saving and playing replays.
@@ -35,5 +45,139 @@ class ReplayTest(unittest.TestCase):
 
         os.remove(replayPath)
 
+    def test_seek(self):
+        replayPath = os.path.join(tempfile.gettempdir(), SEEK_FILENAME)
+
+        games = capture.main(['--null-graphics', '--quiet', '--seed', '7',
+                '--record', replayPath])
+        moves = games[0].moveHistory
+
+        reader = replay.ReplayReader(replayPath)
+        self.assertEqual(moves, list(reader.getMoves()))
+        self.assertTrue(len(reader.getKeyframes()) > 0)
+
+        initialState = capture.CaptureGameState(reader.getLayout(), reader.getMetadata()['length'])
+
+        # The final state also has the end of game applied by the rules, so skip it.
+        states = [initialState]
+        for move in moves[:-1]:
+            states.append(states[-1].generateSuccessor(*move))
+
+        # Jump around, including backwards.
+        for turn in [len(states) - 1, 0, 899, 250, 199, 200, 201, 1, 100, 99]:
+            state = reader.getState(initialState, turn)
+            self.assertEqual(states[turn], state)
+            self.assertEqual(hash(states[turn]), hash(state))
+            self.assertEqual(states[turn].getRedFood(), state.getRedFood())
+            self.assertEqual(states[turn].getTimeleft(), state.getTimeleft())
+
+        self.assertRaises(IndexError, reader.getState, initialState, len(moves) + 1)
+
+        os.remove(replayPath)
+
+    def test_format(self):
+        replayPath = os.path.join(tempfile.gettempdir(), FORMAT_FILENAME)
+
+        layout = getLayout('tinyCapture')
+        actions = replay.ACTIONS[:-1]
+        moves = [(i % 4, actions[i % len(actions)]) for i in range(250)]
+
+        with replay.ReplayWriter(replayPath, layout, keyframeInterval = 10, length = 250) as writer:
+            for (agentIndex, action) in moves:
+                writer.writeMove(agentIndex, action)
+
+        reader = replay.ReplayReader(replayPath)
+        self.assertEqual({'length': 250}, reader.getMetadata())
+        self.assertEqual(layout.layoutText, reader.getLayout().layoutText)
+        self.assertEqual(len(moves), reader.getNumMoves())
+        self.assertEqual(24, len(reader.getKeyframes()))
+
+        for startTurn in [0, 1, 9, 10, 11, 155, 249, 250]:
+            self.assertEqual(moves[startTurn:], list(reader.getMoves(startTurn)))
+
+        reader.close()
+
+        # A partially written file should be readable up to the last full record.
+        with open(replayPath, 'rb') as file:
+            data = file.read()
+
+        with open(replayPath, 'wb') as file:
+            file.write(data[:-1])
+
+        with replay.ReplayReader(replayPath) as reader:
+            self.assertEqual(moves[:-1], list(reader.getMoves()))
+
+        os.remove(replayPath)
+
+    def test_record_bad_action(self):
+        replayPath = os.path.join(tempfile.gettempdir(), BAD_ACTION_FILENAME)
+
+        # A bad action should crash the agent (not the recording), and is not recorded.
+        layout = getLayout('smallClassic', maxGhosts = 1)
+        games = pacman.runGames(layout, _BadActionAgent(0, 3), [RandomGhost(1)],
+                PacmanNullView(), 1, record = replayPath, catchExceptions = True)
+
+        self.assertTrue(games[0].agentCrashed)
+
+        with replay.ReplayReader(replayPath) as reader:
+            moves = list(reader.getMoves())
+
+        self.assertEqual(games[0].moveHistory[:-1], moves)
+
+        os.remove(replayPath)
+
+    def test_legacy(self):
+        replayPath = os.path.join(tempfile.gettempdir(), LEGACY_FILENAME)
+
+        layout = getLayout('smallClassic')
+        state = pacman.PacmanGameState(layout)
+        actions = []
+        for agentIndex in [0, 1, 2, 0]:
+            action = state.getLegalActions(agentIndex)[0]
+            actions.append((agentIndex, action))
+            state = state.generateSuccessor(agentIndex, action)
+
+        recorded = {'layout': layout, 'actions': actions}
+
+        with open(replayPath, 'wb') as file:
+            pickle.dump(recorded, file)
+
+        # Pickled replays are only loaded when asked for.
+        with self.assertRaises(ValueError):
+            replay.loadReplay(replayPath)
+
+        with self.assertRaises(ValueError):
+            pacman.main(['--null-graphics', '--replay', replayPath])
+
+        loaded = replay.loadReplay(replayPath, allowLegacy = True)
+        self.assertEqual(recorded['actions'], loaded['actions'])
+        self.assertEqual(recorded['actions'], replay.loadLegacyReplay(replayPath)['actions'])
+
+        pacman.main(['--null-graphics', '--replay', replayPath, '--legacy-replay'])
+
+        os.remove(replayPath)
+
+    def test_varint(self):
+        for value in [0, 1, 127, 128, 300, 2**32, 2**70]:
+            encoded = replay.encodeVarint(value)
+            self.assertEqual((value, len(encoded)), replay.decodeVarint(encoded, 0))
+
+class _BadActionAgent(BaseAgent):
+    """
+    Makes a few legal moves, and then an action that doesn't exist.
+    """
+
+    def __init__(self, index, numMoves, **kwargs):
+        super().__init__(index, **kwargs)
+
+        self._numMoves = numMoves
+
+    def getAction(self, state):
+        if (self._numMoves == 0):
+            return 'Jump'
+
+        self._numMoves -= 1
+        return state.getLegalActions(self.index)[0]
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,139 @@
+import random
+import unittest
+
+from pacai.bin import gridworld
+from pacai.bin.pacman import PacmanGameState
+from pacai.core.layout import getLayout
+from pacai.student.qlearningAgents import ApproximateQAgent
+from pacai.student.qlearningAgents import QLearningAgent
+from pacai.util.replayMemory import ReplayMemory
+
+"""
+Test the replay memory and the agents that replay from it.
+"""
+class ReplayMemoryTest(unittest.TestCase):
+    def test_ring_buffer(self):
+        memory = ReplayMemory(3, rng = random.Random(1))
+        self.assertEqual(([], []), memory.sample(4))
+
+        slots = [memory.add(transition) for transition in 'abcde']
+        self.assertEqual([0, 1, 2, 0, 1], slots)
+        self.assertEqual(3, len(memory))
+        self.assertEqual(['d', 'e', 'c'], [memory.get(slot) for slot in range(3)])
+
+        slots, transitions = memory.sample(100)
+        self.assertEqual(100, len(slots))
+        self.assertEqual({'c', 'd', 'e'}, set(transitions))
+        self.assertEqual([memory.get(slot) for slot in slots], transitions)
+
+        with self.assertRaises(ValueError):
+            ReplayMemory(0)
+
+    def test_prioritized(self):
+        memory = ReplayMemory(5, prioritized = True, priorityExponent = 1.0,
+                rng = random.Random(1))
+
+        for transition in 'abc':
+            memory.add(transition)
+
+        # New transitions get the highest priority seen so far.
+        self.assertEqual([1.0, 1.0, 1.0], [memory.getPriority(slot) for slot in range(3)])
+
+        memory.updatePriorities([0, 1, 2], [0.0, -3.0, None])
+        self.assertAlmostEqual(3.0, memory.getPriority(1), places = 5)
+        self.assertEqual(1.0, memory.getPriority(2))
+
+        memory.add('d')
+        self.assertAlmostEqual(3.0, memory.getPriority(3), places = 5)
+
+        counts = {transition: 0 for transition in 'abcd'}
+        for transition in memory.sample(7000)[1]:
+            counts[transition] += 1
+
+        # Sampled in proportion to priority: 0 : 3 : 1 : 3.
+        self.assertLess(counts['a'], 10)
+        self.assertAlmostEqual(3000, counts['b'], delta = 200)
+        self.assertAlmostEqual(1000, counts['c'], delta = 200)
+        self.assertAlmostEqual(3000, counts['d'], delta = 200)
+
+    def test_qlearning_replay(self):
+        mdp = gridworld.Gridworld(gridworld.BOOK_GRID)
+        environment = gridworld.GridworldEnvironment(mdp)
+        actionFn = mdp.getPossibleActions
+
+        agent = QLearningAgent(0, actionFn = actionFn)
+        replayAgent = QLearningAgent(0, actionFn = actionFn)
+
+        # Replaying an encoded transition is the same as an update.
+        rng = random.Random(3)
+        for _ in range(500):
+            state = environment.getCurrentState()
+            actions = actionFn(state)
+            if (len(actions) == 0):
+                environment.reset()
+                continue
+
+            action = rng.choice(actions)
+            nextState, reward = environment.doAction(action)
+
+            agent.update(state, action, nextState, reward)
+            replayAgent.replayTransition(
+                    replayAgent.encodeTransition(state, action, nextState, reward))
+
+        self.assertEqual(agent.qvalues, replayAgent.qvalues)
+
+        # Every observed transition is remembered and followed by a replayed mini-batch.
+        replayAgent = QLearningAgent(0, actionFn = actionFn, replayCapacity = '4',
+                replayBatchSize = '2', replayPrioritized = '1')
+        replayAgent.startEpisode()
+        replayAgent.observeTransition((3, 1), 'exit', mdp.grid.terminalState, -1.0)
+
+        self.assertEqual(1, len(replayAgent.replayMemory))
+        self.assertTrue(replayAgent.replayMemory.isPrioritized())
+        self.assertLess(replayAgent.getQValue((3, 1), 'exit'), agent.getAlpha() * -1.0)
+
+        # Nothing is remembered (or replayed) after training.
+        replayAgent = QLearningAgent(0, actionFn = actionFn, numTraining = 1,
+                replayCapacity = '4', replayBatchSize = '2')
+        replayAgent.startEpisode()
+        replayAgent.stopEpisode()
+        replayAgent.observeTransition((3, 1), 'exit', mdp.grid.terminalState, -1.0)
+
+        self.assertEqual(0, len(replayAgent.replayMemory))
+
+    def test_approximate_replay(self):
+        extractor = 'pacai.core.featureExtractors.SimpleExtractor'
+        agent = ApproximateQAgent(0, extractor = extractor)
+        replayAgent = ApproximateQAgent(0, extractor = extractor)
+
+        rng = random.Random(5)
+        state = PacmanGameState(getLayout('smallClassic'))
+        transitions = []
+
+        for _ in range(20):
+            action = rng.choice(state.getLegalActions(0))
+            nextState = state.generateSuccessor(0, action)
+            for agentIndex in range(1, nextState.getNumAgents()):
+                if (nextState.isOver()):
+                    break
+
+                ghostAction = rng.choice(nextState.getLegalActions(agentIndex))
+                nextState = nextState.generateSuccessor(agentIndex, ghostAction)
+
+            transitions.append((state, action, nextState, nextState.getScore() - state.getScore()))
+
+            if (nextState.isOver()):
+                break
+
+            state = nextState
+
+        for transition in transitions:
+            agent.update(*transition)
+            replayAgent.replayTransition(replayAgent.encodeTransition(*transition))
+
+        self.assertEqual(len(agent.weights), len(replayAgent.weights))
+        for (feature, weight) in agent.weights.items():
+            self.assertAlmostEqual(weight, replayAgent.weights.get(feature))
+
+if __name__ == '__main__':
+    unittest.main()
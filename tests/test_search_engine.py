@@ -0,0 +1,167 @@
+import math
+import random
+import time
+import unittest
+
+from pacai.agents.capture.alphabeta import AlphaBetaCaptureAgent
+from pacai.agents.search.alphabeta import AlphaBetaSearch
+from pacai.agents.search.alphabeta import ParallelAlphaBetaSearch
+from pacai.agents.search.alphabeta import SharedEvaluationCache
+from pacai.bin.capture import CaptureGameState
+from pacai.bin.pacman import PacmanGameState
+from pacai.core.eval import score
+from pacai.core.layout import getLayout
+
+"""
+Test the alpha-beta search engine.
+"""
+class SearchEngineTest(unittest.TestCase):
+    def test_pacman_minimax_value(self):
+        rng = random.Random(20)
+        state = PacmanGameState(getLayout('smallClassic', maxGhosts = 2))
+        self._checkMinimaxValues(state, [0], rng)
+
+    def test_capture_minimax_value(self):
+        rng = random.Random(21)
+        state = CaptureGameState(getLayout('tinyCapture'), 300)
+        self._checkMinimaxValues(state, state.getRedTeamIndices(), rng)
+
+    def test_deadline(self):
+        state = PacmanGameState(getLayout('mediumClassic'))
+        engine = AlphaBetaSearch(score, [0])
+
+        startTime = time.time()
+        action = engine.search(state, 0, startTime + 0.1)
+
+        self.assertIn(action, state.getLegalActions(0))
+        self.assertLess(time.time() - startTime, 1.0)
+        self.assertGreater(engine.lastDepth, 0)
+
+    def test_parallel_search(self):
+        state = PacmanGameState(getLayout('smallClassic', maxGhosts = 2))
+
+        search = ParallelAlphaBetaSearch(score, [0], 2)
+        try:
+            action = search.search(state, 0, time.time() + 60, 4)
+        finally:
+            search.close()
+
+        serial = AlphaBetaSearch(score, [0])
+        serial.search(state, 0, time.time() + 60, 4)
+
+        self.assertIn(action, state.getLegalActions(0))
+        self.assertEqual(4, search.lastDepth)
+        self.assertEqual(serial.lastValue, search.lastValue)
+
+    def test_parallel_search_deadline(self):
+        state = PacmanGameState(getLayout('smallClassic', maxGhosts = 2))
+        actions = state.getLegalActions(0)
+        slowAction = actions[0]
+
+        # The worker with the slow action misses the deadline,
+        # so the best of the actions that the other workers finished should be picked.
+        slowPosition = state.generatePacmanSuccessor(slowAction).getPacmanPosition()
+        # Start the workers first, so the (generous) deadline is only spent on the search.
+        search = ParallelAlphaBetaSearch(_SlowEvaluation([slowPosition]), [0], len(actions))
+        try:
+            search.start()
+            action = search.search(state, 0, time.time() + 1.0, 1)
+        finally:
+            search.close()
+
+        values = [(score(state.generatePacmanSuccessor(other)), other) for other in actions[1:]]
+        self.assertEqual(max(values)[1], action)
+        self.assertEqual(1, search.lastDepth)
+
+        # When no worker finishes, any legal action will do.
+        slowPositions = [state.generatePacmanSuccessor(other).getPacmanPosition()
+                for other in actions]
+        search = ParallelAlphaBetaSearch(_SlowEvaluation(slowPositions), [0], 2)
+        try:
+            search.start()
+            action = search.search(state, 0, time.time() + 0.2, 1)
+        finally:
+            search.close()
+
+        self.assertIn(action, actions)
+        self.assertEqual(0, search.lastDepth)
+
+    def test_shared_cache(self):
+        cache = SharedEvaluationCache(16)
+
+        self.assertIsNone(cache.get(12345))
+        cache.put(12345, -3.5)
+        self.assertEqual(-3.5, cache.get(12345))
+
+        # A colliding key replaces the slot.
+        cache.put(12345 + 16, 7)
+        self.assertIsNone(cache.get(12345))
+        self.assertEqual(7, cache.get(12345 + 16))
+
+    def test_capture_agent(self):
+        state = CaptureGameState(getLayout('defaultCapture'), 300)
+        agent = AlphaBetaCaptureAgent(0, moveTime = 0.05)
+        agent.registerInitialState(state)
+
+        stateHash = hash(state)
+        self.assertIn(agent.getAction(state), state.getLegalActions(0))
+        self.assertEqual(stateHash, hash(state))
+
+    def _checkMinimaxValues(self, state, maxAgents, rng):
+        """
+        The engine (with its transposition table and move ordering) should find the same values
+        as a plain minimax search, and leave the state untouched.
+        """
+
+        engine = AlphaBetaSearch(score, maxAgents)
+        agentIndex = 0
+
+        for i in range(10):
+            if (state.isOver()):
+                break
+
+            for depth in [1, 3, 5]:
+                stateHash = hash(state)
+                # Entries from earlier (deeper) searches could give deeper values.
+                engine.getTable().clear()
+                engine.search(state, agentIndex, math.inf, depth)
+
+                self.assertEqual(stateHash, hash(state))
+                self.assertEqual(self._minimax(state, agentIndex, depth, maxAgents),
+                        engine.lastValue)
+
+            action = rng.choice(state.getLegalActions(agentIndex))
+            state = state.generateSuccessor(agentIndex, action)
+            agentIndex = (agentIndex + 1) % state.getNumAgents()
+
+    def _minimax(self, state, agentIndex, depth, maxAgents):
+        if (depth == 0 or state.isOver()):
+            return score(state)
+
+        nextAgent = (agentIndex + 1) % state.getNumAgents()
+        values = [self._minimax(state.generateSuccessor(agentIndex, action), nextAgent,
+                depth - 1, maxAgents) for action in state.getLegalActions(agentIndex)]
+
+        if (agentIndex in maxAgents):
+            return max(values)
+
+        return min(values)
+
+class _SlowEvaluation(object):
+    """
+    Scores states, but blocks far past any test deadline
+    when pacman is in one of the slow positions
+    (the worker is terminated when the search is closed).
+    """
+
+    def __init__(self, slowPositions):
+        self._slowPositions = slowPositions
+
+    def __call__(self, state):
+        if (state.getPacmanPosition() in self._slowPositions):
+            time.sleep(60)
+
+        return score(state)
+
+if __name__ == '__main__':
+    unittest.main()